@@ -1,8 +1,7 @@
-import random
 import numpy as np
 
 from printf import printf
-import settings
+import settings, PackedArray
 # import commonFuncs 
 
 # The 'delta' parameter determines CEDAR's accuracy.
@@ -39,9 +38,12 @@ class CntrMaster(object):
 
     cntr2num = lambda self, i: self.sharedEstimators[i]
     
+    # Round a (possibly fractional) number of unit increments to one of the two closest integers, w.p. that keeps its expectation. E.g., 2.25 is rounded to 3 w.p. 0.25, and to 2 otherwise
+    roundIncs = lambda self, factor : np.floor (factor) + (np.random.random (np.shape (factor)) < factor - np.floor (factor))
+    
     calcDiff = lambda self, estimator : (1 + 2*self.delta^2 * estimator) / (1 - self.delta^2)
 
-    def __init__(self, cntrSize=8, delta=None, numCntrs=1, verbose=[], cntrMaxVal=None):
+    def __init__(self, cntrSize=8, delta=None, numCntrs=1, verbose=[], cntrMaxVal=None, packed=False, fileName=None):
         """
         Initialize an array of cntrSize counters. The cntrs are initialized to 0.
         Inputs:
@@ -50,12 +52,16 @@ class CntrMaster(object):
         cntrMaxVal - requested max value to be reached by the counter. When Delta is not given, the initiator uses this value,
                      and calculates (using binary search) the minimum delta that allows reaching this maximum value.
         numCntrs - number of counters in the array.
+        packed - when True, the cntrs' codes are bit-packed, at exactly cntrSize bits per cntr (see PackedArray).
+        fileName - when given, the cntrs' codes are bit-packed in a memory-mapped file, which persists after the process ends (see PackedArray.openCntrsFile). 
+                   If the file exists, the cntrs are reopened from it. Implies packed.
         """
         self.cntrSize      = cntrSize
         self.numCntrs      = numCntrs
         self.numEstimators = 2**self.cntrSize
         self.verbose       = verbose
-        self.cntrs = [0 for i in range(self.numCntrs)]
+        self.packed        = packed or (fileName!=None)
+        self.fileName      = fileName
         if (delta==None):
             if (cntrMaxVal==None):
                 print ('error: the input arguments should include either delta or cntrMaxVal')
@@ -72,6 +78,11 @@ class CntrMaster(object):
         else:
             self.delta         = delta
             self.calcDiffsNSharedEstimators ()
+        self.calcTables ()
+        if (self.fileName==None):
+            self.rstAllCntrs ()
+        else: # reopen the cntrs kept in the file, if it exists
+            self.cntrs = PackedArray.openCntrsFile (fileName=self.fileName, numCntrs=self.numCntrs, cntrSize=self.cntrSize, settingsStr=self.genSettingsStr(), cntrZeroCode=self.cntrZeroCode)
         
     def calcDiffsNSharedEstimators (self):
         self.sharedEstimators = np.zeros (self.numEstimators)
@@ -81,6 +92,23 @@ class CntrMaster(object):
             self.sharedEstimators[i] = self.sharedEstimators[i-1] + self.diffs[i-1] 
         self.cntrMaxVal = self.sharedEstimators[-1]
 
+    def calcTables (self):
+        """
+        Pre-calculate the tables describing the cntr as a chain of codes, where the code of a cntr is the index of its estimator. 
+        These tables are common to all the counter types, and are used by simulators that operate on the codes directly (e.g., SimController's skip-ahead simulation).
+        self.valOfCode[c]  - the value represented by the cntr whose code is c, namely, self.sharedEstimators[c].
+        self.nextCode[c]   - the code of the cntr reached when incrementing the cntr whose code is c by 1 succeeds, namely, c+1. For the max cntr, nextCode[c]==c.
+        self.probOfInc1[c] - the prob' that incrementing the cntr whose code is c by 1 succeeds, namely, 1/self.diffs[c]. The prob' is 0 for the max cntr.
+        self.sortedCodes, self.sortedVals - all the codes, and the values they represent, in an increasing order.
+        """
+        self.cntrZeroCode    = 0
+        self.cntrMaxCode     = self.numEstimators-1
+        self.valOfCode       = self.sharedEstimators
+        self.nextCode        = np.minimum (np.arange (1, self.numEstimators+1), self.cntrMaxCode)
+        self.probOfInc1      = np.zeros (self.numEstimators)
+        self.probOfInc1[:-1] = 1 / self.diffs
+        self.sortedCodes     = np.arange (self.numEstimators)
+        self.sortedVals      = self.sharedEstimators
     
     def rstCntr (self, cntrIdx=0):
         """
@@ -89,7 +117,10 @@ class CntrMaster(object):
     def rstAllCntrs(self):
         """
         """
-        self.cntrs = [0 for i in range(self.numCntrs)]
+        if (self.fileName!=None):
+            self.cntrs.fill (self.cntrZeroCode)
+            return
+        self.cntrs = PackedArray.genCntrsArray (numCntrs=self.numCntrs, cntrSize=self.cntrSize, packed=self.packed) # the code of each cntr is the index of its estimator
 
     def incCntr(self, cntrIdx=0, factor=1, mult=False, verbose=[]):
         """
@@ -114,23 +145,74 @@ class CntrMaster(object):
         - the target value (the cntr's current value + factor)
           - cntrDict['cntrVec'] - the binary counter.
           - cntrDict['val']  - the counter's value.
+        
+        A weighted increment (factor>1) is equivalent to factor unit increments, each succeeding w.p. 1/self.diffs[cur estimator].
+        Instead of drawing a random number per unit increment, we draw, for each estimator reached, the number of unit increments until
+        the next successful one. This number is geometrically distributed with success prob' 1/self.diffs[cur estimator].
+        Hence, the time complexity is linear in the number of estimators crossed, rather than in factor.
+        A fractional factor is first rounded to one of the two closest integers, in an unbiased way (see roundIncs).
+        A multiplicative update is rounded to one of the two closest estimators, as in incCntrs.
         """
         settings.checkCntrIdx(cntrIdx=cntrIdx, numCntrs=self.numCntrs, cntrType='CEDAR')
-        for i in range(factor):
-            # The probability to increment is calculated  according to the diff
+        if (mult):
+            self.incCntrs (indices=[cntrIdx], factors=factor, mult=True)
+            return self.queryCntr (cntrIdx)
+        remainingIncs = self.roundIncs (factor) # number of unit increments not applied yet
+        while (remainingIncs > 0):
             if (self.cntrs[cntrIdx] == self.numEstimators-1): # reached the largest estimator --> cannot further inc
                 if (settings.VERBOSE_NOTE in self.verbose):
                     print ('note: tried to inc cntr {} above the maximal estimator value of {}' .format (cntrIdx, self.sharedEstimators[-1]))
                 break
+            # The probability to increment is calculated  according to the diff
             probOfFurtherInc = 1/self.diffs[self.cntrs[cntrIdx]]
-            if random.random() < probOfFurtherInc:
-                if (settings.VERBOSE_DETAILS in verbose): 
-                    print ('oldVal={:.0f}, incedVal={:.0f}, probOfFurtherInc={:.6f}'
-                            .format (self.sharedEstimators[self.cntrs[cntrIdx]], self.sharedEstimators[self.cntrs[cntrIdx]+1], probOfFurtherInc))
-                self.cntrs[cntrIdx] += 1
+            incsTillNextEstimator = settings.geomRand (probOfFurtherInc) # num of unit increments until (and including) the one that moves to the next estimator
+            if (incsTillNextEstimator > remainingIncs): # all the remaining unit increments fail
+                break
+            if (settings.VERBOSE_DETAILS in verbose): 
+                print ('oldVal={:.0f}, incedVal={:.0f}, probOfFurtherInc={:.6f}'
+                        .format (self.sharedEstimators[self.cntrs[cntrIdx]], self.sharedEstimators[self.cntrs[cntrIdx]+1], probOfFurtherInc))
+            self.cntrs[cntrIdx] += 1
+            remainingIncs       -= incsTillNextEstimator
 
         return {'cntrVec': np.binary_repr(self.cntrs[cntrIdx], self.cntrSize), 'val': self.sharedEstimators[self.cntrs[cntrIdx]]}
 
+    def incCntrs (self, indices, factors=1, mult=False):
+        """
+        Increase a batch of counters, as if incCntr (cntrIdx=indices[i], factor=factors[i], mult=mult) were called for each i, in order.
+        factors may be either an array of coefficients, one per index, or a single coefficient for all the indices.
+        Returns an array of the cntrs' values, where the i-th entry is the value of cntr indices[i] right after applying its i-th increment.
+        As in incCntr, a weighted increment is applied by drawing, for each estimator reached, the number of unit increments until the next successful one;
+        here, these numbers are drawn in a single vectorized draw for all the cntrs that still have unit increments to apply.
+        Repeated indices are handled in rounds (see settings.rndsOfIdxs). A multiplicative update is rounded to one of the two closest estimators (see settings.incCntrsByTables).
+        """
+        if (mult):
+            return settings.incCntrsByTables (self, indices=indices, factors=factors, mult=mult, cntrType='CEDAR')
+        indices = np.asarray (indices, dtype=np.int64)
+        factors = np.broadcast_to (np.asarray (factors, dtype=float), indices.shape)
+        vals    = np.empty (len(indices))
+        settings.checkCntrIdxs (indices=indices, numCntrs=self.numCntrs, cntrType='CEDAR')
+        for entries in settings.rndsOfIdxs (indices):
+            cntrIdxs      = indices[entries]
+            codes         = self.cntrs[cntrIdxs].astype (np.int64)
+            remainingIncs = self.roundIncs (factors[entries]) # number of unit increments not applied yet
+            active        = np.flatnonzero ((remainingIncs > 0) & (codes < self.cntrMaxCode))
+            while (len(active)>0):
+                incsTillNextEstimator = np.random.geometric (self.probOfInc1[codes[active]]) 
+                succeeded             = (incsTillNextEstimator <= remainingIncs[active])
+                active                = active[succeeded]
+                codes[active]         += 1
+                remainingIncs[active] -= incsTillNextEstimator[succeeded]
+                active                = active[(remainingIncs[active] > 0) & (codes[active] < self.cntrMaxCode)]
+            self.cntrs[cntrIdxs] = codes
+            vals[entries]        = self.sharedEstimators[codes]
+        return vals
+
+    def queryCntrs (self, indices):
+        """
+        Query a batch of counters. Returns an array, whose i-th entry is the value of cntr indices[i].
+        """
+        return settings.queryCntrsByTables (self, indices=indices, cntrType='CEDAR')
+
     def queryCntr(self, cntrIdx=0) -> dict:
         """
         Query a cntr.
@@ -0,0 +1,114 @@
+import math
+import numpy as np
+import settings
+
+class CntrLanes (object):
+    """
+    Simulate numOfLanes independent experiments ("lanes") of a single approximate counter at once.
+    The lanes are kept as a single numpy array of codes, and are advanced using the counter's tables (valOfCode, nextCode, probOfInc1),
+    with batched random draws. Hence, the interpreter's overhead of numOfLanes experiments is about that of a single experiment.
+    Like SimController.skipAheadTransitions, each step advances every active lane to its next transition, where the number of real increments
+    till that transition is drawn from a geometric distribution.
+    """
+
+    def __init__ (self, cntr, numOfLanes, maxRealVal, dwnSmple=False):
+        """
+        Inputs:
+        cntr       - a CntrMaster, whose tables are pre-calculated.
+        numOfLanes - the number of independent experiments to run.
+        maxRealVal - the max real value to count.
+        dwnSmple   - when True, down-sample each lane whose cntr reaches its max value.
+        """
+        self.cntr        = cntr
+        self.numOfLanes  = numOfLanes
+        self.maxRealVal  = maxRealVal
+        self.lastRealVal = math.ceil (maxRealVal) # the read errors are collected at the real values 1, 2, ..., lastRealVal
+        self.dwnSmple    = dwnSmple
+
+    def rstLanes (self):
+        """
+        Reset all the lanes: the cntrs, the real values counted, and the sampling prob's.
+        """
+        self.codes       = np.full  (self.numOfLanes, self.cntr.cntrZeroCode)
+        self.realVals    = np.zeros (self.numOfLanes, dtype=np.int64)
+        self.sampleProbs = np.ones  (self.numOfLanes)
+
+    def dwnSmpleLanes (self, lanes):
+        """
+        Down-sample the given lanes: halve the value of their cntrs (using an unbiased probabilistic rounding), and their sampling prob's.
+        """
+        self.codes[lanes]        = settings.vals2codes (targetVals=self.cntr.valOfCode[self.codes[lanes]]/2, sortedVals=self.cntr.sortedVals, sortedCodes=self.cntr.sortedCodes)
+        self.sampleProbs[lanes] /= 2
+
+    def advanceLanes (self, lanes):
+        """
+        Advance each of the given lanes to its next transition. Lanes whose cntr reached its max value should be either down-sampled, or excluded, beforehand.
+        Returns the scaled values of the cntrs of these lanes, after the transition.
+        """
+        self.realVals[lanes] += np.random.geometric (self.cntr.probOfInc1[self.codes[lanes]] * self.sampleProbs[lanes])
+        self.codes   [lanes]  = self.cntr.nextCode[self.codes[lanes]]
+        return self.cntr.valOfCode[self.codes[lanes]] / self.sampleProbs[lanes]
+
+    def lanesAtMax (self, lanes):
+        """
+        Among the given lanes, return those whose cntr reached its max value. If self.dwnSmple, these lanes are down-sampled, and an empty array is returned.
+        """
+        atMax = lanes[self.cntr.probOfInc1[self.codes[lanes]]==0]
+        if (self.dwnSmple and len(atMax)>0):
+            self.dwnSmpleLanes (atMax)
+            return atMax[:0]
+        return atMax
+
+    def runErs (self, erTypes):
+        """
+        Run all the lanes once, feeding the accumulators of all the error types in erTypes (each of which is either 'WrEr', 'WrRmse', 'RdEr', or 'RdRmse').
+        The write errors of a lane are collected upon each of its transitions, till its cntr's value reaches self.maxRealVal, 
+        or till its cntr reaches its max value (if not self.dwnSmple).
+        The read errors of a lane are collected at the real values 1, 2, ..., self.lastRealVal. Between two consecutive transitions of a lane, its cntr's value is constant. 
+        Hence, the read errors along each such interval are summed in closed form.
+        For 'WrEr' and 'RdEr', the errors are absolute relative errors; for 'WrRmse' and 'RdRmse', they are squared relative errors.
+        Returns a dict, where dict[erType] is a pair of arrays (sumsOfErs, numsOfPoints): sumsOfErs[i] (numsOfPoints[i]) is the sum (number) of the errors collected at lane i.
+        """
+        wrErTypes = [erType for erType in erTypes if erType in erOfRealValsOfErType]
+        rdErTypes = [erType for erType in erTypes if erType in sumOfErsOfIntervalsOfErType]
+        if (len(wrErTypes) + len(rdErTypes) < len(erTypes)):
+            settings.error (f'CntrLanes: some of the requested error modes {erTypes} are not supported')
+        self.rstLanes ()
+        sumsOfErs        = {erType : np.zeros (self.numOfLanes) for erType in erTypes}
+        numsOfWrPoints   = np.zeros (self.numOfLanes, dtype=int)
+        firstOfIntervals = np.ones  (self.numOfLanes, dtype=np.int64) # the cntr of lane i is cntrVals[i] since the real value firstOfIntervals[i]
+        cntrVals         = self.cntr.valOfCode[self.codes].astype (float)
+        allLanes         = np.arange (self.numOfLanes)
+        wrLanes          = allLanes if (len(wrErTypes)>0) else allLanes[:0] # the lanes still collecting write errors
+        rdLanes          = allLanes if (len(rdErTypes)>0) else allLanes[:0] # the lanes still collecting read errors
+        while (len(wrLanes)>0 or len(rdLanes)>0):
+            atMax   = self.lanesAtMax (np.union1d (wrLanes, rdLanes)) 
+            rdAtMax = np.intersect1d (atMax, rdLanes, assume_unique=True) # the cntrs of these lanes remain in their max value till the end of the experiment
+            for erType in rdErTypes:
+                sumsOfErs[erType][rdAtMax] += sumOfErsOfIntervalsOfErType[erType] (firstOfIntervals[rdAtMax], self.lastRealVal, cntrVals[rdAtMax])
+            wrLanes     = np.setdiff1d (wrLanes, atMax, assume_unique=True)
+            rdLanes     = np.setdiff1d (rdLanes, atMax, assume_unique=True)
+            lanes       = np.union1d (wrLanes, rdLanes)
+            cntrNewVals = self.advanceLanes (lanes)
+            realVals    = self.realVals[lanes]
+
+            isWrLane    = np.isin (lanes, wrLanes, assume_unique=True)
+            wrLanes     = lanes[isWrLane]
+            for erType in wrErTypes:
+                sumsOfErs[erType][wrLanes] += erOfRealValsOfErType[erType] (realVals[isWrLane], cntrNewVals[isWrLane])
+            numsOfWrPoints[wrLanes] += 1
+            wrLanes     = wrLanes[cntrNewVals[isWrLane] < self.maxRealVal]
+
+            isRdLane    = np.isin (lanes, rdLanes, assume_unique=True)
+            rdLanes     = lanes[isRdLane]
+            for erType in rdErTypes:
+                sumsOfErs[erType][rdLanes] += sumOfErsOfIntervalsOfErType[erType] (firstOfIntervals[rdLanes], np.minimum (realVals[isRdLane]-1, self.lastRealVal), cntrVals[rdLanes])
+            firstOfIntervals[rdLanes], cntrVals[rdLanes] = realVals[isRdLane], cntrNewVals[isRdLane]
+            rdLanes     = rdLanes[realVals[isRdLane] <= self.lastRealVal]
+        return {erType : (sumsOfErs[erType], numsOfWrPoints if (erType in wrErTypes) else np.full (self.numOfLanes, self.maxRealVal)) for erType in erTypes}
+
+# The error collected upon each transition, for each type of write error  
+erOfRealValsOfErType        = {'WrEr' : settings.absRelEr,               'WrRmse' : settings.sqRelEr}
+
+# The sum of the errors along each interval between transitions, for each type of read error  
+sumOfErsOfIntervalsOfErType = {'RdEr' : settings.sumAbsRelErOfIntervals, 'RdRmse' : settings.sumSqRelErOfIntervals}
@@ -0,0 +1,145 @@
+import math
+import numpy as np
+from scipy.signal import lfilter
+import settings
+
+class CntrMarkovChain (object):
+    """
+    Calculation of the expected errors of a single approximate counter, with no Monte-Carlo simulation (exact for small counters; see maxWindowSize below).
+    Every approximate counter is a pure-birth Markov chain over its codes: at each real increment, a cntr at the i-th state of the chain
+    (whose value is vals[i]) advances to the (i+1)-th state w.p. probs[i], and otherwise remains in its state.
+    Hence, the hitting time of state i+1, T[i+1], is T[i] plus a geometric r.v. with success prob' probs[i], where T[0]=0.
+    The distribution of T[i+1] is calculated from that of T[i] by a first-order linear filter, over a window of times outside of which the prob' mass is negligible.
+    The write errors are the errors at the hitting times; the read errors are summed over the intervals between consecutive hitting times, in closed form.
+    The window grows with the std of the hitting times, which, for large counters (e.g., 12-bit and 16-bit F2P), reaches millions of times.
+    Hence, once the window would exceed maxWindowSize, the times are merged into bins (of binSize consecutive times), whose size is doubled as needed (see coarsen).
+    Over bins, a geometric r.v. with success prob' p is approximated by a geometric number of bins, with success prob' 1-(1-p)**binSize, and the shift
+    of the mean is kept in an offset, so that the mean hitting times remain exact up to the bin size; a geometric r.v. whose mean is below binSize is taken as a shift by its mean.
+    Hence, the run time is bounded by maxWindowSize per state, while the errors are smooth over the bins, which are much smaller than the hitting times.
+    """
+
+    def __init__ (self, cntr, maxRealVal, eps=1e-12, maxWindowSize=2**12):
+        """
+        Inputs:
+        cntr          - a CntrMaster, whose tables (sortedCodes, sortedVals, probOfInc1) are pre-calculated.
+        maxRealVal    - the max real value to count.
+        eps           - the prob' mass dropped from each edge of the window of times, at each state.
+        maxWindowSize - the max length of the window, beyond which the times are merged into bins.
+        """
+        self.vals        = cntr.sortedVals
+        self.probs       = cntr.probOfInc1[cntr.sortedCodes]
+        self.maxRealVal  = maxRealVal
+        self.lastRealVal = math.ceil (maxRealVal) # the read errors are collected at the real values 1, 2, ..., lastRealVal
+        self.eps         = eps
+        self.maxWindowSize = maxWindowSize
+        if (self.vals[-1] < self.maxRealVal):
+            settings.error ('CntrMarkovChain: the cntr can reach max val={} which is smaller than the requested maxRealVal {}' .format (self.vals[-1], self.maxRealVal))
+        self.numOfWrPoints = int (np.argmax (self.vals >= self.maxRealVal)) # the write errors are collected at the hitting times of the states 1, 2, ..., numOfWrPoints
+
+    def nextHittingTimeDist (self, dist, firstTime, prob):
+        """
+        Given the distribution of the hitting time of some state, and the prob' prob to leave that state upon each increment,
+        return the distribution of the hitting time of the next state.
+        A distribution is given (and returned) as a pair (dist, firstTime), where dist[j] is the prob' that the hitting time is firstTime+j.
+        """
+        if (prob>=1): # the next state is reached by the next increment
+            return dist, firstTime+1
+        lenOfTail = math.ceil (math.log (self.eps) / math.log1p (-prob)) # the geometric r.v. exceeds lenOfTail w.p. < eps
+        dist      = lfilter ([0, prob], [1, -(1-prob)], np.concatenate ((dist, np.zeros (lenOfTail)))) # y[t] = (1-prob)*y[t-1] + prob*x[t-1]
+
+        # trim the edges of the window, where the prob' mass is negligible
+        cdf       = np.cumsum (dist)
+        first     = int (np.searchsorted (cdf, self.eps,          side='right'))
+        last      = int (np.searchsorted (cdf, cdf[-1]-self.eps, side='left'))
+        return dist[first:last+1], firstTime+first
+
+    def coarsen (self, dist, firstTime):
+        """
+        Double the size of the bins of a distribution of hitting times: dist[j] is the prob' of bin firstTime+j; return the distribution over the bins of twice the size.
+        """
+        if (firstTime % 2 == 1): # align the first bin to an even bin
+            dist = np.concatenate ((np.zeros (1), dist))
+        if (len(dist) % 2 == 1):
+            dist = np.concatenate ((dist, np.zeros (1)))
+        return dist[0::2] + dist[1::2], firstTime // 2
+
+    def sumOfRdErsFrom (self, sumOfErs, erOfRealVals, firstTime, lastTime, val):
+        """
+        Return an array, whose j-th entry is the sum of the read errors of a cntr with value val, as the real value runs over firstTime+j, ..., self.lastRealVal.
+        The sum over the real values above lastTime is calculated in closed form by sumOfErs; the sums within the window are calculated by cumulatively summing erOfRealVals.
+        """
+        realVals = np.arange (firstTime, lastTime+1)
+        return np.cumsum (erOfRealVals (realVals, val)[::-1])[::-1] + sumOfErs (lastTime+1, self.lastRealVal, val)
+
+    def sumsOfRdErDiffs (self, firsts, val, prevVal):
+        """
+        Return (absDiffs, sqDiffs), where absDiffs[j] (sqDiffs[j]) is the sum of the absolute (squared) relative read errors of a cntr with value val, minus that of a cntr with value prevVal,
+        as the real value runs over firsts[j], ..., self.lastRealVal. The sums are calculated in closed form (see settings.sumSqRelEr and settings.sumAbsRelEr),
+        by a single harmonic sum of each order, shared by val and prevVal.
+        """
+        firsts = np.minimum (firsts, self.lastRealVal+1) # the sum over an empty interval is 0
+        H      = settings.harmonicSum    (firsts, self.lastRealVal)
+        H2     = settings.harmonicSqrSum (firsts, self.lastRealVal)
+
+        # sum_{r=first}^{last} |r-v|/r = sum_{r=first}^{last} (1-v/r) + 2*sum_{r=first}^{splitPoint} (v/r-1), where splitPoint = min (floor(v), last)
+        def sumBelow (v):
+            splitPoint = min (math.floor (v), self.lastRealVal)
+            return np.where (firsts <= splitPoint, v*(H - settings.harmonicSum (splitPoint+1, self.lastRealVal)) - (splitPoint-firsts+1), 0)
+        return -(val-prevVal)*H + 2*(sumBelow (val) - sumBelow (prevVal)), -2*(val-prevVal)*H + (val**2-prevVal**2)*H2
+
+    def calcExpectedSumsOfErs (self):
+        """
+        Return a dict with the expected sums of errors along a single experiment, where:
+        'WrEr', 'WrSqEr' - the expected sums of the absolute / squared relative write errors, collected at the hitting times of the states 1, ..., self.numOfWrPoints.
+        'RdEr', 'RdSqEr' - the expected sums of the absolute / squared relative read errors, collected at the real values 1, ..., self.lastRealVal.
+        """
+        sums = {'WrEr'   : 0,
+                'WrSqEr' : 0,
+                'RdEr'   : settings.sumAbsRelEr (1, self.lastRealVal, self.vals[0]), # the read errors if the cntr remained in its initial state
+                'RdSqEr' : settings.sumSqRelEr  (1, self.lastRealVal, self.vals[0])}
+        dist, firstTime = np.ones (1), 0 # the hitting time of the initial state is 0
+        binSize, offset = 1, 0 # dist[j] is the prob' that the hitting time is in the bin of the times (firstTime+j)*binSize+offset, ..., (firstTime+j+1)*binSize+offset-1
+        for state in range (1, len(self.vals)):
+            if (state > self.numOfWrPoints and firstTime*binSize+offset >= self.lastRealVal): # no more errors to collect
+                break
+            prob = self.probs[state-1]
+            val  = self.vals[state]
+            binProb = 1 if (prob>=1) else -math.expm1 (binSize*math.log1p (-prob)) # the prob' to leave the state within a bin
+            while (binProb<1 and len(dist) + math.log (self.eps) / math.log1p (-binProb) > self.maxWindowSize): # the window would exceed maxWindowSize
+                dist, firstTime = self.coarsen (dist, firstTime)
+                binSize        *= 2
+                binProb         = -math.expm1 (binSize*math.log1p (-prob))
+            if (binSize>1): # the hitting times are over bins; sum the errors at the middle of each bin, in closed form
+                if (1/prob < binSize):
+                    offset += 1/prob
+                else:
+                    dist, firstTime = self.nextHittingTimeDist (dist, firstTime, binProb)
+                    offset         += 1/prob - binSize/binProb # the mean of the geometric number of bins is 1/binProb
+                shift      = math.floor (offset/binSize)
+                firstTime += shift
+                offset    -= shift*binSize
+                realVals   = np.maximum (1, np.round ((firstTime + np.arange (len(dist)))*binSize + offset + (binSize-1)/2)) # the middle of each bin
+                if (state <= self.numOfWrPoints):
+                    sums['WrEr']   += np.dot (dist, settings.absRelEr (realVals, val))
+                    sums['WrSqEr'] += np.dot (dist, settings.sqRelEr  (realVals, val))
+                absDiffs, sqDiffs = self.sumsOfRdErDiffs (realVals, val, self.vals[state-1])
+                sums['RdEr']   += np.dot (dist, absDiffs)
+                sums['RdSqEr'] += np.dot (dist, sqDiffs)
+                continue
+            dist, firstTime = self.nextHittingTimeDist (dist, firstTime, prob)
+            if (state <= self.numOfWrPoints):
+                realVals        = np.arange (firstTime, firstTime+len(dist))
+                sums['WrEr']   += np.dot (dist, settings.absRelEr (realVals, val))
+                sums['WrSqEr'] += np.dot (dist, settings.sqRelEr  (realVals, val))
+
+            # Upon hitting state at time t, the cntr's value changes from self.vals[state-1] to val for all the real values t, ..., self.lastRealVal
+            lastTime = min (firstTime+len(dist)-1, self.lastRealVal)
+            if (lastTime < firstTime):
+                continue
+            prevVal     = self.vals[state-1]
+            distInRange = dist[:lastTime-firstTime+1]
+            sums['RdEr']   += np.dot (distInRange, self.sumOfRdErsFrom (settings.sumAbsRelEr, settings.absRelEr, firstTime, lastTime, val) -
+                                                   self.sumOfRdErsFrom (settings.sumAbsRelEr, settings.absRelEr, firstTime, lastTime, prevVal))
+            sums['RdSqEr'] += np.dot (distInRange, self.sumOfRdErsFrom (settings.sumSqRelEr,  settings.sqRelEr,  firstTime, lastTime, val) -
+                                                   self.sumOfRdErsFrom (settings.sumSqRelEr,  settings.sqRelEr,  firstTime, lastTime, prevVal))
+        return sums
@@ -1,6 +1,7 @@
-import math, random, os, pickle, mmh3
-import PclFileParser, settings
-import Morris, F2P, CEDAR, RealCntr, SEAD
+import math, random, os, sys, pickle, mmh3
+from concurrent.futures import ProcessPoolExecutor
+import PclFileParser, settings, Workload, Trace, GroundTruth, HeavyHitters
+import Morris, F2P, CEDAR, RealCntr, SEAD, TetraStatic, TetraDynamic
 import numpy as np
 from printf import printf
 from datetime import datetime
@@ -12,6 +13,43 @@ def remove_existing_files():
     if os.path.exists('../res/RdRMSE.res'):
         os.remove('../res/RdRMSE.res')
 
+def genCntrMaster(mode, conf, numCntrs, packed=False, fileName=None):
+    """
+    Generate the CntrMaster of numCntrs counters of the given mode, whose settings (cntrSize, cntrMaxVal, hyperSize and so on) are taken from the conf dictionary.
+    The table-driven counters may be bit-packed, and kept in a memory-mapped file (see PackedArray); the Tetra counters and RealCntr cannot.
+    """
+    if (packed or fileName!=None) and mode in ['RealCntr', 'Tetra stat', 'Tetra dyn']:
+        settings.error(f'CountMinSketch: a packed or file-backed storage is not supported for {mode}')
+    if mode=='F2P':
+        return F2P.CntrMaster(cntrSize=conf['cntrSize'], hyperSize=conf['hyperSize'], hyperMaxSize=conf['hyperMaxSize'], mode='F2P', numCntrs=numCntrs, verbose=[], useTables=True, packed=packed, fileName=fileName)
+    elif mode=='Morris':
+        return Morris.CntrMaster(cntrSize=conf['cntrSize'], numCntrs=numCntrs, a=None, cntrMaxVal=conf['cntrMaxVal'],verbose=[], estimateAGivenCntrSize=False, packed=packed, fileName=fileName)
+    elif mode=='SEAD stat':
+        return SEAD.CntrMaster(cntrSize=conf['cntrSize'],  expSize=conf['seadExpSize'], mode='static',  numCntrs=numCntrs, verbose=[], useTables=True, packed=packed, fileName=fileName)
+    elif mode=='SEAD dyn':
+        return SEAD.CntrMaster(cntrSize=conf['cntrSize'], mode='dynamic',  numCntrs=numCntrs, verbose=[], useTables=True, packed=packed, fileName=fileName)
+    elif mode=='RealCntr':
+        return RealCntr.CntrMaster(numCntrs=numCntrs)
+    elif mode=='CEDAR':
+        return CEDAR.CntrMaster(cntrSize=conf['cntrSize'], delta=None, numCntrs=numCntrs, verbose=[], cntrMaxVal=conf['cntrMaxVal'], packed=packed, fileName=fileName)  # Initialize the CEDAR counter
+    elif mode=='Tetra stat':
+        return TetraStatic.CntrMaster(cntrSize=conf['cntrSize'], tetraSize=conf['tetraSize'], numCntrs=numCntrs, verbose=[], useTables=True)
+    elif mode=='Tetra dyn':
+        return TetraDynamic.CntrMaster(cntrSize=conf['cntrSize'], tetraMaxSize=conf['tetraMaxSize'], numCntrs=numCntrs, verbose=[], useTables=True)
+    settings.error(f'Sorry, the mode {mode} that you requested is not supported')
+
+# isDup[j, row] is True iff the counter mappedCntrs[j, row] already appears in mappedCntrs[j, :row], namely, flow j is mapped to it by an earlier hash function.
+# This never happens when the rows are disjoint, yet it may happen when the hash functions share the counters (see SpectralBloomFilter)
+calcIsDup = lambda mappedCntrs : np.array([(mappedCntrs[:, :row] == mappedCntrs[:, row:row+1]).any(axis=1) for row in range(mappedCntrs.shape[1])], dtype=bool).T.reshape(mappedCntrs.shape)
+
+def calcCntrsSizeInBytes(cntrs):
+    """
+    Return the memory occupied by the given counters, in bytes. For counters kept in a Python list (Tetra), the sizes of the list and of its items are summed.
+    """
+    if isinstance(cntrs, list):
+        return sys.getsizeof(cntrs) + sum([sys.getsizeof(cntr) for cntr in cntrs])
+    return cntrs.nbytes
+
 class CountMinSketch:
     def __init__(self,
                  width,         # the number of counters per row.
@@ -19,94 +57,367 @@ class CountMinSketch:
                  num_flows,     #the total number of flows to be estimated.
                  mode,          # It is one of the counter modes.
                  conf,          # it is a dictionary that holds the value of cntrSize, cntrMaxVal, hyperSize and so on.
-                 outPutFileName #this a files name which we use with res and pcl file. Eg. outPutFileName.res and outPutFileName.pcl
+                 outPutFileName, #this a files name which we use with res and pcl file. Eg. outPutFileName.res and outPutFileName.pcl
+                 conservativeUpdate=False, # when True, upon a flow's arrival, increment only the mapped counters whose value is below the flow's new estimate (see conservativeIncFlow).
+                 packed=False,  # when True, the codes of the approximate counters are bit-packed, at exactly cntrSize bits per counter (see PackedArray). Not relevant to RealCntr.
+                 fileName=None, # when given, the packed counters are kept in this memory-mapped file, so the sketch may be larger than the RAM, and can be reopened after a restart (see PackedArray.openCntrsFile).
+                 dwnSmple=False, # when True, once any counter reaches its max value, all the counters are halved, and so is the global sampling probability (see dwnSmpleCntrs). Not relevant to RealCntr.
+                 workload=None, # a dict of the params of the workload used by calculateNormalizedRMSE (see Workload.genFlowBlocks), e.g. {'dist' : 'zipf', 'alpha' : 1.1, 'seed' : 1}. When None, the flows are drawn uniformly.
+                 numOfHeavyHitters=0, # when positive, the (at most) numOfHeavyHitters flows with the highest estimates are tracked as heavy-hitter candidates (see HeavyHitters, topK, heavyHittersAbove).
+                 decayFactor=None, # time-decayed mode: the factor (0 < decayFactor < 1), by which all the counters are multiplied upon each decay (see decay).
+                 decayPeriod=None  # when given (with decayFactor), the sketch decays automatically after every decayPeriod increments. Else, the caller decays it, e.g. once per time interval.
                  ):
         """
-        pair: a tuple of row and column indices used to compute the corresponding counter index. It is used to compute the index of each counter. Instead of adding row with column which gives us wrong mapping, i have
-        paired the depth number with the hash value and i have inserted them to the pair list to use the index of the pair as a counter index.
+        The counters are kept in a single flat array, where row i occupies the counters i*width, ..., i*width+width-1.
+        Hence, the index of the counter of a flow in row i is calculated arithmetically as i*width + (the column of the flow in row i) - see mappedCntrsOfFlow.
          """
         self.mode, self.width, self.depth, self.num_flows = mode, width, depth, num_flows
-        self.numCntrs        =self.width*self.depth
+        self.numCntrs, self.rowOffsets = self.calcLayout()
         # Access the values within the conf dictionary using keys
+        self.conf           =conf
         self.cntrSize       =conf['cntrSize']
         self.cntrMaxVal     =conf['cntrMaxVal']
         self.hyperSize      =conf['hyperSize']
         self.hyperMaxSize   =conf['hyperMaxSize']
         self.outPutFileName =outPutFileName
+        self.conservativeUpdate = conservativeUpdate
+        self.packed         =packed
+        self.fileName       =fileName
+        self.dwnSmple       =dwnSmple and (self.mode!='RealCntr') # the real counters never overflow
+        self.workload       ={} if (workload==None) else workload
+        self.sampleProb     =1 # each arriving flow is sampled w.p. sampleProb; the estimates are scaled by 1/sampleProb
+        self.hashSeed       =0 # the seed of the mmh3 digest of the flows (see mappedCntrsOfFlow)
+        self.mappedCntrsOfIds = None # a cache of the mapped counters of the flow IDs 0, 1, ... (see cacheMappedCntrs)
+        self.heavyHitters   =HeavyHitters.HeavyHitters(capacity=numOfHeavyHitters) if (numOfHeavyHitters>0) else None
+        if decayFactor!=None and not (0 < decayFactor < 1):
+            settings.error('CountMinSketch: decayFactor={} should be in (0, 1)'.format(decayFactor))
+        self.decayFactor    =decayFactor
+        self.decayPeriod    =decayPeriod
+        self.numOfIncsSinceDecay = 0
         self.verbose        =[5, 6, 8]
-        self.pair           = [(i, j) for i in range(depth) for j in range(width)]
-        if self.mode=='F2P':
-            self.countersArray = F2P.CntrMaster(cntrSize=self.cntrSize, hyperSize=self.hyperSize, hyperMaxSize=self.hyperMaxSize, mode='F2P', numCntrs=self.numCntrs, verbose=[])
-        elif self.mode=='Morris':
-            self.countersArray = Morris.CntrMaster(cntrSize=self.cntrSize, numCntrs=self.numCntrs, a=None, cntrMaxVal=self.cntrMaxVal,verbose=[], estimateAGivenCntrSize=False)
-        elif (self.mode == 'SEAD stat'):
-            self.expSize = conf['seadExpSize']
-            self.countersArray = SEAD.CntrMaster(cntrSize=self.cntrSize,  expSize=self.expSize, mode='static',  numCntrs=self.numCntrs, verbose=[])
-        elif (self.mode == 'SEAD dyn'):
-            self.countersArray = SEAD.CntrMaster(cntrSize=self.cntrSize,  expSize=self.expSize, mode='dynamic',  numCntrs=self.numCntrs, verbose=[])
-        elif self.mode=='RealCntr':
-             self.countersArray=RealCntr.CntrMaster(numCntrs=self.numCntrs)
-        elif self.mode=='CEDAR':
-            self.countersArray = CEDAR.CntrMaster(cntrSize=self.cntrSize, delta=None, numCntrs=self.numCntrs, verbose=[], cntrMaxVal=self.cntrMaxVal)  # Initialize the CEDAR counter
-        else:
-            print(f'Sorry, the mode {self.mode} that you requested is not supported')
+        self.countersArray  =genCntrMaster(mode=self.mode, conf=self.conf, numCntrs=self.numCntrs, packed=self.packed, fileName=self.fileName)
+        if self.fileName!=None and self.countersArray.cntrs.meta[0] > 0: # a reopened sketch: restore the sampling probability saved by flush
+            self.sampleProb = float(self.countersArray.cntrs.meta[0])
+
+    def calcLayout(self):
+        """
+        Return (the number of counters, a list of the index of the first counter of each row). Here, the rows are disjoint, so there are width*depth counters.
+        """
+        return self.width*self.depth, [row*self.width for row in range(self.depth)]
+
+    def cntrsSizeInBytes(self):
+        # Return the memory occupied by the counters, in bytes (see calcCntrsSizeInBytes)
+        return calcCntrsSizeInBytes(self.countersArray.cntrs)
+
+    def rst(self):
+        """
+        Reset the sketch to its initial (empty) state.
+        """
+        self.countersArray.rstAllCntrs()
+        self.sampleProb          = 1
+        self.numOfIncsSinceDecay = 0
+        if self.heavyHitters!=None:
+            self.heavyHitters.rst()
+
+    def decay(self, factor=None):
+        """
+        Age the sketch: multiply all the counters by factor (by self.decayFactor, if factor is None) in a single vectorized pass of incCntrs (mult=True), 
+        using the unbiased rounding of the counters. Hence, the estimate of a flow is an exponentially-decayed sum of its past increments.
+        The estimates of the heavy-hitter candidates, if tracked, are decayed as well.
+        """
+        factor = self.decayFactor if (factor==None) else factor
+        if factor==None:
+            settings.error('CountMinSketch.decay: no decay factor was given. Please generate the sketch with decayFactor, or call decay with a factor')
+        self.countersArray.incCntrs(indices=np.arange(self.numCntrs), factors=factor, mult=True)
+        self.numOfIncsSinceDecay = 0
+        if self.heavyHitters!=None:
+            self.heavyHitters.scale(factor)
+
+    def decayIfDue(self, numOfIncs):
+        """
+        Count numOfIncs increments, and if the sketch decays automatically, apply a decay per each decayPeriod increments passed since the last decay.
+        The increments left over beyond the last full period are carried over to the next period.
+        """
+        if self.decayFactor==None or self.decayPeriod==None:
+            return
+        self.numOfIncsSinceDecay += numOfIncs
+        numOfDecays = self.numOfIncsSinceDecay // self.decayPeriod
+        if numOfDecays > 0:
+            numOfLeftIncs = self.numOfIncsSinceDecay % self.decayPeriod
+            self.decay(self.decayFactor**numOfDecays) # a manual decay resets the count of increments; hence, the leftover is restored after it
+            self.numOfIncsSinceDecay = numOfLeftIncs
+
+    def flush(self):
+        """
+        Snapshot a file-backed sketch: write any changes in its counters, and its sampling probability, to its file (see PackedArray.openCntrsFile).
+        The sketch can then be reopened by generating a sketch with the same params and fileName.
+        """
+        if self.fileName!=None:
+            self.countersArray.cntrs.meta[0] = self.sampleProb
+            self.countersArray.cntrs.flush()
+
+    def mappedCntrsOfFlow(self, flow):
+        """
+        Return the list of the indices of the counters to which the flow is mapped - a single counter in each row.
+        All the depth hash functions are derived from a single 128-bit mmh3 digest of the flow, by double hashing (Kirsch and Mitzenmacher):
+        the column of the flow in row i is (h1 + i*h2) % width, where h1, h2 are the lower and upper 64 bits of the digest.
+        """
+        digest = mmh3.hash128(str(flow), self.hashSeed, signed=False)
+        h1, h2 = digest & 0xFFFFFFFFFFFFFFFF, digest >> 64
+        return [self.rowOffsets[row] + (h1 + row*h2) % self.width for row in range(self.depth)]
 
     def incNQueryFlow(self, flow):
         """
         When a flow arrives, it is hashed using the hash functions, and the corresponding counters are incremented.
         At the end,  the minimum value of the corresponding counters is turned as the estimate.
+        In downsampling mode, the flow is sampled w.p. self.sampleProb, and the estimate is scaled by 1/self.sampleProb.
+        If heavy hitters are tracked, the flow's candidacy is updated by the estimate.
         """
-        cntrValAfterInc = [0]*self.depth
-        for mappedCntr in range(self.depth):
-            counterIndex               = self.pair.index((mappedCntr, mmh3.hash(str(flow), seed=mappedCntr) % self.width))
-            cntrValAfterInc[mappedCntr]=self.countersArray.incCntr(cntrIdx=counterIndex, factor=int(1), mult=False, verbose=[])['val']
-        return min(cntrValAfterInc)
+        if self.sampleProb<1 and random.random() >= self.sampleProb: # the flow is not sampled
+            estimate = self.queryFlow(flow)
+        else:
+            if self.conservativeUpdate:
+                cntrVals = self.conservativeIncFlow(np.array(self.mappedCntrsOfFlow(flow)))
+            else: # a counter to which the flow is mapped by several hash functions is incremented only once
+                cntrVals = [self.countersArray.incCntr(cntrIdx=counterIndex, factor=int(1), mult=False, verbose=[])['val'] for counterIndex in np.unique(self.mappedCntrsOfFlow(flow)).tolist()]
+            if self.dwnSmple and max(cntrVals) >= self.countersArray.cntrMaxVal: # a counter overflowed --> downsample
+                self.dwnSmpleCntrs()
+                estimate = self.queryFlow(flow)
+            else:
+                estimate = min(cntrVals) / self.sampleProb
+        if self.heavyHitters!=None:
+            self.heavyHitters.update(flow, estimate)
+        self.decayIfDue(1)
+        return estimate
 
     def incFlow(self, flow):
         # increment the mapped counters values
-        for seed in range(self.depth):
-                counterIndex = self.pair.index((seed,mmh3.hash(str(flow), seed) % self.width))
-                self.countersArray.incCntr(cntrIdx=counterIndex, factor=int(1), mult=False, verbose=[])['val']
+        self.incNQueryFlow(flow)
+
+    def dwnSmpleCntrs(self):
+        """
+        Downsample the sketch: halve all the counters in a single vectorized pass of incCntrs (mult=True), using the unbiased rounding of the counters, and halve the global sampling probability.
+        """
+        self.countersArray.incCntrs(indices=np.arange(self.numCntrs), factors=1/2, mult=True)
+        self.sampleProb /= 2
+
+    def conservativeIncFlow(self, mappedCntrs, weight=1):
+        """
+        Conservative update: increment a flow, which is mapped to the counters mappedCntrs, by weight, while raising only the counters whose value is below the flow's new estimate, 
+        namely, (the minimum value of the mapped counters) + weight. Each such counter is increased by the difference between the new estimate and its value, as queried by queryCntrs;
+        as the counters are probabilistic, this raises each of them to the new estimate in expectation. The other mapped counters are left intact.
+        Note that with probabilistic counters, the estimate tracks the minimum of several noisy counters; hence, it tends to be below the flow's real size.
+        Returns the array of the values of the (distinct) mapped counters after the increment; the flow's (unscaled) estimate is their minimum.
+        """
+        mappedCntrs      = np.unique(mappedCntrs) # a counter to which the flow is mapped by several hash functions should be raised only once
+        cntrVals         = self.countersArray.queryCntrs(mappedCntrs)
+        newEstimate      = cntrVals.min() + weight
+        isBelow          = cntrVals < newEstimate
+        cntrVals[isBelow]= self.countersArray.incCntrs(indices=mappedCntrs[isBelow], factors=newEstimate - cntrVals[isBelow])
+        return cntrVals
 
     def queryFlow(self, flow):
         # Query the minimum Morris, CEDAR, real counter value for the given flow by hashing and finding the minimum value among the appropriate counters
-        minNum = math.inf
-        for seed in range(self.depth):
-            counterIndex = self.pair.index((seed,mmh3.hash(str(flow), seed) % self.width))
-            self.countersArray.queryCntr(counterIndex)
-            minNum       = min(self.countersArray.queryCntr(counterIndex)['val'], minNum)
-        return minNum
+        return min([self.countersArray.queryCntr(counterIndex)['val'] for counterIndex in self.mappedCntrsOfFlow(flow)]) / self.sampleProb
+
+    def mappedCntrsOfFlows(self, flows):
+        """
+        Hash a batch of flows in bulk: each distinct flow is hashed only once.
+        flows is either a NumPy array of flow keys, or a bytes buffer of uint64 flow keys.
+        Returns a pair (mappedCntrs, inverse), where mappedCntrs[j] is the array of the indices of the counters to which the j-th distinct flow is mapped (see mappedCntrsOfFlow),
+        and inverse[i] is the number of the distinct flow of flows[i].
+        """
+        if isinstance(flows, (bytes, bytearray, memoryview)):
+            flows = np.frombuffer(flows, dtype=np.uint64)
+        distinctFlows, inverse = np.unique(np.asarray(flows), return_inverse=True)
+        if self.areCachedIds(distinctFlows):
+            return self.mappedCntrsOfIds[distinctFlows], inverse.ravel()
+        mappedCntrs            = np.array([self.mappedCntrsOfFlow(flow) for flow in distinctFlows.tolist()], dtype=np.int64).reshape(-1, self.depth)
+        return mappedCntrs, inverse.ravel()
+
+    # True iff the mapped counters of all the given (sorted, distinct) flows are cached (see cacheMappedCntrs)
+    areCachedIds = lambda self, distinctFlows : self.mappedCntrsOfIds is not None and distinctFlows.dtype.kind in 'iu' and len(distinctFlows) > 0 and \
+                                                 distinctFlows[0] >= 0 and distinctFlows[-1] < len(self.mappedCntrsOfIds)
+
+    def cacheMappedCntrs(self, numOfIds):
+        """
+        Cache the mapped counters of the flow IDs 0, 1, ..., numOfIds-1 (e.g., the flows of Workload), so that mappedCntrsOfFlows looks them up, rather than hashing them again.
+        When numOfIds is 0, the cache is dropped.
+        """
+        self.mappedCntrsOfIds = None
+        if numOfIds > 0:
+            self.mappedCntrsOfIds = self.mappedCntrsOfFlows(np.arange(numOfIds))[0]
+
+    def incFlows(self, flows, weights=None):
+        """
+        Increment a batch of flows, where the i-th flow is incremented by weights[i] (by 1, if weights is None).
+        The updates are grouped by counter index, so the counters array is updated by a single call to incCntrs per row, where each counter is increased by the total weight of the flows mapped to it.
+        In conservative-update mode, the outcome depends upon the order of the flows; hence, the flows are incremented one after the other (yet, each distinct flow is hashed only once).
+        In downsampling mode, each flow is sampled w.p. self.sampleProb. If the batch would make any counter reach its max value, the sketch is downsampled, 
+        and the sampled flows are further sampled w.p. 1/2, before the batch is applied.
+        In automatically time-decayed mode, the due decays are applied after the batch (see decayIfDue).
+        If heavy hitters are tracked, the candidacy of each distinct flow in the batch is updated by its estimate after the batch (see updateHeavyHitters).
+        """
+        mappedCntrs, inverse = self.mappedCntrsOfFlows(flows)
+        weights              = np.ones(len(inverse), dtype=np.int64) if (weights is None) else np.asarray(weights)
+        numOfIncs            = len(inverse)
+        if self.conservativeUpdate:
+            for flowNum, weight in zip(inverse.tolist(), weights.tolist()):
+                if self.sampleProb<1 and random.random() >= self.sampleProb: # the flow is not sampled
+                    continue
+                cntrVals = self.conservativeIncFlow(mappedCntrs[flowNum], weight)
+                if self.dwnSmple and cntrVals.max() >= self.countersArray.cntrMaxVal: # a counter overflowed --> downsample
+                    self.dwnSmpleCntrs()
+            self.updateHeavyHitters(flows)
+            self.decayIfDue(numOfIncs)
+            return
+        if self.sampleProb<1:
+            isSampled         = np.random.random(len(inverse)) < self.sampleProb
+            inverse, weights  = inverse[isSampled], weights[isSampled]
+        updatesOfRows = self.groupByCntrs(mappedCntrs, inverse, weights)
+        while self.dwnSmple and any([(self.countersArray.queryCntrs(cntrIdxs) + factors).max(initial=0) >= self.countersArray.cntrMaxVal for cntrIdxs, factors in updatesOfRows]):
+            self.dwnSmpleCntrs()
+            isSampled         = np.random.random(len(inverse)) < 1/2
+            inverse, weights  = inverse[isSampled], weights[isSampled]
+            updatesOfRows     = self.groupByCntrs(mappedCntrs, inverse, weights)
+        cntrMaxVals = [self.countersArray.incCntrs(indices=cntrIdxs, factors=factors).max(initial=0) for cntrIdxs, factors in updatesOfRows]
+        if self.dwnSmple and max(cntrMaxVals) >= self.countersArray.cntrMaxVal: # the rounding made a counter reach its max value
+            self.dwnSmpleCntrs()
+        self.updateHeavyHitters(flows)
+        self.decayIfDue(numOfIncs)
+
+    def updateHeavyHitters(self, flows):
+        """
+        If heavy hitters are tracked, update the candidacy of each distinct flow of a batch by its current estimate, as given by queryFlows.
+        Hence, the subclasses, whose estimates differ, need not override it.
+        """
+        if self.heavyHitters==None:
+            return
+        if isinstance(flows, (bytes, bytearray, memoryview)):
+            flows = np.frombuffer(flows, dtype=np.uint64)
+        distinctFlows = np.unique(np.asarray(flows))
+        for flow, estimate in zip(distinctFlows.tolist(), self.queryFlows(distinctFlows).tolist()):
+            self.heavyHitters.update(flow, estimate)
+
+    def topK(self, k=None):
+        """
+        Return a list of (flow, estimate) of the k heavy-hitter candidates with the highest estimates, in decreasing order of estimates (see HeavyHitters.topK).
+        """
+        if self.heavyHitters==None:
+            settings.error('CountMinSketch.topK: heavy hitters are not tracked. Please generate the sketch with numOfHeavyHitters>0')
+        return self.heavyHitters.topK(k)
+
+    def heavyHittersAbove(self, threshold):
+        """
+        Return a list of (flow, estimate) of the heavy-hitter candidates whose estimate is at least threshold, in decreasing order of estimates (see HeavyHitters.aboveThreshold).
+        """
+        if self.heavyHitters==None:
+            settings.error('CountMinSketch.heavyHittersAbove: heavy hitters are not tracked. Please generate the sketch with numOfHeavyHitters>0')
+        return self.heavyHitters.aboveThreshold(threshold)
+
+    def groupByCntrs(self, mappedCntrs, inverse, weights):
+        """
+        Group the updates of a batch of flows by counter index, where the i-th flow is the distinct flow inverse[i], whose mapped counters are mappedCntrs[inverse[i]], and its weight is weights[i].
+        Returns a list with a pair (cntrIdxs, factors) per row, where cntrIdxs are the (distinct) indices of the counters updated in the row, and factors are the total weights of the flows mapped to them.
+        A flow is counted only once in a counter to which it is mapped by several hash functions (see calcIsDup).
+        """
+        updatesOfRows = []
+        isDup         = calcIsDup(mappedCntrs)
+        for row in range(self.depth):
+            cntrIdxs, inverseOfCntrs = np.unique(mappedCntrs[inverse, row], return_inverse=True)
+            updatesOfRows.append((cntrIdxs, np.bincount(inverseOfCntrs.ravel(), weights=weights * ~isDup[inverse, row], minlength=len(cntrIdxs))))
+        return updatesOfRows
+
+    def ingestTrace(self, fileName, **traceParams):
+        """
+        Replay a recorded trace file: read its records in chunks (see Trace.genTraceBlocks, which gets traceParams, e.g. format, recordDtype, weightField), 
+        and increment each chunk of flows by their weights (e.g., the bytes of each packet), by incFlows.
+        Returns the number of records ingested.
+        """
+        numOfRecords = 0
+        for flows, weights in Trace.genTraceBlocks(fileName, **traceParams):
+            self.incFlows(flows, weights)
+            numOfRecords += len(flows)
+        return numOfRecords
+
+    def queryFlows(self, flows):
+        """
+        Query a batch of flows. Returns an array, whose i-th entry is the estimate of flows[i], namely, the minimum value of the counters to which flows[i] is mapped.
+        """
+        mappedCntrs, inverse = self.mappedCntrsOfFlows(flows)
+        return self.countersArray.queryCntrs(mappedCntrs.ravel()).reshape(-1, self.depth).min(axis=1)[inverse] / self.sampleProb
+
+    def checkMergeable(self, other):
+        # Verify that the other sketch has identical width, depth, mode and conf, so that it may be merged into this one (see merge)
+        if (self.width, self.depth, self.mode, self.conf) != (other.width, other.depth, other.mode, other.conf):
+            settings.error('CountMinSketch.merge: cannot merge a sketch of width={}, depth={}, mode={}, conf={} with a sketch of width={}, depth={}, mode={}, conf={}'
+                           .format(self.width, self.depth, self.mode, self.conf, other.width, other.depth, other.mode, other.conf))
 
-    def calculateNormalizedRMSE(self):
+    def merge(self, other):
         """
-        This simulation stores the real frequency of a flow at the index of a flow and it queries the estimated value of the flow
-        from the array counter after incrementing it using the methodology of count min sketch.
+        Merge another sketch into this one, so that this sketch would represent the union of the flows ingested by both sketches.
+        Both sketches should have identical width, depth, mode and conf; hence, every flow is mapped to the same counters in both sketches.
+        Each counter of this sketch is increased by the value of the respective counter of the other sketch, using incCntrs (mult=False).
+        For RealCntr, this is an element-wise sum; for the approximate counters, the sum is rounded by the counter's own (statistically unbiased) increment semantics.
+        If the sketches were downsampled, this sketch is first downsampled to the sampling probability of the other, and the other's counters are scaled to this sketch's sampling probability.
+        If heavy hitters are tracked, the candidates of both sketches are re-estimated by the merged sketch.
+        """
+        self.checkMergeable(other)
+        while self.sampleProb > other.sampleProb:
+            self.dwnSmpleCntrs()
+        otherVals = other.countersArray.queryCntrs(np.arange(self.numCntrs)) * (self.sampleProb / other.sampleProb)
+        cntrIdxs  = np.flatnonzero(otherVals) # merging a zero counter changes nothing
+        cntrVals  = self.countersArray.incCntrs(indices=cntrIdxs, factors=otherVals[cntrIdxs])
+        if self.dwnSmple and cntrVals.max(initial=0) >= self.countersArray.cntrMaxVal: # a counter overflowed --> downsample
+            self.dwnSmpleCntrs()
+        if self.heavyHitters!=None:
+            candidates = list(self.heavyHitters.posOfFlow) + ([] if (other.heavyHitters==None) else list(other.heavyHitters.posOfFlow))
+            for flow in candidates:
+                self.heavyHitters.update(flow, self.queryFlow(flow))
+
+    def calculateNormalizedRMSE(self, numOfCheckpoints=100, logSpaced=True):
+        """
+        This simulation keeps the real frequency of each flow in a ground-truth tracker (see GroundTruth), and increments the counters by the flows of the workload
+        using the methodology of count min sketch.
+        A point is collected per increment: the squared relative error of the incremented flow. To avoid querying the sketch upon each increment, the errors are sampled
+        at numOfCheckpoints checkpoints of the stream (log-spaced, if logSpaced; see GroundTruth.genCheckpoints): at each checkpoint, all the flows that arrived since the previous
+        checkpoint are queried at once (see queryFlows), and the error of each such flow is counted once per its increments within the interval.
+        Hence, the number of points is the number of increments, regardless of numOfCheckpoints, and the metric has the scale of the per-increment errors;
+        when numOfCheckpoints equals the number of increments, it's exactly the per-increment error.
         It calculates the Read Root Mean Square Error (RMSE), Normalized RMSE, normalized RMSE average with its confidence interval
         for different counter modes.At the end, it writes or prints the output to res and pcl files as a dictionary.
         """
         numOfExps        =1
         sumOfAllErors    = [0] * numOfExps
         numOfPoints      = [0] * numOfExps # self.numOfPoints[j] will hold the number of points collected for statistic at experiment j.
+        checkpoints      = GroundTruth.genCheckpoints(numOfIncs=self.cntrMaxVal, numOfCheckpoints=numOfCheckpoints, logSpaced=logSpaced) # numOfIncrements is equal with conf['cntrMaxVal']
+        groundTruth      = GroundTruth.GroundTruth(numFlows=self.num_flows)
+        self.cacheMappedCntrs(self.num_flows) # the flows are hashed once, rather than in each block and at each checkpoint
         for expNum in range(numOfExps):
-            exactFlowCntr      = [0] * self.num_flows
-            sampleProb    = 1
-            self.countersArray.rstAllCntrs()  # To reset the value of all counters
+            groundTruth.rst()
+            self.rst()  # To reset the value of all counters
+            nxtCheckpoint   = 0 # the index of the next checkpoint
             print('Started running experiment {} at t={}. mode={}, cntrSize={}, cntrMaxVal={}' .format (
                      expNum, datetime.now().strftime("%H:%M:%S"), self.mode, self.cntrSize, self.cntrMaxVal))
-            # Increment the counters randomly and update the real values
-            for incNum in range(self.cntrMaxVal): # numOfIncrements is equal with conf['cntrMaxVal']
-                flow                 = np.random.randint(self.num_flows)
-                if self.queryFlow(flow) < self.cntrMaxVal:
-                    # Choose a random flow to increment
-                    cntrVal=self.queryFlow(flow)
-                    exactFlowCntr[flow] += 1  # increment the real counter value of the flow upon its arrival
-                    if sampleProb==1 or random.random() < sampleProb:
-                        # curRelativeErr = ((realValCntr - cntrVal)/realValCntr)**2
-                        sumOfAllErors[expNum]    +=(((exactFlowCntr[flow] - self.incNQueryFlow(flow))/exactFlowCntr[flow])**2)
-                        numOfPoints[expNum]      += 1
-                        if (settings.VERBOSE_DETAILS in self.verbose):
-                            print ('mode= {}, expNum= {}, flow= {}, exactFlowVal={:.0f}, cntrOldVal={:.0f}, cntrNewVal={:.0f}, cntrMaxVal={:.0f}'
-                                   .format (self.mode, expNum, flow, exactFlowCntr[flow], cntrVal, self.queryFlow(flow), self.cntrMaxVal))
+            # Increment the counters by the flows of the workload, consumed block by block, and update the real values. A block is split at the checkpoints
+            for flows in Workload.genFlowBlocks(numFlows=self.num_flows, numOfIncs=self.cntrMaxVal, **self.workload):
+                while len(flows) > 0:
+                    chunk, flows = np.split(flows, [checkpoints[nxtCheckpoint] - groundTruth.numOfIncs])
+                    self.incFlows(chunk)
+                    groundTruth.add(chunk)
+                    if groundTruth.numOfIncs < checkpoints[nxtCheckpoint]:
+                        continue
+                    # Reached a checkpoint: query all the flows that arrived since the previous checkpoint
+                    flowsInInterval = groundTruth.flowsInInterval()
+                    sumOfErs, numOfIncs = groundTruth.sumSqRelErs(self.queryFlows(flowsInInterval), flowsInInterval, weights=groundTruth.incsInInterval[flowsInInterval])
+                    sumOfAllErors[expNum] += sumOfErs
+                    numOfPoints[expNum]   += numOfIncs
+                    groundTruth.rstInterval()
+                    nxtCheckpoint   += 1
+                    if (settings.VERBOSE_DETAILS in self.verbose):
+                        print ('mode= {}, expNum= {}, numOfIncs= {}, numOfFlows= {}, sumOfSqRelErs={:.4f}, cntrMaxVal={:.0f}'
+                               .format (self.mode, expNum, groundTruth.numOfIncs, len(flowsInInterval), sumOfErs, self.cntrMaxVal))
+        self.cacheMappedCntrs(0)
 
         # Compute the Root Mean Square Error (RMSE) and Normalized RMSE over all experiments using the sumOfAllErors
         RMSE                 = [math.sqrt(sumOfAllErors[expNum]/numOfPoints[expNum]) for expNum in range(numOfExps)]
@@ -120,6 +431,9 @@ class CountMinSketch:
         dict                 = {
                                 'mode'    :self.mode,
                                 'numCntrs': self.numCntrs,
+                                'conservativeUpdate': self.conservativeUpdate,
+                                'cntrsSizeInBytes': self.cntrsSizeInBytes(),
+                                'workload': self.workload.get('dist', 'uniform'),
                                 'Avg'     : normRmseAvg,
                                 'Lo'      : normRmseConfInterval[0],
                                 'Hi'      : normRmseConfInterval[1]
@@ -140,6 +454,41 @@ class CountMinSketch:
         resFile = open (f'../res/{self.outPutFileName}.res', 'a+')
         printf (resFile, f'{dict}\n\n')
 
+def ingestShard(sketchParams, flows, weights=None, seed=None):
+    """
+    Generate a CountMinSketch by sketchParams (a dict of the arguments of CountMinSketch.__init__), ingest the given flows into it, and return it.
+    seed - when given, the random generators of the worker are seeded by it (an int, a list of ints, or an np.random.SeedSequence - see settings.seedRandGens).
+    Run by the worker processes of ingestSharded.
+    """
+    if seed!=None:
+        settings.seedRandGens(seed)
+    sketch = CountMinSketch(**sketchParams)
+    sketch.incFlows(flows, weights)
+    return sketch
+
+def ingestSharded(flows, sketchParams, numOfProcs, weights=None, masterSeed=None):
+    """
+    Ingest a flow trace using a pool of numOfProcs processes: the trace is split into numOfProcs contiguous shards, each worker builds a sketch of its shard,
+    and the sketches are merged (see CountMinSketch.merge) at the end.
+    flows        - a NumPy array of flow keys; weights - the respective weights (when None, each flow is incremented by 1).
+    sketchParams - a dict of the arguments of CountMinSketch.__init__, common to all the shards.
+    masterSeed   - the entropy of the seeds. The random generators of the worker of shard i are always seeded by the i-th seed sequence spawned from np.random.SeedSequence(masterSeed),
+                   and those of the merges by the last one, so that the shards draw independent random streams (forked workers would otherwise inherit the same state).
+                   When masterSeed is given, the results are reproducible; when None, fresh entropy is drawn.
+    Returns the merged sketch.
+    """
+    flows       = np.asarray(flows)
+    shards      = np.array_split(np.arange(len(flows)), numOfProcs)
+    seedSeqs    = np.random.SeedSequence(masterSeed).spawn(numOfProcs+1)
+    with ProcessPoolExecutor(max_workers=numOfProcs) as pool:
+        futures = [pool.submit(ingestShard, sketchParams, flows[shard], None if (weights is None) else np.asarray(weights)[shard], seedSeqs[shardNum])
+                   for shardNum, shard in enumerate(shards)]
+        sketch  = futures[0].result()
+        settings.seedRandGens(seedSeqs[numOfProcs]) # the merges are probabilistic, too
+        for future in futures[1:]:
+            sketch.merge(future.result())
+    return sketch
+
 def main():
     """
     This iterates over different configurations, counter modes and widths with a fixed number of depth. the configuration which is a
@@ -0,0 +1,145 @@
+import mmh3
+import numpy as np
+import settings
+from CountMinSketch import CountMinSketch, genCntrMaster, calcCntrsSizeInBytes
+
+class CountSketch(CountMinSketch):
+    """
+    A count sketch (Charikar, Chen and Farach-Colton): as in the count min sketch, each flow is mapped to a single counter in each of the depth rows;
+    yet, it is also hashed to a sign (+1 or -1) per row. Upon a flow's arrival, each of its counters is incremented by the flow's sign in the counter's row,
+    and the flow's estimate is the median over the rows of (the sign of the flow in the row) * (the value of the flow's counter in the row), which is an unbiased estimate.
+    The counters should support negative increments. RealCntr does so directly. The approximate counters (F2P, SEAD, Morris, CEDAR, Tetra) count only upwards;
+    hence, each counter is represented by a pair of counters - a positive one, kept in self.countersArray, and a negative one, kept in self.negCntrsArray -
+    and its value is the difference between them.
+    """
+    def __init__(self, width, depth, num_flows, mode, conf, outPutFileName, **kwargs):
+        """
+        The arguments are those of CountMinSketch.__init__. Conservative update and downsampling are not supported, as the counters may decrease.
+        """
+        super().__init__(width=width, depth=depth, num_flows=num_flows, mode=mode, conf=conf, outPutFileName=outPutFileName, **kwargs)
+        if self.conservativeUpdate or self.dwnSmple:
+            settings.error('CountSketch: conservativeUpdate and dwnSmple are not supported')
+        if self.depth > 32:
+            settings.error('CountSketch: depth={} should be at most 32'.format(self.depth))
+        if self.mode=='RealCntr':
+            self.negCntrsArray = None
+        else:
+            self.negCntrsArray = genCntrMaster(mode=self.mode, conf=self.conf, numCntrs=self.numCntrs, packed=self.packed, fileName=None if (self.fileName==None) else self.fileName + '.neg')
+
+    def signsOfFlow(self, flow):
+        """
+        Return an array of the signs (+1 or -1) of the flow in the rows. The sign in row i is derived from bit i of a 32-bit mmh3 digest of the flow,
+        which is independent of the digest that determines the counters of the flow (see mappedCntrsOfFlow).
+        """
+        digest = mmh3.hash(str(flow), self.hashSeed+1, signed=False)
+        return 1 - 2 * ((digest >> np.arange(self.depth)) & 1)
+
+    def mappedCntrsNSignsOfFlows(self, flows):
+        """
+        Hash a batch of flows in bulk, where each distinct flow is hashed only once (see CountMinSketch.mappedCntrsOfFlows).
+        Returns (mappedCntrs, signs, inverse), where mappedCntrs[j], signs[j] are the arrays of the counters and signs of the j-th distinct flow, and inverse[i] is the number of the distinct flow of flows[i].
+        """
+        if isinstance(flows, (bytes, bytearray, memoryview)):
+            flows = np.frombuffer(flows, dtype=np.uint64)
+        distinctFlows, inverse = np.unique(np.asarray(flows), return_inverse=True)
+        if self.areCachedIds(distinctFlows):
+            return self.mappedCntrsOfIds[distinctFlows], self.signsOfIds[distinctFlows], inverse.ravel()
+        mappedCntrs            = np.array([self.mappedCntrsOfFlow(flow) for flow in distinctFlows.tolist()], dtype=np.int64).reshape(-1, self.depth)
+        signs                  = np.array([self.signsOfFlow(flow) for flow in distinctFlows.tolist()], dtype=np.int64).reshape(-1, self.depth)
+        return mappedCntrs, signs, inverse.ravel()
+
+    def cacheMappedCntrs(self, numOfIds):
+        """
+        Cache the mapped counters and the signs of the flow IDs 0, 1, ..., numOfIds-1 (see CountMinSketch.cacheMappedCntrs).
+        """
+        self.mappedCntrsOfIds = None
+        if numOfIds > 0:
+            mappedCntrs, signs, _ = self.mappedCntrsNSignsOfFlows(np.arange(numOfIds))
+            self.mappedCntrsOfIds, self.signsOfIds = mappedCntrs, signs
+
+    def incSignedCntrs(self, indices, factors):
+        """
+        Increment the counters in the given (distinct) indices by the respective (signed) factors. With paired counters, a positive factor increments the positive counter,
+        and a negative factor increments the negative counter by its absolute value.
+        """
+        if self.negCntrsArray==None:
+            self.countersArray.incCntrs(indices=indices, factors=factors)
+            return
+        isPos = factors > 0
+        isNeg = factors < 0
+        self.countersArray.incCntrs(indices=indices[isPos], factors=factors[isPos])
+        self.negCntrsArray.incCntrs(indices=indices[isNeg], factors=-factors[isNeg])
+
+    def querySignedCntrs(self, indices):
+        # Return an array of the (signed) values of the counters in the given indices
+        if self.negCntrsArray==None:
+            return self.countersArray.queryCntrs(indices)
+        return self.countersArray.queryCntrs(indices) - self.negCntrsArray.queryCntrs(indices)
+
+    def incNQueryFlow(self, flow):
+        """
+        Increment each of the flow's counters by its sign in the counter's row, and return the flow's new estimate.
+        If heavy hitters are tracked, the flow's candidacy is updated by the estimate.
+        """
+        mappedCntrs = np.array(self.mappedCntrsOfFlow(flow))
+        signs       = self.signsOfFlow(flow)
+        self.incSignedCntrs(mappedCntrs, signs)
+        estimate    = np.median(signs * self.querySignedCntrs(mappedCntrs))
+        if self.heavyHitters!=None:
+            self.heavyHitters.update(flow, estimate)
+        self.decayIfDue(1)
+        return estimate
+
+    def queryFlow(self, flow):
+        # The estimate of the flow: the median over the rows of the signed values of its counters
+        return np.median(self.signsOfFlow(flow) * self.querySignedCntrs(np.array(self.mappedCntrsOfFlow(flow))))
+
+    def queryFlows(self, flows):
+        """
+        Query a batch of flows. Returns an array, whose i-th entry is the estimate of flows[i].
+        """
+        mappedCntrs, signs, inverse = self.mappedCntrsNSignsOfFlows(flows)
+        return np.median(signs * self.querySignedCntrs(mappedCntrs.ravel()).reshape(-1, self.depth), axis=1)[inverse]
+
+    def incFlows(self, flows, weights=None):
+        """
+        Increment a batch of flows, where the i-th flow is incremented by weights[i] (by 1, if weights is None).
+        The updates are grouped by counter index, so that each counter is increased by the signed sum of the weights of the flows mapped to it, by a single call to incSignedCntrs per row.
+        """
+        mappedCntrs, signs, inverse = self.mappedCntrsNSignsOfFlows(flows)
+        weights = np.ones(len(inverse), dtype=np.int64) if (weights is None) else np.asarray(weights)
+        for row in range(self.depth):
+            cntrIdxs, inverseOfCntrs = np.unique(mappedCntrs[inverse, row], return_inverse=True)
+            self.incSignedCntrs(cntrIdxs, np.bincount(inverseOfCntrs.ravel(), weights=weights*signs[inverse, row], minlength=len(cntrIdxs)))
+        self.updateHeavyHitters(flows)
+        self.decayIfDue(len(inverse))
+
+    def merge(self, other):
+        """
+        Merge another count sketch into this one (see CountMinSketch.merge). With paired counters, the negative counters are merged as well.
+        """
+        self.checkMergeable(other)
+        if self.negCntrsArray!=None:
+            otherVals = other.negCntrsArray.queryCntrs(np.arange(self.numCntrs))
+            cntrIdxs  = np.flatnonzero(otherVals)
+            self.negCntrsArray.incCntrs(indices=cntrIdxs, factors=otherVals[cntrIdxs])
+        super().merge(other)
+
+    def rst(self):
+        super().rst()
+        if self.negCntrsArray!=None:
+            self.negCntrsArray.rstAllCntrs()
+
+    def decay(self, factor=None):
+        super().decay(factor)
+        if self.negCntrsArray!=None:
+            self.negCntrsArray.incCntrs(indices=np.arange(self.numCntrs), factors=self.decayFactor if (factor==None) else factor, mult=True)
+
+    def flush(self):
+        super().flush()
+        if self.negCntrsArray!=None and self.fileName!=None:
+            self.negCntrsArray.cntrs.flush()
+
+    def cntrsSizeInBytes(self):
+        # The memory occupied by the counters, including the negative counters, if any, in bytes
+        return super().cntrsSizeInBytes() + (0 if (self.negCntrsArray==None) else calcCntrsSizeInBytes(self.negCntrsArray.cntrs))
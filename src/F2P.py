@@ -4,7 +4,7 @@
 # from builtins import True False
 import math, random, pickle
 from printf import printf
-import settings
+import settings, PackedArray
 import numpy as np
 
 class CntrMaster (object):
@@ -155,7 +155,7 @@ class CntrMaster (object):
         self.calcOffsets ()
         return True
    
-    def __init__ (self, cntrSize, hyperSize, hyperMaxSize, mode, numCntrs, verbose):
+    def __init__ (self, cntrSize, hyperSize=None, hyperMaxSize=None, mode='F2P', numCntrs=1, verbose=[], useTables=False, packed=False, fileName=None):
         
         """
         Initialize an array of cntrSize counters at the given mode. The cntrs are initialized to 0.
@@ -172,6 +172,11 @@ class CntrMaster (object):
             settings.VERBOSE_PCL           = print output to a .pcl file in the directory ../res/pcl_files
             settings.VERBOSE_DETAILS       = print to stdout details about the counter
             settings.VERBOSE_NOTE          = print to stdout notes, e.g. when the target cntr value is above its max or below its min.
+        useTables - when True, each cntr is kept as an integer code in a numpy array, and is decoded / incremented using tables, pre-computed by calcTables.
+                    This saves the parsing of binary strings upon each increment / query, at the cost of a longer init.
+        packed - when True, the integer codes are bit-packed, at exactly cntrSize bits per cntr (see PackedArray). Implies useTables.
+        fileName - when given, the cntrs' codes are bit-packed in a memory-mapped file, which persists after the process ends (see PackedArray.openCntrsFile). 
+                   If the file exists, the cntrs are reopened from it. Implies packed.
         """
         
         self.isFeasible = True  # will be False in case of wrong initialization parameters
@@ -182,6 +187,9 @@ class CntrMaster (object):
         self.numCntrs   = numCntrs
         self.mode       = mode
         self.verbose    = verbose
+        self.useTables  = useTables or packed or (fileName!=None)
+        self.packed     = packed or (fileName!=None)
+        self.fileName   = fileName
         if (self.mode=='F2P'):
             if (not (self.setHyperSizeF2P (hyperSize))):
                 self.isFeasible = False  
@@ -197,18 +205,56 @@ class CntrMaster (object):
             self.isFeasible = False  
             return
         self.calcCntrMaxVal ()
-        self.calcProbOfInc1F2P ()
-        self.rstAllCntrs ()
+        if (self.mode=='F2P'):
+            self.calcProbOfInc1F2P ()
+        if (self.useTables):
+            self.calcTables ()
+        if (self.fileName==None):
+            self.rstAllCntrs ()
+        else: # reopen the cntrs kept in the file, if it exists
+            self.cntrs = PackedArray.openCntrsFile (fileName=self.fileName, numCntrs=self.numCntrs, cntrSize=self.cntrSize, settingsStr=self.genSettingsStr(), cntrZeroCode=self.cntrZeroCode)
+        
+    def calcTables (self):
+        """
+        Pre-calculate the tables used when the cntrs are kept as integer codes (the code of a cntr is the integer whose binary representation is the cntr). 
+        self.valOfCode[c]  - the value represented by the cntr whose code is c.
+        self.nextCode[c]   - the code of the cntr reached when incrementing the cntr whose code is c by 1 succeeds. For the max cntr, nextCode[c]==c.
+        self.probOfInc1[c] - the prob' that incrementing the cntr whose code is c by 1 succeeds. The prob' is 0 for the max cntr.
+        self.sortedCodes   - the codes reachable from the zero cntr, in an increasing order of the values they represent. 
+        self.sortedVals    - self.sortedVals[i] is the value represented by the code self.sortedCodes[i].
+        self.vecOfCode[c]  - the binary vector of the cntr whose code is c.
+        """
+        numCodes            = 1 << self.cntrSize
+        self.cntrZeroCode   = int (self.cntrZeroVec, base=2)
+        self.cntrMaxCode    = int (self.cntrMaxVec,  base=2)
+        self.valOfCode      = np.array ([self.cntr2num (np.binary_repr (code, self.cntrSize)) for code in range (numCodes)], dtype=float)
+        self.nextCode       = np.arange (numCodes)
+        for code in range (numCodes):
+            if (self.valOfCode[code] < self.cntrMaxVal): # the successor of the max cntr is the max cntr itself
+                self.nextCode[code] = int (self.num2cntr (self.valOfCode[code] + 0.5)[1]['cntrVec'], base=2) # all the cntr's values are integers, so the cntr above valOfCode[code]+0.5 is the successor 
+        hasSuccessor        = (self.nextCode != np.arange (numCodes))
+        if (self.mode=='F3P'): # calcProbOfInc1F2P parses the cntrs as F2P cntrs; hence, for F3P, calculate the prob's by the tables.
+            self.probOfInc1 = np.ones (numCodes)
+            self.probOfInc1[hasSuccessor] = 1 / (self.valOfCode[self.nextCode[hasSuccessor]] - self.valOfCode[hasSuccessor])
+        self.probOfInc1[~hasSuccessor] = 0 
+        self.sortedCodes    = settings.calcSortedCodes (cntrZeroCode=self.cntrZeroCode, nextCode=self.nextCode)
+        self.sortedVals     = self.valOfCode[self.sortedCodes]
+        self.vecOfCode      = [np.binary_repr (code, self.cntrSize) for code in range (numCodes)] # the binary vector of each code, to be returned in cntrDicts w/o re-formatting it
         
     def rstAllCntrs (self):
         """
         """
-        self.cntrs = [self.cntrZeroVec for _ in range (self.numCntrs)]
+        if (self.fileName!=None):
+            self.cntrs.fill (self.cntrZeroCode)
+        elif (self.useTables):
+            self.cntrs = PackedArray.genCntrsArray (numCntrs=self.numCntrs, cntrSize=self.cntrSize, cntrZeroCode=self.cntrZeroCode, packed=self.packed)
+        else:
+            self.cntrs = [self.cntrZeroVec for _ in range (self.numCntrs)]
         
     def rstCntr (self, cntrIdx=0):
         """
         """
-        self.cntrs[cntrIdx] = self.cntrZeroVec
+        self.cntrs[cntrIdx] = self.cntrZeroCode if (self.useTables) else self.cntrZeroVec
         
         
     def cntr2num (self, cntr, hyperSize=None, hyperMaxSize=None, verbose=[]):
@@ -322,13 +368,29 @@ class CntrMaster (object):
         """
         settings.checkCntrIdx (cntrIdx=cntrIdx, numCntrs=self.numCntrs, cntrType=self.mode)        
         
+        if (self.useTables):
+            code = self.cntrs[cntrIdx]
+            return {'cntrVec' : self.vecOfCode[code], 'val' : self.valOfCode[code]}
         return {'cntrVec' : self.cntrs[cntrIdx], 'val' : self.cntr2num(self.cntrs[cntrIdx])}    
         
+    def incCntrBy1ByTables (self, cntrIdx=0):
+        """
+        Increase a counter, kept as an integer code, by 1: a single random draw, and then (w.p. self.probOfInc1[code]) a single lookup in self.nextCode.
+        Works for both F2P and F3P.
+        """
+        code = self.cntrs[cntrIdx]
+        if (random.random() < self.probOfInc1[code]): # when code is the max cntr, probOfInc1[code]==0 
+            code = self.nextCode[code]
+            self.cntrs[cntrIdx] = code
+        return {'cntrVec' : self.vecOfCode[code], 'val' : self.valOfCode[code]}
+        
     def incCntrBy1 (self, cntrIdx=0):
         """
         Increase a counter by a given factor in a fast way        
         """
         
+        if (self.useTables):
+            return self.incCntrBy1ByTables (cntrIdx)
         if (self.mode=='F3P'):
             settings.error ('Sorry. incCntrBY1 is not implemented yet for F3P')
 
@@ -352,7 +414,7 @@ class CntrMaster (object):
             self.cntrs[cntrIdx] = self.mantNexpVals2cntr (mantVal=0, expVal=expVal+1)
         return {'cntrVec' : self.cntrs[cntrIdx], 'val' : cntrppVal} 
         
-    def incCntr (self, cntrIdx, mult, factor, verbose):
+    def incCntr (self, cntrIdx=0, mult=False, factor=1, verbose=[]):
         """
         Increase a counter by a given factor.
         Input:
@@ -382,6 +444,14 @@ class CntrMaster (object):
         
         settings.checkCntrIdx (cntrIdx=cntrIdx, numCntrs=self.numCntrs, cntrType=self.mode)
         self.verbose = verbose
+        if (self.useTables):
+            if not(mult) and factor==1:
+                return self.incCntrBy1ByTables (cntrIdx=cntrIdx)
+            code      = self.cntrs[cntrIdx]
+            targetVal = (self.valOfCode[code] * factor) if mult else (self.valOfCode[code] + factor)
+            code      = settings.vals2codes (targetVals=targetVal, sortedVals=self.sortedVals, sortedCodes=self.sortedCodes)
+            self.cntrs[cntrIdx] = code
+            return {'cntrVec' : self.vecOfCode[code], 'val' : self.valOfCode[code]}
         if not(mult) and self.mode=='F2P' and factor==1:
             return self.incCntrBy1(cntrIdx=cntrIdx)     
         targetVal = (self.cntr2num (self.cntrs[cntrIdx]) * factor) if mult else (self.cntr2num (self.cntrs[cntrIdx]) + factor)
@@ -396,6 +466,25 @@ class CntrMaster (object):
                 self.cntrs[cntrIdx] = optionalModifiedCntr[0]['cntrVec']
         return {'cntrVec' : self.cntrs[cntrIdx], 'val' : self.cntr2num(self.cntrs[cntrIdx])}    
             
+    def incCntrs (self, indices, factors=1, mult=False):
+        """
+        Increase a batch of counters, as if incCntr (cntrIdx=indices[i], factor=factors[i], mult=mult) were called for each i, in order.
+        factors may be either an array of coefficients, one per index, or a single coefficient for all the indices.
+        When the cntrs are kept as integer codes (useTables), the increments are vectorized (see settings.incCntrsByTables); else, incCntr is called for each increment.
+        Returns an array of the cntrs' values, where the i-th entry is the value of cntr indices[i] right after applying its i-th increment.
+        """
+        if (self.useTables):
+            return settings.incCntrsByTables (self, indices=indices, factors=factors, mult=mult, cntrType=self.mode)
+        return settings.incCntrsOneByOne (self, indices=indices, factors=factors, mult=mult)
+
+    def queryCntrs (self, indices):
+        """
+        Query a batch of counters. Returns an array, whose i-th entry is the value of cntr indices[i].
+        """
+        if (self.useTables):
+            return settings.queryCntrsByTables (self, indices=indices, cntrType=self.mode)
+        return np.array ([self.queryCntr (cntrIdx)['val'] for cntrIdx in np.asarray (indices).tolist()], dtype=float)
+
     def updateSelfHyperSize (self, hyperSize):
         """
         Sets self.hyperSize, and the relevant fields (self.expMaxSize) to the input hyperSize.
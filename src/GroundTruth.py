@@ -0,0 +1,71 @@
+"""
+Ground truth of simulations: the exact number of increments (or the exact weight) of every flow, kept in a numpy array,
+and compared with a sketch's estimates of all the flows at once, at a few checkpoints of the stream.
+The flow IDs are 0, 1, ..., numFlows-1 (see Workload).
+"""
+import numpy as np
+import settings
+
+def genCheckpoints (numOfIncs, numOfCheckpoints=100, logSpaced=True):
+    """
+    Return a sorted array of the (distinct) increment counts, at which the errors are sampled; the last checkpoint is always numOfIncs.
+    logSpaced - when True, the checkpoints are log-spaced between 1 and numOfIncs, so the early part of the stream is sampled more densely. Else, they are evenly spaced.
+    """
+    if (numOfIncs<1 or numOfCheckpoints<1):
+        settings.error ('GroundTruth: numOfIncs={} and numOfCheckpoints={} should be positive' .format (numOfIncs, numOfCheckpoints))
+    if (logSpaced):
+        checkpoints = np.geomspace (1, numOfIncs, numOfCheckpoints)
+    else:
+        checkpoints = np.linspace (numOfIncs/numOfCheckpoints, numOfIncs, numOfCheckpoints)
+    return np.unique (np.append (np.round (checkpoints).astype (np.int64), numOfIncs))
+
+class GroundTruth (object):
+    """
+    The exact values of numFlows flows, updated by blocks of flows, by a single np.bincount per block.
+    """
+
+    def __init__ (self, numFlows):
+        self.numFlows = numFlows
+        self.rst ()
+
+    def rst (self):
+        """
+        Reset the exact values of all the flows.
+        """
+        self.vals      = np.zeros (self.numFlows)
+        self.numOfIncs = 0 # the number of increments (flow arrivals) so far
+        self.rstInterval ()
+
+    def rstInterval (self):
+        """
+        Start a new interval (e.g., between consecutive checkpoints): reset the number of increments of each flow within the interval.
+        """
+        self.incsInInterval = np.zeros (self.numFlows)
+
+    def add (self, flows, weights=None):
+        """
+        Add a block of flow arrivals: flows[i] is incremented by weights[i] (by 1, if weights is None). A flow may appear several times in the block.
+        """
+        flows                = np.asarray (flows, dtype=np.int64)
+        self.vals           += np.bincount (flows, weights=weights, minlength=self.numFlows)
+        self.incsInInterval += np.bincount (flows, minlength=self.numFlows)
+        self.numOfIncs      += len(flows)
+
+    # The flows whose exact value is non-zero, namely, the flows that have arrived so far
+    seenFlows = lambda self : np.flatnonzero (self.vals)
+
+    # The flows that have arrived during the current interval
+    flowsInInterval = lambda self : np.flatnonzero (self.incsInInterval)
+
+    def sumSqRelErs (self, estimates, flows=None, weights=None):
+        """
+        Return (the (weighted) sum of the squared relative errors, the number of points summed), where estimates[i] is the estimate of flows[i].
+        flows   - the flows to evaluate; when None, all the flows seen so far. The flows should have non-zero exact values.
+        weights - when given, the error of flows[i] is counted weights[i] times, and the number of points is the sum of the weights. Else, each flow is a single point.
+        """
+        if (flows is None):
+            flows = self.seenFlows ()
+        sqRelErs = settings.sqRelEr (self.vals[flows], np.asarray (estimates))
+        if (weights is None):
+            return np.sum (sqRelErs), len(flows)
+        return np.sum (sqRelErs * weights), np.sum (weights)
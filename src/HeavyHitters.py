@@ -0,0 +1,100 @@
+"""
+Heavy-hitter (top talkers) tracking: a bounded set of candidate flows with the highest estimates, fed by the estimates of a sketch upon each update (see CountMinSketch.incNQueryFlow).
+The candidates are kept in a min-heap of at most capacity entries, indexed by a dict from each candidate flow to its position in the heap.
+Hence, an update takes O(log(capacity)). The queries scan the candidates, never all the flows seen, but not only the reported ones:
+topK (k) takes O(capacity*log(k)), and aboveThreshold takes O(capacity + m*log(m)), where m is the number of candidates reported.
+"""
+import heapq
+import settings
+
+class HeavyHitters (object):
+
+    def __init__ (self, capacity):
+        """
+        capacity - the max number of candidate flows kept.
+        """
+        if (capacity<1):
+            settings.error ('HeavyHitters: capacity={} should be positive' .format (capacity))
+        self.capacity = capacity
+        self.rst ()
+
+    def rst (self):
+        """
+        Remove all the candidates.
+        """
+        self.heap      = [] # a min-heap of [estimate, flow] entries, ordered by the estimates
+        self.posOfFlow = {} # self.posOfFlow[flow] is the position of the entry of flow in self.heap
+
+    __len__      = lambda self : len(self.heap)
+    __contains__ = lambda self, flow : flow in self.posOfFlow
+
+    # The smallest estimate among the candidates
+    minEstimate  = lambda self : self.heap[0][0] if (len(self.heap) > 0) else 0
+
+    def swap (self, i, j):
+        self.heap[i], self.heap[j]       = self.heap[j], self.heap[i]
+        self.posOfFlow[self.heap[i][1]] = i
+        self.posOfFlow[self.heap[j][1]] = j
+
+    def siftUp (self, pos):
+        while (pos > 0):
+            parent = (pos-1) >> 1
+            if (self.heap[parent][0] <= self.heap[pos][0]):
+                return
+            self.swap (pos, parent)
+            pos = parent
+
+    def siftDown (self, pos):
+        while (True):
+            smallest = pos
+            for child in (2*pos+1, 2*pos+2):
+                if (child < len(self.heap) and self.heap[child][0] < self.heap[smallest][0]):
+                    smallest = child
+            if (smallest==pos):
+                return
+            self.swap (pos, smallest)
+            pos = smallest
+
+    def update (self, flow, estimate):
+        """
+        Update the estimate of flow. If flow is a candidate, its entry is updated. Else, it becomes a candidate if there's room,
+        or if its estimate exceeds the smallest estimate among the candidates, whose flow is then evicted.
+        """
+        pos = self.posOfFlow.get (flow)
+        if (pos!=None):
+            oldEstimate        = self.heap[pos][0]
+            self.heap[pos][0]  = estimate
+            if (estimate < oldEstimate): # may happen, e.g., after the sketch was downsampled
+                self.siftUp (pos)
+            else:
+                self.siftDown (pos)
+        elif (len(self.heap) < self.capacity):
+            self.heap.append ([estimate, flow])
+            self.posOfFlow[flow] = len(self.heap)-1
+            self.siftUp (len(self.heap)-1)
+        elif (estimate > self.heap[0][0]):
+            del self.posOfFlow[self.heap[0][1]]
+            self.heap[0]         = [estimate, flow]
+            self.posOfFlow[flow] = 0
+            self.siftDown (0)
+
+    def scale (self, factor):
+        """
+        Multiply the estimates of all the candidates by a positive factor (e.g., upon a decay of the sketch). The order of the heap is kept.
+        """
+        for entry in self.heap:
+            entry[0] *= factor
+
+    def topK (self, k=None):
+        """
+        Return a list of (flow, estimate) of the k candidates with the highest estimates, in decreasing order of estimates (all the candidates, if k is None).
+        """
+        k = len(self.heap) if (k==None) else min (k, len(self.heap))
+        return [(flow, estimate) for estimate, flow in heapq.nlargest (k, self.heap, key=lambda entry : entry[0])]
+
+    def aboveThreshold (self, threshold):
+        """
+        Return a list of (flow, estimate) of the candidates whose estimate is at least threshold, in decreasing order of estimates.
+        If the set of candidates is full, and threshold > minEstimate(), no flow whose last estimate was at least threshold is missed (provided that the estimates never decrease).
+        """
+        return sorted ([(flow, estimate) for estimate, flow in self.heap if estimate >= threshold], key=lambda item : item[1], reverse=True)
@@ -6,7 +6,7 @@ import math
 # import pickle
 import math, time, random
 from printf import printf
-import settings
+import settings, PackedArray
 import numpy as np
 
 # The 'a' parameter determines Morris counter's accuracy.
@@ -143,7 +143,9 @@ class CntrMaster (object):
                   a=None, # the 'a' parameter that determines the counter's accuracy. 
                   cntrMaxVal=None, 
                   verbose=[], # determines which outputs would be written to .log/.res/.pcl/debug files, as detailed in settings.py. 
-                  estimateAGivenCntrSize=False # When True, only print-out to the screen estimated values of the 'a' parameter to search in, for each counter size - and then exit
+                  estimateAGivenCntrSize=False, # When True, only print-out to the screen estimated values of the 'a' parameter to search in, for each counter size - and then exit
+                  packed=False, # When True, the cntrs' codes are bit-packed, at exactly cntrSize bits per cntr (see PackedArray).
+                  fileName=None # When given, the cntrs' codes are bit-packed in a memory-mapped file, which persists after the process ends (see PackedArray.openCntrsFile). If the file exists, the cntrs are reopened from it.
                   ):
         
         """
@@ -160,9 +162,12 @@ class CntrMaster (object):
         self.cntrSize    = int(cntrSize)
         self.numCntrs    = int(numCntrs)
         self.verbose     = verbose
+        self.packed      = packed or (fileName!=None)
+        self.fileName    = fileName
         self.cntrZeroVec = '0' * self.cntrSize
-        self.cntrs       = [self.cntrZeroVec for i in range (self.numCntrs)]
         self.cntrMaxVec  = '1' * self.cntrSize
+        self.cntrZeroCode = 0
+        self.cntrMaxCode  = (1 << self.cntrSize) - 1
         if (a==None):
             if (cntrMaxVal==None):
                 settings.error ('error: the input arguments should include either delta or cntrMaxVal')                
@@ -173,16 +178,42 @@ class CntrMaster (object):
         self.cntrZero    = 0
         self.cntrMaxVal  = self.calcCntrMaxVal () #self.cntrInt2num (2**self.cntrSize-1)        
         self.num2cntrNormFactor = 1 / math.log (1 + 1/self.a)
+        self.calcTables  ()
+        if (self.fileName==None):
+            self.rstAllCntrs ()
+        else: # reopen the cntrs kept in the file, if it exists
+            self.cntrs = PackedArray.openCntrsFile (fileName=self.fileName, numCntrs=self.numCntrs, cntrSize=self.cntrSize, settingsStr=self.genSettingsStr(), cntrZeroCode=self.cntrZeroCode)
+        
+    def calcTables (self):
+        """
+        Pre-calculate the tables used for decoding / incrementing the cntrs, which are kept as integer codes (the code of a cntr is the integer whose binary representation is the cntr). 
+        self.valOfCode[c]  - the value represented by the cntr whose code is c.
+        self.nextCode[c]   - the code of the cntr reached when incrementing the cntr whose code is c by 1 succeeds, namely, c+1. For the max cntr, nextCode[c]==c.
+        self.probOfInc1[c] - the prob' that incrementing the cntr whose code is c by 1 succeeds. The prob' is 0 for the max cntr.
+        self.sortedCodes, self.sortedVals - all the codes, and the values they represent, in an increasing order.
+        self.vecOfCode[c]  - the binary vector of the cntr whose code is c.
+        """
+        numCodes            = 1 << self.cntrSize
+        self.valOfCode      = np.array ([self.cntrInt2num (code) for code in range (numCodes)], dtype=float)
+        self.nextCode       = np.minimum (np.arange (1, numCodes+1), self.cntrMaxCode)
+        self.probOfInc1     = np.zeros (numCodes)
+        self.probOfInc1[:-1] = 1 / np.diff (self.valOfCode)
+        self.sortedCodes    = np.arange (numCodes)
+        self.sortedVals     = self.valOfCode
+        self.vecOfCode      = [np.binary_repr (code, self.cntrSize) for code in range (numCodes)] 
         
     def rstCntr (self, cntrIdx=0):
         """
         """
-        self.cntrs[cntrIdx] = self.cntrZeroVec
+        self.cntrs[cntrIdx] = self.cntrZeroCode
 
     def rstAllCntrs(self):
         """
         """
-        self.cntrs = [self.cntrZeroVec for i in range (self.numCntrs)]
+        if (self.fileName!=None):
+            self.cntrs.fill (self.cntrZeroCode)
+            return
+        self.cntrs = PackedArray.genCntrsArray (numCntrs=self.numCntrs, cntrSize=self.cntrSize, cntrZeroCode=self.cntrZeroCode, packed=self.packed)
 
     def queryCntr (self, cntrIdx=0):
         """
@@ -194,7 +225,8 @@ class CntrMaster (object):
             - cntrDict['cntrVec'] is the counter's binary representation; cntrDict['val'] is its value.        
         """
         settings.checkCntrIdx (cntrIdx=cntrIdx, numCntrs=self.numCntrs, cntrType='Morris')
-        return {'cntrVec' : self.cntrs[cntrIdx], 'val' : self.cntr2num(self.cntrs[cntrIdx])}    
+        code = self.cntrs[cntrIdx]
+        return {'cntrVec' : self.vecOfCode[code], 'val' : self.valOfCode[code]}    
         
     def incCntr (self, cntrIdx=0, factor=1, verbose=[], mult=False):
         """
@@ -224,7 +256,8 @@ class CntrMaster (object):
           - cntrDict['val']  - the counter's value.
         """
         settings.checkCntrIdx (cntrIdx=cntrIdx, numCntrs=self.numCntrs, cntrType='Morris')
-        targetVal = (self.cntr2num (self.cntrs[cntrIdx]) * factor) if mult else (self.cntr2num (self.cntrs[cntrIdx]) + factor)
+        cntrVal   = self.valOfCode[self.cntrs[cntrIdx]]
+        targetVal = (cntrVal * factor) if mult else (cntrVal + factor)
         optionalModifiedCntr = self.num2cntr (targetVal)
         if (settings.VERBOSE_DETAILS in verbose): 
             if (len(optionalModifiedCntr)==1):
@@ -233,11 +266,34 @@ class CntrMaster (object):
                 print ('targetVal={}, cntrLoVec={}, cntrLoVal={:.2f}\n  cntrHiVec={}, cntrHiVal={:.2f}' .format 
                        (targetVal, optionalModifiedCntr[0]['cntrVec'], optionalModifiedCntr[0]['val'], optionalModifiedCntr[1]['cntrVec'], optionalModifiedCntr[1]['val']))
         if (len(optionalModifiedCntr)==1): # there's a single option to modify the cntr -- either because targetVal is accurately represented, or because it's > maxVal, or < 0.
-            self.cntrs[cntrIdx] = optionalModifiedCntr[0]['cntrVec']
+            cntrVec = optionalModifiedCntr[0]['cntrVec']
         else:
             probOfFurtherInc = float (targetVal - optionalModifiedCntr[0]['val']) / float (optionalModifiedCntr[1]['val'] - optionalModifiedCntr[0]['val'])
-            self.cntrs[cntrIdx] = optionalModifiedCntr[1]['cntrVec'] if (random.random() < probOfFurtherInc) else optionalModifiedCntr[0]['cntrVec']
-        return {'cntrVec' : self.cntrs[cntrIdx], 'val' : self.cntr2num(self.cntrs[cntrIdx])}    
+            cntrVec = optionalModifiedCntr[1]['cntrVec'] if (random.random() < probOfFurtherInc) else optionalModifiedCntr[0]['cntrVec']
+        self.cntrs[cntrIdx] = int (cntrVec, base=2)
+        return {'cntrVec' : cntrVec, 'val' : self.valOfCode[self.cntrs[cntrIdx]]}    
+    
+    def incCntrs (self, indices, factors=1, mult=False):
+        """
+        Increase a batch of counters, as if incCntr (cntrIdx=indices[i], factor=factors[i], mult=mult) were called for each i, in order.
+        Input:
+        indices - an array of the indices of the cntrs to increment. An index may appear several times.
+        factors - an array of the additive/multiplicative coefficients, one per index; or a single coefficient for all the indices.
+        mult - if true, multiply each counter by its factor. Else, increase each counter by its factor.
+        Output:
+        an array of the cntrs' values, where the i-th entry is the value of cntr indices[i] right after applying its i-th increment.
+        Operation:
+        The random numbers for the probabilistic rounding of all the increments are drawn in a single vectorized draw.
+        Repeated indices are handled in rounds: round r applies the r-th occurrence of every index, so each increment of a cntr 
+        is applied to the result of the previous increments of that cntr (see settings.incCntrsByTables).
+        """
+        return settings.incCntrsByTables (self, indices=indices, factors=factors, mult=mult, cntrType='Morris')
+    
+    def queryCntrs (self, indices):
+        """
+        Query a batch of counters. Returns an array, whose i-th entry is the value of cntr indices[i].
+        """
+        return settings.queryCntrsByTables (self, indices=indices, cntrType='Morris')
     
 def printAllVals (cntrSize=4, a=10, verbose=[]):
     """
@@ -0,0 +1,152 @@
+import os
+import numpy as np
+import settings
+
+# The number of bits in each word of the buffer
+BITS_PER_WORD = 64
+
+# The number of bytes reserved for the header of a file of packed codes (see openCntrsFile)
+HEADER_SIZE   = 4096
+
+# The number of bytes at the end of the header, which hold a float64 metadata field that may change during the run (e.g., the sampling probability of a sketch)
+META_SIZE     = 8
+
+class PackedArray (object):
+    """
+    An array of numCntrs integer codes, each of exactly cntrSize bits, kept contiguously in a buffer of uint64 words.
+    The code of cntr i occupies the bits i*cntrSize, ..., i*cntrSize+cntrSize-1 of the buffer (where bit j is bit j%64 of word j//64), so a code may span 2 words.
+    The array supports numpy-like indexing by an int or by an array of ints, both for getting and for setting codes.
+    Hence, it can replace the numpy array of codes (self.cntrs) of the table-driven cntrs.
+    """
+
+    def __init__ (self, numCntrs, cntrSize, fillCode=0, words=None):
+        """
+        Inputs:
+        numCntrs - the number of codes in the array.
+        cntrSize - the number of bits in each code; at most 64.
+        fillCode - the initial code of all the cntrs.
+        words    - an existing buffer of uint64 words (e.g., a memory-mapped file), holding the packed codes. When None (default), a new buffer is allocated and filled with fillCode.
+        """
+        if (cntrSize<1 or cntrSize>BITS_PER_WORD):
+            settings.error ('PackedArray: cntrSize={} should be between 1 and {}' .format (cntrSize, BITS_PER_WORD))
+        self.numCntrs = int (numCntrs)
+        self.cntrSize = int (cntrSize)
+        self.mask     = np.uint64 ((1 << self.cntrSize) - 1)
+        self.numWords = self.calcNumWords (self.numCntrs, self.cntrSize)
+        if (words is None):
+            self.words = np.zeros (self.numWords, dtype=np.uint64)
+            self.fill (fillCode)
+        else:
+            if (len(words) < self.numWords):
+                settings.error ('PackedArray: a buffer of {} words cannot hold {} codes of {} bits' .format (len(words), self.numCntrs, self.cntrSize))
+            self.words = words
+        self.meta = None # when the buffer is a file, a memory-mapped array of a single float64 metadata field in the file's header (see openCntrsFile)
+
+    # The number of words needed for numCntrs codes of cntrSize bits. An extra word is kept, so that reading the word following the last code is always feasible
+    calcNumWords = staticmethod (lambda numCntrs, cntrSize : (numCntrs*cntrSize + BITS_PER_WORD - 1) // BITS_PER_WORD + 1)
+
+    # The number of bytes occupied by the buffer
+    nbytes = property (lambda self : self.words.nbytes)
+
+    __len__ = lambda self : self.numCntrs
+
+    def fill (self, code):
+        """
+        Set all the codes to code.
+        """
+        if (code==0):
+            self.words[:] = 0
+            return
+        self[np.arange (self.numCntrs)] = code
+
+    def locate (self, indices):
+        """
+        Return the (word index, bit offset within the word) of the first bit of each of the given codes.
+        """
+        bitPos = np.asarray (indices, dtype=np.uint64) * np.uint64 (self.cntrSize)
+        return (bitPos // np.uint64 (BITS_PER_WORD)).astype (np.int64), bitPos % np.uint64 (BITS_PER_WORD)
+
+    def get (self, indices):
+        """
+        Return an array of the codes in the given indices.
+        """
+        wordIdxs, offsets = self.locate (indices)
+        codes      = self.words[wordIdxs] >> offsets
+        spills     = (offsets + np.uint64 (self.cntrSize) > np.uint64 (BITS_PER_WORD)) # the codes that continue in the next word
+        codes     |= np.where (spills, self.words[wordIdxs+1] << ((np.uint64 (BITS_PER_WORD) - offsets) % np.uint64 (BITS_PER_WORD)), np.uint64 (0))
+        return codes & self.mask
+
+    def set (self, indices, codes):
+        """
+        Set the codes in the given indices. If an index appears several times, its last code is set.
+        """
+        indices = np.asarray (indices, dtype=np.int64).ravel()
+        codes   = np.broadcast_to (np.asarray (codes).astype (np.uint64), indices.shape)
+        if (len(indices) > len(np.unique (indices))): # keep only the last occurrence of each index
+            lastOccurrences = len(indices) - 1 - np.unique (indices[::-1], return_index=True)[1]
+            indices, codes  = indices[lastOccurrences], codes[lastOccurrences]
+        codes             = codes & self.mask
+        wordIdxs, offsets = self.locate (indices)
+        np.bitwise_and.at (self.words, wordIdxs, ~(self.mask << offsets)) # several codes may share a word, so the words are updated by unbuffered ops
+        np.bitwise_or.at  (self.words, wordIdxs, codes << offsets)
+        spills            = (offsets + np.uint64 (self.cntrSize) > np.uint64 (BITS_PER_WORD)) # the codes that continue in the next word
+        shifts            = np.uint64 (BITS_PER_WORD) - offsets[spills]
+        np.bitwise_and.at (self.words, wordIdxs[spills]+1, ~(self.mask >> shifts))
+        np.bitwise_or.at  (self.words, wordIdxs[spills]+1, codes[spills] >> shifts)
+
+    def flush (self):
+        """
+        If the buffer is a memory-mapped file, write any changes in the buffer (and in the metadata field) to the file.
+        """
+        if (isinstance (self.words, np.memmap)):
+            self.words.flush ()
+        if (self.meta is not None):
+            self.meta.flush ()
+
+    def __getitem__ (self, idx):
+        if (np.ndim (idx)==0):
+            return int (self.get ([idx])[0])
+        return self.get (idx)
+
+    def __setitem__ (self, idx, code):
+        self.set (np.atleast_1d (idx), code)
+
+def genCntrsArray (numCntrs, cntrSize, cntrZeroCode=0, packed=False):
+    """
+    Generate the array of codes of numCntrs cntrs of cntrSize bits, all initialized to cntrZeroCode.
+    If packed, the codes are bit-packed into a PackedArray, at exactly cntrSize bits per cntr. Else, they are kept in a numpy array of the smallest fitting unsigned dtype.
+    """
+    if (packed):
+        return PackedArray (numCntrs=numCntrs, cntrSize=cntrSize, fillCode=cntrZeroCode)
+    return np.full (numCntrs, cntrZeroCode, dtype=settings.dtypeOfCntrSize (cntrSize))
+
+# The header of a file of packed codes: the settings of the cntrs, the number of cntrs, and the number of bits per cntr
+genHeader = lambda settingsStr, numCntrs, cntrSize : 'PackedArray {} numCntrs={} cntrSize={}\n' .format (settingsStr, numCntrs, cntrSize)
+
+def openCntrsFile (fileName, numCntrs, cntrSize, settingsStr, cntrZeroCode=0):
+    """
+    Return a PackedArray of numCntrs codes of cntrSize bits, whose buffer is a memory-mapped file. Hence, the array may be larger than the RAM, and its state persists after the process ends.
+    The file begins with a header of HEADER_SIZE bytes, holding settingsStr (e.g., the cntr's genSettingsStr()), numCntrs and cntrSize, and ending with a float64 metadata field
+    of META_SIZE bytes (available via the array's meta); then come the packed codes.
+    If the file exists, it is reopened, keeping its codes and metadata; its header must match the given settings. Else, the file is created, all its codes are set to cntrZeroCode,
+    and its metadata field is set to 0.
+    """
+    header   = genHeader (settingsStr, numCntrs, cntrSize)
+    if (len(header) > HEADER_SIZE - META_SIZE):
+        settings.error ('PackedArray: the header {} is longer than {} bytes' .format (header, HEADER_SIZE - META_SIZE))
+    numWords = PackedArray.calcNumWords (numCntrs, cntrSize)
+    isNew    = not (os.path.exists (fileName))
+    if (isNew):
+        with open (fileName, 'wb') as file:
+            file.write (header.encode().ljust (HEADER_SIZE, b'\0'))
+    else:
+        with open (fileName, 'rb') as file:
+            headerInFile = file.read (HEADER_SIZE - META_SIZE).rstrip (b'\0').decode ()
+        if (headerInFile != header):
+            settings.error ('PackedArray: the header of {} is {}, which does not match the requested {}' .format (fileName, headerInFile.strip(), header.strip()))
+    packedArray      = PackedArray (numCntrs=numCntrs, cntrSize=cntrSize, words=np.memmap (fileName, dtype=np.uint64, mode='r+', offset=HEADER_SIZE, shape=(numWords,)))
+    packedArray.meta = np.memmap (fileName, dtype=np.float64, mode='r+', offset=HEADER_SIZE - META_SIZE, shape=(1,))
+    if (isNew):
+        packedArray.fill  (cntrZeroCode)
+        packedArray.flush ()
+    return packedArray
@@ -1,3 +1,6 @@
+import numpy as np
+import settings
+
 
 class CntrMaster(object):
     """
@@ -9,13 +12,13 @@ class CntrMaster(object):
         Constructor method that initializes the CntrMaster object with a specified number of counters.
         """
         self.numCntrs = numCntrs  # number of counters in the flow array, which is width*depth
-        self.cntrs = [0 for i in range(self.numCntrs)]  # repeat the zero counter number of counter times
+        self.cntrs = np.zeros(self.numCntrs)  # the counters, kept as a numpy array of float64
 
     def rstAllCntrs(self):
         """
         Resets all the counter values to zero.
         """
-        self.cntrs = [0 for i in range(self.numCntrs)]
+        self.cntrs = np.zeros(self.numCntrs)
 
     def incCntr(self, cntrIdx=0, factor=1, mult=False, verbose=[]):
         """
@@ -23,12 +26,32 @@ class CntrMaster(object):
         Returns the updated counter value as a dictionary of integer and binary.
         """
         self.cntrs[cntrIdx] = (self.cntrs[cntrIdx] * factor) if mult else (self.cntrs[cntrIdx] + factor)
-        return {'cntrVec' : bin(self.cntrs[cntrIdx])[2:], 'val' : self.cntrs[cntrIdx]}
+        return {'cntrVec' : bin(int(self.cntrs[cntrIdx]))[2:], 'val' : self.cntrs[cntrIdx]}
 
     def queryCntr(self, cntrIdx):
         """
         Retrieves the value of a specific counter from the counters list.
         Returns the counter value as a dictionary of integer and binary.
         """
-        return {'cntrVec' : bin(self.cntrs[cntrIdx])[2:], 'val' : self.cntrs[cntrIdx]}
+        return {'cntrVec' : bin(int(self.cntrs[cntrIdx]))[2:], 'val' : self.cntrs[cntrIdx]}
+
+    def incCntrs(self, indices, factors=1, mult=False):
+        """
+        Increments or multiplies a batch of counters, as if incCntr (cntrIdx=indices[i], factor=factors[i], mult=mult) were called for each i, in order.
+        Returns an array of the counters' values, where the i-th entry is the value of counter indices[i] right after applying its i-th update.
+        The updates are applied by np.add.at (np.multiply.at, if mult), in rounds of distinct indices (see settings.rndsOfIdxs); typically, there's a single round.
+        """
+        indices = np.asarray(indices, dtype=np.int64)
+        factors = np.broadcast_to(np.asarray(factors, dtype=float), indices.shape)
+        update  = np.multiply if mult else np.add
+        vals    = np.empty(len(indices))
+        for entries in settings.rndsOfIdxs(indices):
+            update.at(self.cntrs, indices[entries], factors[entries])
+            vals[entries] = self.cntrs[indices[entries]]
+        return vals
 
+    def queryCntrs(self, indices):
+        """
+        Retrieves the values of a batch of counters. Returns an array, whose i-th entry is the value of counter indices[i].
+        """
+        return self.cntrs[np.asarray(indices, dtype=np.int64)]
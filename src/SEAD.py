@@ -5,7 +5,7 @@
 # import pickle
 import math, time, random
 from printf import printf
-import settings
+import settings, PackedArray
 import numpy as np
 
 class CntrMaster (object):
@@ -50,7 +50,7 @@ class CntrMaster (object):
         else:
             self.offsetOfExpVal = [expVal * 2**(self.cntrSize-1) for expVal in range (self.expMaxVal+1)]
   
-    def __init__ (self, cntrSize=4, expSize=2, mode='static', numCntrs=1, verbose=[]):
+    def __init__ (self, cntrSize=4, expSize=2, mode='static', numCntrs=1, verbose=[], useTables=False, packed=False, fileName=None):
         
         """
         Initialize an array of cntrSize counters at the given mode. The cntrs are initialized to 0.
@@ -66,6 +66,10 @@ class CntrMaster (object):
             settings.VERBOSE_PCL           = print output to a .pcl file in the directory ../res/pcl_files
             settings.VERBOSE_DETAILS       = print to stdout details about the counter
             settings.VERBOSE_NOTE          = print to stdout notes, e.g. when the target cntr value is above its max or below its min.
+        useTables - when True, each cntr is kept as an integer code in a numpy array, and is decoded / incremented using tables, pre-computed by calcTables.
+        packed - when True, the integer codes are bit-packed, at exactly cntrSize bits per cntr (see PackedArray). Implies useTables.
+        fileName - when given, the cntrs' codes are bit-packed in a memory-mapped file, which persists after the process ends (see PackedArray.openCntrsFile). 
+                   If the file exists, the cntrs are reopened from it. Implies packed.
         """
         
         if (cntrSize<3):
@@ -74,8 +78,10 @@ class CntrMaster (object):
         self.cntrSize    = int(cntrSize)
         self.numCntrs    = int(numCntrs)
         self.verbose     = verbose
+        self.useTables   = useTables or packed or (fileName!=None)
+        self.packed      = packed or (fileName!=None)
+        self.fileName    = fileName
         self.cntrZeroVec = '0' * self.cntrSize
-        self.cntrs       = [self.cntrZeroVec] * self.numCntrs
         self.mode        = mode
         
         if (self.mode=='static'):
@@ -85,15 +91,51 @@ class CntrMaster (object):
             self.calcParamsDyn ()
         else:
             print ('error: mode {} of SEAD does not exist' .format (self.mode))
+        if (self.useTables):
+            self.calcTables ()
+        if (self.fileName==None):
+            self.rstAllCntrs ()
+        else: # reopen the cntrs kept in the file, if it exists
+            self.cntrs = PackedArray.openCntrsFile (fileName=self.fileName, numCntrs=self.numCntrs, cntrSize=self.cntrSize, settingsStr=self.genSettingsStr(), cntrZeroCode=self.cntrZeroCode)
              
+    def calcTables (self):
+        """
+        Pre-calculate the tables used when the cntrs are kept as integer codes (the code of a cntr is the integer whose binary representation is the cntr). 
+        self.valOfCode[c]  - the value represented by the cntr whose code is c.
+        self.nextCode[c]   - the code of the cntr reached when incrementing the cntr whose code is c by 1 succeeds. For the max cntr, nextCode[c]==c.
+        self.probOfInc1[c] - the prob' that incrementing the cntr whose code is c by 1 succeeds. The prob' is 0 for the max cntr.
+        self.sortedCodes   - the codes reachable from the zero cntr, in an increasing order of the values they represent. 
+        self.sortedVals    - self.sortedVals[i] is the value represented by the code self.sortedCodes[i].
+        self.vecOfCode[c]  - the binary vector of the cntr whose code is c.
+        In both the static and the dynamic modes, incrementing the mantissa, or (upon a mantissa overflow) incrementing the exponent and resetting the mantissa, 
+        is merely incrementing the code. Hence, nextCode[c]==c+1 for every c, except for the max cntr.
+        """
+        numCodes            = 1 << self.cntrSize
+        self.cntrZeroCode   = int (self.cntrZeroVec, base=2)
+        self.cntrMaxCode    = int (self.cntrMaxVec,  base=2)
+        self.vecOfCode      = [np.binary_repr (code, self.cntrSize) for code in range (numCodes)] 
+        self.valOfCode      = np.array ([self.cntr2num (cntr) for cntr in self.vecOfCode], dtype=float)
+        hasSuccessor        = (self.valOfCode < self.cntrMaxVal) # the successor of the max cntr is the max cntr itself
+        self.nextCode       = np.where (hasSuccessor, np.arange (1, numCodes+1), np.arange (numCodes))
+        self.probOfInc1     = np.zeros (numCodes)
+        self.probOfInc1[hasSuccessor] = 1 / (self.valOfCode[self.nextCode[hasSuccessor]] - self.valOfCode[hasSuccessor])
+        self.sortedCodes    = settings.calcSortedCodes (cntrZeroCode=self.cntrZeroCode, nextCode=self.nextCode)
+        self.sortedVals     = self.valOfCode[self.sortedCodes]
+
     def rstCntr (self, cntrIdx=0):
         """
         """
-        self.cntrs[cntrIdx] = self.cntrZeroVec
+        self.cntrs[cntrIdx] = self.cntrZeroCode if (self.useTables) else self.cntrZeroVec
+        
     def rstAllCntrs(self):
         """
         """
-        self.cntrs = [self.cntrZeroVec] * self.numCntrs
+        if (self.fileName!=None):
+            self.cntrs.fill (self.cntrZeroCode)
+        elif (self.useTables):
+            self.cntrs = PackedArray.genCntrsArray (numCntrs=self.numCntrs, cntrSize=self.cntrSize, cntrZeroCode=self.cntrZeroCode, packed=self.packed)
+        else:
+            self.cntrs = [self.cntrZeroVec] * self.numCntrs
 
     def calcParamsStat (self):
         """
@@ -183,6 +225,9 @@ class CntrMaster (object):
             - cntrDict['cntrVec'] is the counter's binary representation; cntrDict['val'] is its value.        
         """
         settings.checkCntrIdx (cntrIdx=cntrIdx, numCntrs=self.numCntrs, cntrType='SEAD')
+        if (self.useTables):
+            code = self.cntrs[cntrIdx]
+            return {'cntrVec' : self.vecOfCode[code], 'val' : self.valOfCode[code]}
         return {'cntrVec' : self.cntrs[cntrIdx], 'val' : self.cntr2num(self.cntrs[cntrIdx])}    
         
     # def setMantExpDelta (self, cntrIdx):
@@ -225,6 +270,14 @@ class CntrMaster (object):
           - cntrDict['cntrVec'] - the binary counter.
           - cntrDict['val']  - the counter's value.
         """
+        if (self.useTables):
+            if not(mult) and factor==1:
+                return self.incCntrBy1ByTables (cntrIdx=cntrIdx)
+            code      = self.cntrs[cntrIdx]
+            targetVal = (self.valOfCode[code] * factor) if mult else (self.valOfCode[code] + factor)
+            code      = settings.vals2codes (targetVals=targetVal, sortedVals=self.sortedVals, sortedCodes=self.sortedCodes)
+            self.cntrs[cntrIdx] = code
+            return {'cntrVec' : self.vecOfCode[code], 'val' : self.valOfCode[code]}
         self.targetVal = (self.cntr2num (self.cntrs[cntrIdx]) * factor) if mult else (self.cntr2num (self.cntrs[cntrIdx]) + factor)
         if (self.targetVal >= self.cntrMaxVal):
             self.cntrs[cntrIdx] = self.cntrMaxVec
@@ -235,6 +288,36 @@ class CntrMaster (object):
         # cntrRecord = 
         return self.incCntrStat (cntrIdx=cntrIdx) if (self.mode=='static') else self.incCntrDyn (cntrIdx=cntrIdx) #$$$ 
 
+    def incCntrs (self, indices, factors=1, mult=False):
+        """
+        Increase a batch of counters, as if incCntr (cntrIdx=indices[i], factor=factors[i], mult=mult) were called for each i, in order.
+        factors may be either an array of coefficients, one per index, or a single coefficient for all the indices.
+        When the cntrs are kept as integer codes (useTables), the increments are vectorized (see settings.incCntrsByTables); else, incCntr is called for each increment.
+        Returns an array of the cntrs' values, where the i-th entry is the value of cntr indices[i] right after applying its i-th increment.
+        """
+        if (self.useTables):
+            return settings.incCntrsByTables (self, indices=indices, factors=factors, mult=mult, cntrType='SEAD')
+        return settings.incCntrsOneByOne (self, indices=indices, factors=factors, mult=mult)
+
+    def queryCntrs (self, indices):
+        """
+        Query a batch of counters. Returns an array, whose i-th entry is the value of cntr indices[i].
+        """
+        if (self.useTables):
+            return settings.queryCntrsByTables (self, indices=indices, cntrType='SEAD')
+        return np.array ([self.queryCntr (cntrIdx)['val'] for cntrIdx in np.asarray (indices).tolist()], dtype=float)
+
+    def incCntrBy1ByTables (self, cntrIdx=0):
+        """
+        Increase a counter, kept as an integer code, by 1: a single random draw, and then (w.p. self.probOfInc1[code]) a single lookup in self.nextCode.
+        Works for both the static and the dynamic modes.
+        """
+        code = self.cntrs[cntrIdx]
+        if (random.random() < self.probOfInc1[code]): # when code is the max cntr, probOfInc1[code]==0 
+            code = self.nextCode[code]
+            self.cntrs[cntrIdx] = code
+        return {'cntrVec' : self.vecOfCode[code], 'val' : self.valOfCode[code]}
+
     def incCntrDyn (self, cntrIdx=0):
         
         offset  = max ([offset for offset in self.offsetOfExpVal if offset<=self.targetVal]) # find the maximal offset which is <= targetVal
@@ -5,10 +5,11 @@ Controller that runs simulations, using various types of couters.
 # from   pathlib import Path
 # from builtins import True False
 from statistics import mean 
-import os, math, pickle, time, random #sys
+import os, math, pickle, time, random, zlib #sys
+from concurrent.futures import ProcessPoolExecutor
 from printf import printf
 import numpy as np #, scipy.stats as st, pandas as pd
-import settings, F2P, SEAD, CEDAR, Morris, TetraStatic, TetraDynamic
+import settings, F2P, SEAD, CEDAR, Morris, TetraStatic, TetraDynamic, CntrMarkovChain, CntrLanes
 from datetime import datetime
 
 def main ():
@@ -28,8 +29,21 @@ def main ():
          numOfExps      = 50,
          erTypes        = ['WrRmse'], # The error modes to gather during the simulation. Options are: 'WrEr', 'WrRmse', 'RdEr', 'RdRmse' 
          cntrMaxVal     = None, 
+         simMethod      = 'perInc', # 'perInc', 'skipAhead', 'analytic', 'lanes'
          )
 
+# The key in SimController.cntrRecord of the array of the sums of errors collected at each experiment, for each erType
+erKeyOfErType = {'WrEr' : 'wrEr', 'WrRmse' : 'sumSqEr', 'RdEr' : 'RdEr', 'RdRmse' : 'sumSqEr'}
+
+# The error collected at each point, for each erType
+erOfRealValOfErType        = {'WrEr' : settings.absRelEr, 'WrRmse' : settings.sqRelEr, 'RdEr' : settings.absRelEr, 'RdRmse' : settings.sqRelEr}
+
+# The sum of the errors along an interval of real values, where the cntr's value is constant, for each type of read error
+sumOfErsOfIntervalOfErType = {'RdEr' : settings.sumAbsRelEr, 'RdRmse' : settings.sumSqRelEr}
+
+# The number of work units into which the experiments of each mode and erType are split, per worker process
+WORK_UNITS_PER_PROC = 4
+
 class SimController (object):
     """
     Controller that runs a simulation 
@@ -66,6 +80,173 @@ class SimController (object):
         else:
             printf (self.log_file, f'{infoStr}\n')
     
+    def skipAheadTransitions (self):
+        """
+        Simulate a single experiment of the cntr in self.cntrRecord['cntr'], by jumping directly from each transition (change of state) of the cntr to the next one.
+        The cntr is handled via its tables (valOfCode, nextCode, probOfInc1), where the state of the cntr is its code.
+        At each state, every real increment is sampled w.p. self.cntrRecord['sampleProb'], and a sampled increment succeeds w.p. probOfInc1[code].
+        Hence, the number of real increments until the next transition is geometrically distributed, with success prob' sampleProb*probOfInc1[code].
+        Yields a pair (realValCntr, cntrVal) upon each transition, where realValCntr is the number of real increments so far, 
+        and cntrVal is the cntr's new value, scaled by the sampling prob'.
+        When the cntr reaches its max value, the generator returns; however, if self.dwnSmple is set, the cntr is down-sampled and the generator continues. 
+        """
+        cntr        = self.cntrRecord['cntr']
+        code        = cntr.cntrZeroCode
+        realValCntr = 0 # will cnt the real values (the accurate value)
+        self.cntrRecord['sampleProb'] = 1 # probability of sampling
+        while (True):
+            probOfInc1 = cntr.probOfInc1[code]
+            if (probOfInc1==0): # the cntr reached its max value
+                if not (self.dwnSmple):
+                    return
+                code = int (settings.vals2codes (targetVals=cntr.valOfCode[code]/2, sortedVals=cntr.sortedVals, sortedCodes=cntr.sortedCodes)) # the cntr overflowed --> downsample
+                self.cntrRecord['sampleProb'] /= 2
+                if (settings.VERBOSE_DETAILS in self.verbose): 
+                    print ('smplProb={}' .format (self.cntrRecord['sampleProb'])) 
+                continue
+            realValCntr += settings.geomRand (probOfInc1 * self.cntrRecord['sampleProb'])
+            code         = cntr.nextCode[code]
+            yield realValCntr, cntr.valOfCode[code] / self.cntrRecord['sampleProb']
+    
+    def seedExp (self, erType, expNum):
+        """
+        If a master seed was given, seed both random and np.random for experiment expNum.
+        The seed depends only upon the master seed, the mode, erType and expNum. Hence, the results of each experiment are reproducible, 
+        regardless of the process running it, and of the other experiments run by that process.
+        """
+        if (self.masterSeed==None):
+            return
+        settings.seedRandGens ([self.masterSeed, zlib.crc32 (self.mode.encode()), zlib.crc32 (erType.encode()), expNum])
+
+    def runExps (self, erType):
+        """
+        Run all the experiments of the current mode, collecting errors of type erType into self.cntrRecord[erKeyOfErType[erType]] and self.numOfPoints,
+        where the j-th entry of each is the sum of errors, and the number of points, collected at experiment j.
+        For the write errors, the number of points varies, as it depends upon the random process of increasing the approximated cntr.
+        If self.simMethod=='lanes', run all the experiments at once, as the lanes of CntrLanes.
+        Else, if self.numOfProcs==1, run the experiments serially (see runExpsOfErTypes). Else, split the experiments into work units, and run them by self.pool.
+        """
+        if (erType in self.collectedErs): # the experiments were already run by a single pass, feeding all the erTypes (see runSinglePass)
+            self.cntrRecord[erKeyOfErType[erType]], self.numOfPoints = self.collectedErs[erType]
+            return
+        if (self.simMethod=='lanes'):
+            self.seedExp (erType=erType, expNum=0) # all the lanes draw from a single random stream
+            sumsOfErs, numsOfPoints = self.genCntrLanes().runErs ([erType])[erType]
+            self.cntrRecord[erKeyOfErType[erType]] = list (sumsOfErs)
+            self.numOfPoints                       = list (numsOfPoints)
+            return
+        if (self.numOfProcs==1):
+            self.cntrRecord[erKeyOfErType[erType]], self.numOfPoints = self.runExpsOfErTypes (range (self.numOfExps), [erType])[erType]
+            return
+        self.cntrRecord[erKeyOfErType[erType]], self.numOfPoints = self.runExpsByPool (erTypes=[erType])[erType]
+
+    # Generate the lanes for running all the experiments at once
+    genCntrLanes = lambda self : CntrLanes.CntrLanes (cntr=self.cntrRecord['cntr'], numOfLanes=self.numOfExps, maxRealVal=self.maxRealVal, dwnSmple=self.dwnSmple)
+
+    def runExpsByPool (self, erTypes):
+        """
+        Split the experiments into work units, run them by self.pool, collecting the errors of all the types in erTypes.
+        Each work unit is seeded by its own seed sequence, spawned from np.random.SeedSequence(self.masterSeed), as forked workers would otherwise inherit the same random state.
+        When self.masterSeed is None, fresh entropy is drawn; else, each experiment is further seeded by seedExp.
+        Return a dict, where dict[erType] is a pair of lists (sumsOfErs, numsOfPoints): the sum of errors of type erType, and the number of points, collected at each experiment. 
+        """
+        collectedErs = {erType : ([0] * self.numOfExps, [0] * self.numOfExps) for erType in erTypes}
+        workUnits    = [list (expNums) for expNums in np.array_split (range (self.numOfExps), self.numOfProcs*WORK_UNITS_PER_PROC) if len(expNums)>0]
+        seedSeqs     = np.random.SeedSequence (self.masterSeed).spawn (len(workUnits))
+        futures      = [self.pool.submit (runWorkUnit, self.simParams, self.mode, erTypes, expNums, seedSeq) for expNums, seedSeq in zip (workUnits, seedSeqs)]
+        for expNums, future in zip (workUnits, futures):
+            for erType, (sumsOfErs, numsOfPoints) in future.result ().items():
+                for expNum, sumOfErs, numOfPoints in zip (expNums, sumsOfErs, numsOfPoints):
+                    collectedErs[erType][0][expNum] = sumOfErs
+                    collectedErs[erType][1][expNum] = numOfPoints
+        return collectedErs
+
+    def runSinglePass (self):
+        """
+        Run all the experiments of the current mode once, feeding the accumulators of all the error types in self.erTypes at the same time.
+        The sums of errors and the numbers of points of each erType are kept in self.collectedErs. Then, the runSingleCntrSingleMode<erType> methods merely 
+        report these errors (see runExps). Hence, all the erTypes are calculated from the same random trajectories. 
+        """
+        if (self.simMethod=='lanes'):
+            self.seedExp (erType='+'.join (self.erTypes), expNum=0) # all the lanes draw from a single random stream
+            self.collectedErs = {erType : (list (sumsOfErs), list (numsOfPoints)) for erType, (sumsOfErs, numsOfPoints) in self.genCntrLanes().runErs (self.erTypes).items()}
+        elif (self.numOfProcs==1):
+            self.collectedErs = self.runExpsOfErTypes (range (self.numOfExps), self.erTypes)
+        else:
+            self.collectedErs = self.runExpsByPool (erTypes=self.erTypes)
+
+    def runExpsOfErTypes (self, expNums, erTypes):
+        """
+        Run the experiments whose numbers are in expNums, each in a single pass, collecting their errors of all the types in erTypes (see runExpOfErTypes).
+        Return a dict, where dict[erType] is a pair of lists (sumsOfErs, numsOfPoints): the sum of errors of type erType, and the number of points, collected at each experiment.
+        """
+        collectedErs = {erType : ([0] * self.numOfExps, [self.maxRealVal if (erType in ['RdEr', 'RdRmse']) else 0] * self.numOfExps) for erType in erTypes}
+        for expNum in expNums:
+            self.runExpOfErTypes (expNum, erTypes, collectedErs)
+        return collectedErs
+
+    def runExpOfErTypes (self, expNum, erTypes, collectedErs):
+        """
+        Run experiment expNum, and add its errors of all the types in erTypes to collectedErs[erType][0][expNum], and its numbers of points to collectedErs[erType][1][expNum].
+        A write error is collected upon each change of the cntr's value, till the cntr's value reaches self.maxRealVal, or till the cntr reaches its max value (if not self.dwnSmple).
+        A read error is collected at each of the real values 1, 2, ..., self.maxRealVal.
+        """
+        wrErTypes   = [erType for erType in erTypes if erType in ['WrEr', 'WrRmse']]
+        rdErTypes   = [erType for erType in erTypes if erType in ['RdEr', 'RdRmse']]
+        lastRealVal = math.ceil (self.maxRealVal)
+        self.seedExp (erType='+'.join (erTypes), expNum=expNum)
+        realValCntr = 0 # will cnt the real values (the accurate value)
+        cntrVal     = 0 # will cnt the counter's value
+        self.cntrRecord['cntr'].rstCntr ()
+        self.cntrRecord['sampleProb'] = 1 # probability of sampling
+        self.writeProgress (expNum)
+        wrActive, rdActive = len(wrErTypes)>0, len(rdErTypes)>0 # indicate whether write / read errors are still collected 
+        if (self.simMethod=='skipAhead'):
+            firstOfInterval = 1 # the cntr's value is cntrVal for the real values firstOfInterval, firstOfInterval+1, ...
+            for realValCntr, cntrNewVal in self.skipAheadTransitions ():
+                if (wrActive):
+                    for erType in wrErTypes:
+                        collectedErs[erType][0][expNum] += erOfRealValOfErType[erType] (realValCntr, cntrNewVal)
+                        collectedErs[erType][1][expNum] += 1
+                    wrActive = (cntrNewVal < self.maxRealVal)
+                if (rdActive):
+                    rdActive = (realValCntr <= lastRealVal) 
+                    if (rdActive):
+                        for erType in rdErTypes:
+                            collectedErs[erType][0][expNum] += sumOfErsOfIntervalOfErType[erType] (firstOfInterval, realValCntr-1, cntrVal)
+                        firstOfInterval, cntrVal = realValCntr, cntrNewVal
+                if not (wrActive or rdActive):
+                    break
+            for erType in rdErTypes: # the cntr's value is cntrVal till the end of the experiment
+                collectedErs[erType][0][expNum] += sumOfErsOfIntervalOfErType[erType] (firstOfInterval, lastRealVal, cntrVal)
+            return
+        while (wrActive or rdActive):
+            realValCntr += 1
+            if (self.cntrRecord['sampleProb']==1 or random.random() < self.cntrRecord['sampleProb']): # sample w.p. self.cntrRecord['sampleProb']
+                cntrAfterInc = self.cntrRecord['cntr'].incCntr (factor=int(1), mult=False, verbose=self.verbose)
+                cntrNewVal   = cntrAfterInc['val'] / self.cntrRecord['sampleProb']
+                if (settings.VERBOSE_DETAILS in self.verbose): 
+                    print ('realVal={:.0f} oldVal={:.0f}, cntrWoScaling={:.0f}, cntrNewValScaled={:.0f}, maxRealVal={:.0f}'
+                           .format (realValCntr, cntrVal, cntrAfterInc['val'], cntrNewVal, self.maxRealVal))
+                if (wrActive and cntrNewVal != cntrVal): # the counter was incremented
+                    for erType in wrErTypes:
+                        collectedErs[erType][0][expNum] += erOfRealValOfErType[erType] (realValCntr, cntrNewVal)
+                        collectedErs[erType][1][expNum] += 1
+                    wrActive = (cntrNewVal < self.maxRealVal)
+                cntrVal = cntrNewVal
+                if cntrAfterInc['val']==self.cntrRecord['cntr'].cntrMaxVal: 
+                    if self.dwnSmple: # the cntr overflowed --> downsample
+                        self.cntrRecord['cntr'].incCntr (mult=True, factor=1/2)
+                        self.cntrRecord['sampleProb'] /= 2
+                        if (settings.VERBOSE_DETAILS in self.verbose): 
+                            print ('smplProb={}' .format (self.cntrRecord['sampleProb'])) 
+                    else: # the cntr reached its maximum values and no down-sample is used --> finish collecting write errors
+                        wrActive = False
+            if (rdActive):
+                for erType in rdErTypes:
+                    collectedErs[erType][0][expNum] += erOfRealValOfErType[erType] (realValCntr, cntrVal)
+                rdActive = (realValCntr < self.maxRealVal)
+
     def runSingleCntrSingleModeWrEr (self, pclOutputFile=None):
         """
         Run a single counter of mode self.mode (self.mode is the approximation cntr architecture - e.g., 'F2P', 'CEDAR').  
@@ -76,37 +257,8 @@ class SimController (object):
         For each experiment, we calculate the avg of these relative error measurements along the simulation.
         This calculation conforms to the definition in the paper CEDAR.
         """
-        self.erType                  = 'wrEr'
-        self.cntrRecord[self.erType] = [0] * self.numOfExps
-        self.numOfPoints             = [0] * self.numOfExps # self.numOfPoints[j] will hold the number of points collected for statistic at experiment j. The number of points varies, as it depends upon the random process of increasing the approximated cntr. 
-        for expNum in range(self.numOfExps):
-            realValCntr = 0 # will cnt the real values (the accurate value)
-            cntrVal     = 0 # will cnt the counter's value
-            self.cntrRecord['cntr'].rstCntr ()
-            self.cntrRecord['sampleProb'] = 1 # probability of sampling
-            self.writeProgress (expNum)
-            while (cntrVal < self.maxRealVal):
-                realValCntr += 1
-                if (self.cntrRecord['sampleProb']==1 or random.random() < self.cntrRecord['sampleProb']): # sample w.p. self.cntrRecord['sampleProb']
-                    cntrAfterInc = self.cntrRecord['cntr'].incCntr (factor=int(1), mult=False, verbose=self.verbose)
-                    cntrNewVal   = cntrAfterInc['val'] / self.cntrRecord['sampleProb']
-                    if (settings.VERBOSE_DETAILS in self.verbose): 
-                        print ('realVal={:.0f} oldVal={:.0f}, cntrWoScaling={:.0f}, cntrNewValScaled={:.0f}, maxRealVal={:.0f}'
-                               .format (realValCntr, cntrVal, cntrAfterInc['val'], cntrNewVal, self.maxRealVal))
-                    if (cntrNewVal != cntrVal): # the counter was incremented
-                        cntrVal = cntrNewVal
-                        # curRelativeErr = abs(realValCntr - cntrVal)/realValCntr
-                        self.cntrRecord['wrEr'][expNum] += abs(realValCntr - cntrVal)/realValCntr
-                        self.numOfPoints       [expNum] += 1  
-                    if self.dwnSmple:
-                        if cntrAfterInc['val']==self.cntrRecord['cntr'].cntrMaxVal: # the cntr overflowed --> downsample
-                            self.cntrRecord['cntr'].incCntr (mult=True, factor=1/2)
-                            self.cntrRecord['sampleProb'] /= 2
-                        if (settings.VERBOSE_DETAILS in self.verbose): 
-                            print ('smplProb={}' .format (self.cntrRecord['sampleProb'])) 
-                    else:
-                        if cntrAfterInc['val']==self.cntrRecord['cntr'].cntrMaxVal: # the cntr reached its maximum values and no dwon-sample is used --> finish this experiment
-                            break  
+        self.erType        = 'wrEr'
+        self.runExps (erType='WrEr')
  
         if (settings.VERBOSE_LOG in self.verbose):
             printf (self.log_file, f'diff vector={self.cntrRecorwrErimeVar}\n\n')
@@ -152,36 +304,7 @@ class SimController (object):
         The type of statistic collected is the Round Square Mean Error of such write errors.
         """
         
-        self.cntrRecord['sumSqEr']  = [0] * self.numOfExps # self.cntrRecord['sumSqEr'][j] will hold the sum of the square errors collected at experiment j. 
-        self.numOfPoints            = [0] * self.numOfExps # self.numOfPoints[j] will hold the number of points collected for statistic at experiment j. The number of points varies, as it depends upon the random process of increasing the approximated cntr. 
-        for expNum in range(self.numOfExps):
-            realValCntr = 0 # will cnt the real values (the accurate value)
-            cntrVal     = 0 # will cnt the counter's value
-            self.cntrRecord['cntr'].rstCntr ()
-            self.cntrRecord['sampleProb'] = 1 # probability of sampling
-            self.writeProgress (expNum)
-            while cntrVal < self.maxRealVal:
-                realValCntr += 1
-                if (self.cntrRecord['sampleProb']==1 or random.random() < self.cntrRecord['sampleProb']): # sample w.p. self.cntrRecord['sampleProb']
-                    cntrAfterInc = self.cntrRecord['cntr'].incCntr (factor=int(1), mult=False, verbose=self.verbose)
-                    cntrNewVal   = cntrAfterInc['val'] / self.cntrRecord['sampleProb']
-                    if (settings.VERBOSE_DETAILS in self.verbose): 
-                        print ('realVal={:.0f} oldVal={:.0f}, cntrWoScaling={:.0f}, cntrNewValScaled={:.0f}, maxRealVal={:.0f}'
-                               .format (realValCntr, cntrVal, cntrAfterInc['val'], cntrNewVal, self.maxRealVal))
-                    if (cntrNewVal != cntrVal): # the counter was incremented
-                        cntrVal = cntrNewVal
-                        # curRelativeErr = ((realValCntr - cntrVal)/realValCntr)**2
-                        self.cntrRecord['sumSqEr'][expNum] += (((realValCntr - cntrVal)/realValCntr)**2)
-                        self.numOfPoints          [expNum] += 1
-                    if self.dwnSmple:
-                        if cntrAfterInc['val']==self.cntrRecord['cntr'].cntrMaxVal: # the cntr overflowed --> downsample
-                            self.cntrRecord['cntr'].incCntr (mult=True, factor=1/2)
-                            self.cntrRecord['sampleProb'] /= 2
-                        if (settings.VERBOSE_DETAILS in self.verbose): 
-                            print ('smplProb={}' .format (self.cntrRecord['sampleProb'])) 
-                    else:
-                        if cntrAfterInc['val']==self.cntrRecord['cntr'].cntrMaxVal: # the cntr reached its maximum values and no down-sample is used --> finish this experiment
-                            break  
+        self.runExps (erType='WrRmse')
  
         dict = self.calcRmseStat ()
         self.dumpDictToPcl       (dict, pclOutputFile)
@@ -197,31 +320,7 @@ class SimController (object):
         The type of statistic collected is the Round Square Mean Error of such write errors.
         """
     
-        self.cntrRecord['sumSqEr'] = [0] * self.numOfExps # self.cntrRecord['sumSqEr'][j] will hold the sum of the square errors collected at experiment j. 
-        self.numOfPoints           = [self.maxRealVal] * self.numOfExps # self.numOfPoints[j] will hold the number of points collected for statistic at experiment j. The number of points varies, as it depends upon the random process of increasing the approximated cntr. 
-    
-        for expNum in range(self.numOfExps):
-            realValCntr = 0 # will cnt the real values (the accurate value)
-            cntrVal     = 0 # will cnt the counter's value
-            self.cntrRecord['cntr'].rstCntr ()
-            self.cntrRecord['sampleProb'] = 1 # probability of sampling
-            self.maxRealVal = self.cntrMaxVal if (self.maxRealVal==None) else self.maxRealVal 
-            self.writeProgress (expNum)
-            while realValCntr < self.maxRealVal:
-                realValCntr += 1
-                if (self.cntrRecord['sampleProb']==1 or random.random() < self.cntrRecord['sampleProb']): # sample w.p. self.cntrRecord['sampleProb']
-                    cntrAfterInc = self.cntrRecord['cntr'].incCntr (factor=int(1), mult=False, verbose=self.verbose)
-                    cntrNewVal   = cntrAfterInc['val'] / self.cntrRecord['sampleProb']
-                    if (settings.VERBOSE_DETAILS in self.verbose): 
-                        print ('realVal={:.0f} oldVal={:.0f}, cntrWoScaling={:.0f}, cntrNewValScaled={:.0f}, maxRealVal={:.0f}'
-                               .format (realValCntr, cntrVal, cntrAfterInc['val'], cntrNewVal, self.maxRealVal))
-                    cntrVal = cntrNewVal
-                    if (self.dwnSmple and cntrAfterInc['cntrVec']==self.cntrRecord['cntr'].cntrMaxVec): # the cntr overflowed --> downsample
-                        self.cntrRecord['cntr'].incCntr (mult=True, factor=1/2)
-                        self.cntrRecord['sampleProb'] /= 2
-                        if (settings.VERBOSE_DETAILS in self.verbose): 
-                            print ('smplProb={}' .format (self.cntrRecord['sampleProb'])) 
-                self.cntrRecord['sumSqEr'][expNum] += (((realValCntr - cntrVal)/realValCntr)**2)
+        self.runExps (erType='RdRmse')
         if (settings.VERBOSE_LOG in self.verbose):
             printf (self.log_file, 'diff vector={}\n\n' .format (self.cntrRecord['wrErVar']))
     
@@ -239,30 +338,7 @@ class SimController (object):
         as the difference between the measured value, and the value represented by the cntr.
         """
     
-        self.cntrRecord['RdEr'] = [0] * self.numOfExps
-        self.numOfPoints        = [self.maxRealVal] * self.numOfExps # self.numOfPoints[j] will hold the number of points collected for statistic at experiment j. The number of points varies, as it depends upon the random process of increasing the approximated cntr. 
-    
-        for expNum in range(self.numOfExps):
-            realValCntr = 0 # will cnt the real values (the accurate value)
-            cntrVal     = 0 # will cnt the counter's value
-            self.cntrRecord['cntr'].rstCntr ()
-            self.cntrRecord['sampleProb'] = 1 # probability of sampling
-            self.writeProgress (expNum)
-            while realValCntr < self.maxRealVal:
-                realValCntr += 1
-                if (self.cntrRecord['sampleProb']==1 or random.random() < self.cntrRecord['sampleProb']): # sample w.p. self.cntrRecord['sampleProb']
-                    cntrAfterInc = self.cntrRecord['cntr'].incCntr (factor=int(1), mult=False, verbose=self.verbose)
-                    cntrNewVal   = cntrAfterInc['val'] / self.cntrRecord['sampleProb']
-                    if (settings.VERBOSE_DETAILS in self.verbose): 
-                        print ('realVal={:.0f} oldVal={:.0f}, cntrWoScaling={:.0f}, cntrNewValScaled={:.0f}, maxRealVal={:.0f}'
-                               .format (realValCntr, cntrVal, cntrAfterInc['val'], cntrNewVal, self.maxRealVal))
-                    cntrVal = cntrNewVal
-                    if (self.dwnSmple and cntrAfterInc['cntrVec']==self.cntrRecord['cntr'].cntrMaxVec): # the cntr overflowed --> downsample
-                        self.cntrRecord['cntr'].incCntr (mult=True, factor=1/2)
-                        self.cntrRecord['sampleProb'] /= 2
-                        if (settings.VERBOSE_DETAILS in self.verbose): 
-                            print ('smplProb={}' .format (self.cntrRecord['sampleProb'])) 
-                self.cntrRecord['RdEr'][expNum] += abs(realValCntr - cntrVal)/realValCntr
+        self.runExps (erType='RdEr')
  
         if (settings.VERBOSE_LOG in self.verbose):
             printf (self.log_file, f'diff vector={self.cntrRecorRdErimeVar}\n\n')
@@ -285,6 +361,41 @@ class SimController (object):
         self.dumpDictToPcl       (dict, pclOutputFile)
         self.writeDictToResFile  (dict, self.resFile)
         
+    def runSingleCntrSingleModeAnalytic (self, pclOutputFile=None): 
+        """
+        Calculate the expected error of type self.erType of a single counter of mode self.mode analytically, using CntrMarkovChain, rather than by simulation.
+        The expected sums of errors of all the error types are calculated once per counter, and cached in self.cntrRecord['expectedSumsOfErs'].
+        The number of points of both the write and the read errors is deterministic. Hence, WrEr and RdEr are the expected values of the simulated statistics (exact for small counters; for large counters, the hitting times are binned - see CntrMarkovChain).
+        For WrRmse and RdRmse, the root of the expected mean square error is calculated, rather than the expected root of the mean square error of a single experiment.
+        As no experiments are run, the confidence interval is [Avg, Avg].
+        """
+        if not ('expectedSumsOfErs' in self.cntrRecord):
+            self.cntrRecord['expectedSumsOfErs'] = CntrMarkovChain.CntrMarkovChain (cntr=self.cntrRecord['cntr'], maxRealVal=self.maxRealVal).calcExpectedSumsOfErs ()
+        sums = self.cntrRecord['expectedSumsOfErs']
+        if (self.erType in ['WrEr', 'WrRmse']):
+            numOfPoints = int (np.argmax (self.cntrRecord['cntr'].sortedVals >= self.maxRealVal))
+        else:
+            numOfPoints = self.maxRealVal 
+        if (self.erType=='WrEr'):
+            avg = sums['WrEr'] / numOfPoints
+        elif (self.erType=='RdEr'):
+            avg = sums['RdEr'] / numOfPoints
+        else: # RMSE, normalized by the number of points, as in calcRmseStat
+            avg = math.sqrt (sums[self.erType.replace('Rmse', 'SqEr')] / numOfPoints) / numOfPoints
+        dict = {'erType'            : self.erType,
+                'numOfExps'         : 0,
+                'mode'              : self.cntrRecord['mode'],
+                'cntrSize'          : self.cntrSize, 
+                'cntrMaxVal'        : self.cntrMaxVal,
+                'settingsStr'       : self.cntrRecord['cntr'].genSettingsStr(),
+                'Avg'               : avg,
+                'Lo'                : avg,
+                'Hi'                : avg}
+        if settings.VERBOSE_PCL in self.verbose:
+            self.dumpDictToPcl      (dict, pclOutputFile)
+        if settings.VERBOSE_RES in self.verbose:
+            self.writeDictToResFile (dict, self.resFile)
+        
     def calcRmseStat (self) -> dict: 
         """
         Calculate and potentially print to .log and/or .res file (based on self.verbose) the RMSE statistics based on the values measured and stored in self.cntrRecord['sumSqEr'].
@@ -308,10 +419,9 @@ class SimController (object):
                 'Lo'            : normRmseConfInterval[0],
                 'Hi'            : normRmseConfInterval[1]}
 
-    def runSingleCntrSingleMode (self):
+    def genCntrRecord (self):
         """
-        Run a single counter for the given mode for the requested numOfExps, and write the results (statistics
-        about the absolute/relative error) to a .res file.
+        Generate self.cntrRecord, which holds the counter of mode self.mode to run, and set self.maxRealVal accordingly.
         """        
         if (self.cntrMaxVal==None):
             conf = settings.getConfByCntrSize (cntrSize=self.cntrSize)
@@ -320,37 +430,49 @@ class SimController (object):
             self.hyperMaxSize = conf['hyperMaxSize'] 
                     
         # Set self.cntrRecord, which holds the counter to run
+        useTables = (self.simMethod!='perInc') # simulation methods other than 'perInc' operate on the cntr's tables
         if (self.mode=='F2P'):
             self.expSize      = conf['f2pExpSize']
-            self.cntrRecord = {'mode' : 'F2P', 'cntr' : F2P.CntrMaster(mode='F2P', cntrSize=self.cntrSize, hyperSize=self.hyperSize, verbose=self.verbose)}
+            self.cntrRecord = {'mode' : 'F2P', 'cntr' : F2P.CntrMaster(mode='F2P', cntrSize=self.cntrSize, hyperSize=self.hyperSize, verbose=self.verbose, useTables=useTables)}
         elif (self.mode=='F3P'):
             if (self.cntrMaxVal==None):
                 self.hyperMaxSize=conf['hyperMaxSize']
             else:
                 if (self.hyperMaxSize==None):
                     settings.error ('To simulate F3P, If cntrMaxVal is specified, you must specify also hyperMaxSize')
-            self.cntrRecord = {'mode' : 'F3P', 'cntr' : F2P.CntrMaster(mode='F3P', cntrSize=self.cntrSize, hyperMaxSize=self.hyperMaxSize)}
+            self.cntrRecord = {'mode' : 'F3P', 'cntr' : F2P.CntrMaster(mode='F3P', cntrSize=self.cntrSize, hyperMaxSize=self.hyperMaxSize, useTables=useTables)}
 
         elif (self.mode=='SEAD stat'):
             self.expSize      = conf['seadExpSize']
-            self.cntrRecord = {'mode' : self.mode, 'cntr' : SEAD.CntrMaster(mode='static', cntrSize=self.cntrSize, expSize=self.expSize)}
+            self.cntrRecord = {'mode' : self.mode, 'cntr' : SEAD.CntrMaster(mode='static', cntrSize=self.cntrSize, expSize=self.expSize, useTables=useTables)}
         elif (self.mode=='SEAD dyn'):
-            self.cntrRecord = {'mode' : self.mode, 'cntr' : SEAD.CntrMaster(mode='dynamic', cntrSize=self.cntrSize)}
+            self.cntrRecord = {'mode' : self.mode, 'cntr' : SEAD.CntrMaster(mode='dynamic', cntrSize=self.cntrSize, useTables=useTables)}
         elif (self.mode=='CEDAR'):
             self.cntrRecord = {'mode' : self.mode, 'cntr' : CEDAR.CntrMaster(cntrSize=self.cntrSize, cntrMaxVal=self.cntrMaxVal)}
         elif (self.mode=='Morris'):
             self.cntrRecord = {'mode' : self.mode, 'cntr' : Morris.CntrMaster(cntrSize=self.cntrSize, cntrMaxVal=self.cntrMaxVal)}
         elif (self.mode=='Tetra stat'):
-            self.cntrRecord = {'mode' : self.mode, 'cntr' : TetraStatic.CntrMaster(cntrSize=self.cntrSize, tetraSize=conf['tetraSize'])}
+            self.cntrRecord = {'mode' : self.mode, 'cntr' : TetraStatic.CntrMaster(cntrSize=self.cntrSize, tetraSize=conf['tetraSize'], useTables=useTables)}
         elif (self.mode=='Tetra dyn'):
-            self.cntrRecord = {'mode' : self.mode, 'cntr' : TetraDynamic.CntrMaster(cntrSize=self.cntrSize, tetraMaxSize=conf['tetraMaxSize'])}
+            self.cntrRecord = {'mode' : self.mode, 'cntr' : TetraDynamic.CntrMaster(cntrSize=self.cntrSize, tetraMaxSize=conf['tetraMaxSize'], useTables=useTables)}
         else:
             settings.error ('mode {} that you chose is not supported' .format (self.mode))
+        if (useTables and not (hasattr (self.cntrRecord['cntr'], 'probOfInc1'))):
+            settings.error ('Sorry, simMethod {} is not supported yet for mode {}' .format (self.simMethod, self.mode))
+        if (self.simMethod=='analytic' and self.dwnSmple):
+            settings.error ('Sorry, simMethod analytic does not support down-sampling')
 
         self.maxRealVal         = self.cntrMaxVal if (self.maxRealVal==None) else self.maxRealVal
         if self.cntrRecord['cntr'].cntrMaxVal < self.maxRealVal and (not(self.dwnSmple)):
             settings.error ('This counter can reach max val={} which is smaller than the requested maxRealVal {}, and no dwn smpling was used' .format (self.cntrRecord['cntr'].cntrMaxVal, self.maxRealVal))
 
+    def runSingleCntrSingleMode (self):
+        """
+        Run a single counter for the given mode for the requested numOfExps, and write the results (statistics
+        about the absolute/relative error) to a .res file.
+        """        
+        self.genCntrRecord ()
+
         # open output files
         outputFileStr = '1cntr_{}{}' .format (self.machineStr, '_w_dwnSmpl' if self.dwnSmple else '')
         if (settings.VERBOSE_RES in self.verbose):
@@ -360,9 +482,15 @@ class SimController (object):
                 datetime.now().strftime("%H:%M:%S"), self.mode, self.cntrSize, self.maxRealVal, self.cntrRecord['cntr'].cntrMaxVal))
         
         # run the simulation          
+        for erType in self.erTypes:
+            if not (erType in ['WrEr', 'WrRmse', 'RdEr', 'RdRmse']):
+                settings.error (f'Sorry, the requested error mode {erType} is not supported')
+        self.collectedErs = {}
+        if (self.singlePass and len(self.erTypes)>1 and self.simMethod!='analytic'):
+            simT = time.time()
+            self.runSinglePass ()
+            print ('finished a single pass over all the error modes. Elapsed time={:.2f} secs' .format (time.time() - simT))
         for self.erType in self.erTypes:
-            if not (self.erType in ['WrEr', 'WrRmse', 'RdEr', 'RdRmse']):
-                settings.error ('Sorry, the requested error mode {self.erType} is not supported')
             pclOutputFile = None # default value
             if settings.VERBOSE_PCL in self.verbose:
                 pclOutputFile = self.openPclOuputFile (pclOutputFileName=f'{outputFileStr}_{self.erType}.pcl')
@@ -371,7 +499,10 @@ class SimController (object):
             if (settings.VERBOSE_LOG in self.verbose or settings.VERBOSE_PROGRESS in self.verbose):
                 self.log_file = open (f'../res/log_files/{infoStr}.log', 'w')
             self.writeProgress (infoStr=infoStr)
-            getattr (self, f'runSingleCntrSingleMode{self.erType}') (pclOutputFile) # Call the corresponding function, according to erType (read/write error, regular/RMSE).
+            if (self.simMethod=='analytic'):
+                self.runSingleCntrSingleModeAnalytic (pclOutputFile)
+            else:
+                getattr (self, f'runSingleCntrSingleMode{self.erType}') (pclOutputFile) # Call the corresponding function, according to erType (read/write error, regular/RMSE).
             self.closePclOuputFile(pclOutputFile)
             print ('finished. Elapsed time={:.2f} secs' .format (time.time() - simT))
 
@@ -404,6 +535,10 @@ class SimController (object):
                        numOfExps    = 1,    # number of experiments to run. 
                        dwnSmple     = False,# When True, down-sample each time the counter's maximum value is reached.
                        erTypes      = [],
+                       numOfProcs   = 1,    # number of worker processes running the experiments. When 1 (default), the experiments run serially in this process.
+                       masterSeed   = None, # When not None, each experiment is seeded by a seed derived from masterSeed, so that the results are reproducible (see seedExp).
+                       singlePass   = True, # When True and several erTypes are requested, run each experiment once, feeding all the erTypes at the same time (see runSinglePass). 
+                       simMethod    = 'perInc', # The simulation method. Either 'perInc' (simulate each real increment), 'skipAhead' (jump directly from one transition of the cntr to the next; see skipAheadTransitions), 'analytic' (calculate the expected errors analytically; see runSingleCntrSingleModeAnalytic), or 'lanes' (run all the experiments at once; see CntrLanes).
                        ):
         """
         run a single counter of each given mode for the requested numOfExps.
@@ -417,6 +552,12 @@ class SimController (object):
         The read error of a counter is caluclated as follows:
             Upon each increment of the real cntr (measured) value, define the error as the difference between the measured value, 
             and the value represented by the cntr.
+        The write errors change only when the cntr changes its state. Hence, simMethod='skipAhead' samples the number of real increments till the 
+        cntr's next transition (see skipAheadTransitions), rather than simulating each real increment. This yields the same distribution of hitting times, 
+        at a cost proportional to the number of the cntr's transitions, rather than to maxRealVal. 
+        Similarly, the read errors are summed in closed form along each interval between consecutive transitions, where the cntr's value is constant.
+        simMethod='analytic' runs no experiments at all: it calculates the expected errors by analyzing the cntr as a Markov chain (see CntrMarkovChain), at a bounded cost per state of the chain.
+        simMethod='lanes' runs all the experiments at once, as vector lanes advanced by batched random draws (see CntrLanes).
         """
         self.cntrSize       = cntrSize
         self.maxRealVal     = maxRealVal
@@ -427,12 +568,49 @@ class SimController (object):
         self.numOfExps      = numOfExps
         self.dwnSmple       = dwnSmple
         self.erTypes        = erTypes # the error modes to calculate. See possible erTypes in the documentation above.
+        self.simMethod      = simMethod
+        self.numOfProcs     = numOfProcs
+        self.singlePass     = singlePass
+        self.masterSeed     = masterSeed
+        if not (self.simMethod in ['perInc', 'skipAhead', 'analytic', 'lanes']):
+            settings.error (f'Sorry, the requested simMethod {self.simMethod} is not supported')
         if (settings.VERBOSE_DETAILED_LOG in self.verbose): # a detailed log include also all the prints of a simple log
             verbose.append(settings.VERBOSE_LOG)
-        for self.mode in modes:
-            self.runSingleCntrSingleMode ()
+        if (self.numOfProcs==1):
+            for self.mode in modes:
+                self.runSingleCntrSingleMode ()
+            return
+        
+        # The params by which each worker process regenerates the simulation. The workers write no output files.
+        self.simParams = {'cntrSize'     : self.cntrSize,     'maxRealVal' : self.maxRealVal, 'cntrMaxVal' : self.cntrMaxVal, 
+                          'hyperSize'    : self.hyperSize,    'hyperMaxSize' : self.hyperMaxSize, 'expSize' : self.expSize, 
+                          'numOfExps'    : self.numOfExps,    'dwnSmple'   : self.dwnSmple,   'simMethod'  : self.simMethod, 
+                          'masterSeed'   : self.masterSeed,   'numOfProcs' : 1,
+                          'verbose'      : [verb for verb in self.verbose if (verb in [settings.VERBOSE_PCL, settings.VERBOSE_DETAILS])]}
+        with ProcessPoolExecutor (max_workers=self.numOfProcs) as self.pool:
+            for self.mode in modes:
+                self.runSingleCntrSingleMode ()
         return
 
+def runWorkUnit (simParams, mode, erTypes, expNums, seedSeq=None):
+    """
+    Run the experiments expNums of a single counter of the given mode, collecting errors of the types in erTypes. Run by the worker processes of SimController.pool.
+    If erTypes includes several erTypes, each experiment feeds all of them in a single pass (see SimController.runExpOfErTypes).
+    simParams - the params of the simulation (see SimController.runSingleCntr).
+    seedSeq   - when given, the random generators of the worker are seeded by it (an np.random.SeedSequence - see settings.seedRandGens).
+    Returns a dict, where dict[erType] is a pair of lists: the sums of errors, and the number of points, collected at each of the experiments.
+    """
+    if (seedSeq!=None):
+        settings.seedRandGens (seedSeq)
+    simController = SimController (verbose=simParams['verbose'])
+    simController.__dict__.update (simParams)
+    simController.mode    = mode
+    simController.erTypes = erTypes
+    simController.genCntrRecord ()
+    collectedErs = simController.runExpsOfErTypes (expNums, erTypes)
+    return {erType : ([sumsOfErs[expNum] for expNum in expNums], [numsOfPoints[expNum] for expNum in expNums]) 
+            for erType, (sumsOfErs, numsOfPoints) in collectedErs.items()}
+
 if __name__ == '__main__':
     try: 
         main ()
@@ -0,0 +1,70 @@
+import os
+import numpy as np
+import settings
+from CountMinSketch import CountMinSketch
+
+class SlidingWindowSketch:
+    """
+    A sliding-window count min sketch: a ring of numOfEpochs sub-sketches, one per epoch (e.g., a time interval). The arriving flows increment the sub-sketch of the current epoch.
+    Upon advancing to the next epoch (see advanceEpoch), the sub-sketch of the oldest epoch is reset and reused, so no sketch is ever rebuilt.
+    A query is answered over the last numOfEpochs epochs (or fewer), including the current one.
+    All the sub-sketches share the same hash functions; hence, a flow is mapped to the same counters in all of them, and the window's estimate of a flow
+    is the minimum over the rows of the sum of its counters over the epochs in the window - which is never above the sum of the sub-sketches' estimates.
+    A file-backed ring (see flush) is reopened by generating a SlidingWindowSketch with the same numOfEpochs and sketchParams: the sub-sketches are reopened from their files,
+    and the position of the ring (curEpoch and numOfEpochsSeen) from the file fileName.epochs.
+    """
+    def __init__(self,
+                 numOfEpochs,   # the number of epochs kept, namely, the max length of the window, in epochs.
+                 sketchParams   # a dict of the arguments of CountMinSketch.__init__, common to all the sub-sketches. If it has a fileName, sub-sketch i is kept in the file fileName.i.
+                 ):
+        if numOfEpochs<1:
+            settings.error('SlidingWindowSketch: numOfEpochs={} should be positive'.format(numOfEpochs))
+        self.numOfEpochs = numOfEpochs
+        fileName         = sketchParams.get('fileName')
+        self.sketches    = [CountMinSketch(**dict(sketchParams, fileName=None if (fileName==None) else '{}.{}'.format(fileName, epoch))) for epoch in range(numOfEpochs)]
+        self.curEpoch    = 0 # the index of the sub-sketch of the current epoch in self.sketches
+        self.numOfEpochsSeen = 1
+        self.epochsFileName  = None if (fileName==None) else '{}.epochs'.format(fileName)
+        if self.epochsFileName!=None and os.path.exists(self.epochsFileName): # a reopened ring: restore its position, saved by flush
+            self.curEpoch, self.numOfEpochsSeen = np.fromfile(self.epochsFileName, dtype=np.int64).tolist()
+
+    def advanceEpoch(self):
+        """
+        Start a new epoch: the sub-sketch of the oldest epoch in the ring is reset, and becomes the current one.
+        """
+        self.curEpoch = (self.curEpoch + 1) % self.numOfEpochs
+        self.sketches[self.curEpoch].rst()
+        self.numOfEpochsSeen += 1
+
+    # The sub-sketches of the last numOfEpochs epochs (of all the epochs kept, if numOfEpochs is None), from the current epoch backwards
+    sketchesInWindow = lambda self, numOfEpochs=None : [self.sketches[(self.curEpoch - i) % self.numOfEpochs]
+                                                        for i in range(min(self.numOfEpochs, self.numOfEpochsSeen) if (numOfEpochs==None) else min(numOfEpochs, self.numOfEpochs, self.numOfEpochsSeen))]
+
+    def incFlow(self, flow):
+        # increment the flow in the sub-sketch of the current epoch
+        self.sketches[self.curEpoch].incFlow(flow)
+
+    def incFlows(self, flows, weights=None):
+        # increment a batch of flows in the sub-sketch of the current epoch (see CountMinSketch.incFlows)
+        self.sketches[self.curEpoch].incFlows(flows, weights)
+
+    def queryFlows(self, flows, numOfEpochs=None):
+        """
+        Query a batch of flows over the last numOfEpochs epochs (over all the epochs kept, if numOfEpochs is None).
+        Returns an array, whose i-th entry is the estimate of flows[i] in the window.
+        """
+        sketches             = self.sketchesInWindow(numOfEpochs)
+        mappedCntrs, inverse = sketches[0].mappedCntrsOfFlows(flows)
+        sumOfCntrs           = sum([sketch.countersArray.queryCntrs(mappedCntrs.ravel()) / sketch.sampleProb for sketch in sketches])
+        return sumOfCntrs.reshape(-1, sketches[0].depth).min(axis=1)[inverse]
+
+    def queryFlow(self, flow, numOfEpochs=None):
+        # Query a single flow over the last numOfEpochs epochs (see queryFlows)
+        return self.queryFlows(np.array([flow]), numOfEpochs)[0]
+
+    def flush(self):
+        # Snapshot all the file-backed sub-sketches (see CountMinSketch.flush), and the position of the ring
+        for sketch in self.sketches:
+            sketch.flush()
+        if self.epochsFileName!=None:
+            np.array([self.curEpoch, self.numOfEpochsSeen], dtype=np.int64).tofile(self.epochsFileName)
@@ -0,0 +1,225 @@
+"""
+Space-Saving (Metwally, Agrawal and El Abbadi): a summary of the (at most) numOfEntries flows with the highest counts, whose counts are kept in compact approximate counters.
+Each entry (a "slot") holds a flow and a counter of a CntrMaster of any of the counter modes (see CountMinSketch.genCntrMaster), so the counts are kept in cntrSize bits each.
+The slots are organized in a stream-summary: a doubly-linked list of buckets, sorted by their values, where each bucket holds a doubly-linked list of the slots whose counters have the bucket's value.
+A unit increment moves the slot from its bucket to the next (or to a new bucket between them), as the approximate counters move only between representable values;
+hence, an update and an eviction (which takes a slot from the bucket of the minimal value) take O(1).
+The links are kept in arrays indexed by the slots and by the buckets (there are at most numOfEntries+1 buckets), rather than in Python objects, so that the memory
+per slot remains small relative to the compact counter: beside the counter, a slot takes 3 int32 links, the flow (a uint64), its error (a float64, if tracked),
+a bucket (a float64 value and 3 int32 links), and an entry in the map of the kept flows to their slots (a dict) - see sizeInBytes.
+The arrays are of the array module, whose items are accessed one by one much faster than those of numpy arrays.
+The flows are non-negative integers (e.g., the flow IDs of Workload, or the flows of Trace).
+Misra-Gries is isomorphic to Space-Saving (the same flows are reported); hence, it is not implemented separately.
+"""
+import sys
+from array import array
+import numpy as np
+import settings
+from CountMinSketch import genCntrMaster, calcCntrsSizeInBytes
+
+NIL = -1 # a null link
+
+class SpaceSaving (object):
+
+    def __init__ (self, numOfEntries, mode, conf, packed=False, trackErrs=True):
+        """
+        numOfEntries - the number of slots, namely, the max number of flows kept.
+        mode, conf   - the mode of the counters, and a dictionary that holds the value of cntrSize, cntrMaxVal, hyperSize and so on (see CountMinSketch.genCntrMaster).
+        packed       - when True, the codes of the counters are bit-packed, at exactly cntrSize bits per counter (see PackedArray).
+        trackErrs    - when True, the over-estimation of the flow in each slot (the value inherited upon its insertion) is kept as well, in a float64 per slot,
+                       and reported by topK and aboveThreshold.
+        """
+        if (numOfEntries<1):
+            settings.error ('SpaceSaving: numOfEntries={} should be positive' .format (numOfEntries))
+        self.numOfEntries  = numOfEntries
+        self.mode          = mode
+        self.cntrMaster    = genCntrMaster (mode=mode, conf=conf, numCntrs=numOfEntries, packed=packed)
+        self.trackErrs     = trackErrs
+        self.rst ()
+
+    def rst (self):
+        """
+        Remove all the flows, and reset all the counters.
+        """
+        self.cntrMaster.rstAllCntrs ()
+        self.flowOfSlot     = array ('Q', bytes (8*self.numOfEntries))
+        self.slotOfFlow     = {}
+        self.numOfUsedSlots = 0 # the slots 0, ..., numOfUsedSlots-1 are used
+        self.errs           = array ('d', bytes (8*self.numOfEntries)) if (self.trackErrs) else None
+
+        # The slots of each bucket are a doubly-linked list, by slotPrev and slotNext
+        self.bucketOfSlot   = array ('i', bytes (4*self.numOfEntries))
+        self.slotPrev       = array ('i', range (-1, self.numOfEntries-1))
+        self.slotNext       = array ('i', range (1, self.numOfEntries+1))
+        self.slotNext[-1]   = NIL
+
+        # The buckets are a doubly-linked list, by bucketPrev and bucketNext, from self.minBucket to self.maxBucket. The free buckets are a list by bucketNext, from self.freeBucket
+        numOfBuckets        = self.numOfEntries+1 # a new bucket is generated before the bucket it replaces is freed
+        self.bucketVal      = array ('d', bytes (8*numOfBuckets))
+        self.bucketPrev     = array ('i', [NIL]) * numOfBuckets
+        self.bucketNext     = array ('i', range (1, numOfBuckets+1))
+        self.bucketNext[-1] = NIL
+        self.firstSlotOfBucket = array ('i', [NIL]) * numOfBuckets
+        self.freeBucket     = 0
+        zeroBucket          = self.allocBucket (val=self.cntrMaster.queryCntr (0)['val'], prev=NIL, next=NIL) # all the slots are initially in the bucket of the zero value
+        self.firstSlotOfBucket[zeroBucket] = 0
+        self.minBucket      = zeroBucket # the head of the list of buckets
+        self.maxBucket      = zeroBucket # the tail of the list of buckets
+
+    __len__      = lambda self : self.numOfUsedSlots
+    __contains__ = lambda self, flow : flow in self.slotOfFlow
+
+    # The memory occupied by the counters, in bytes
+    cntrsSizeInBytes = lambda self : calcCntrsSizeInBytes (self.cntrMaster.cntrs)
+
+    def sizeInBytes (self):
+        """
+        Return the memory occupied by the whole summary, in bytes: the counters, the arrays of the flows, errors and links, and the map of the kept flows to their slots
+        (the dict, and the Python ints of its keys and values).
+        """
+        arrays = [self.flowOfSlot, self.bucketOfSlot, self.slotPrev, self.slotNext, self.bucketVal, self.bucketPrev, self.bucketNext, self.firstSlotOfBucket] + ([self.errs] if (self.trackErrs) else [])
+        return self.cntrsSizeInBytes () + sum ([len(ar) * ar.itemsize for ar in arrays]) + sys.getsizeof (self.slotOfFlow) + \
+               sum ([sys.getsizeof (flow) + sys.getsizeof (slot) for flow, slot in self.slotOfFlow.items ()])
+
+    def allocBucket (self, val, prev, next):
+        """
+        Take a free bucket, set its value to val, link it between the buckets prev and next (either of which may be NIL), and return it.
+        """
+        bucket          = self.freeBucket
+        self.freeBucket = self.bucketNext[bucket]
+        self.bucketVal[bucket], self.bucketPrev[bucket], self.bucketNext[bucket] = val, prev, next
+        self.firstSlotOfBucket[bucket] = NIL
+        if (prev==NIL):
+            self.minBucket = bucket
+        else:
+            self.bucketNext[prev] = bucket
+        if (next==NIL):
+            self.maxBucket = bucket
+        else:
+            self.bucketPrev[next] = bucket
+        return bucket
+
+    def freeBucketOf (self, bucket):
+        """
+        Unlink an (empty) bucket from the list of buckets, and return it to the free buckets.
+        """
+        prev, next = self.bucketPrev[bucket], self.bucketNext[bucket]
+        if (prev==NIL):
+            self.minBucket = next
+        else:
+            self.bucketNext[prev] = next
+        if (next==NIL):
+            self.maxBucket = prev
+        else:
+            self.bucketPrev[next] = prev
+        self.bucketNext[bucket] = self.freeBucket
+        self.freeBucket         = bucket
+
+    def moveSlot (self, slot, newVal):
+        """
+        Move a slot, whose counter has increased to newVal, from its bucket to the bucket of newVal, which is generated if needed.
+        The bucket of newVal is searched for from the slot's bucket onwards; with unit increments, it's either the next bucket, or a new one right before it.
+        """
+        bucket = self.bucketOfSlot[slot]
+        if (newVal==self.bucketVal[bucket]):
+            return
+        prev, next = bucket, self.bucketNext[bucket]
+        while (next!=NIL and self.bucketVal[next] < newVal):
+            prev, next = next, self.bucketNext[next]
+        if (next!=NIL and self.bucketVal[next]==newVal):
+            newBucket = next
+        else:
+            newBucket = self.allocBucket (val=newVal, prev=prev, next=next)
+
+        # unlink the slot from its bucket, freeing the bucket if it's left empty, and link it at the head of the new bucket
+        prevSlot, nextSlot = self.slotPrev[slot], self.slotNext[slot]
+        if (prevSlot==NIL):
+            self.firstSlotOfBucket[bucket] = nextSlot
+        else:
+            self.slotNext[prevSlot] = nextSlot
+        if (nextSlot!=NIL):
+            self.slotPrev[nextSlot] = prevSlot
+        if (self.firstSlotOfBucket[bucket]==NIL):
+            self.freeBucketOf (bucket)
+        firstSlot = self.firstSlotOfBucket[newBucket]
+        self.slotPrev[slot], self.slotNext[slot] = NIL, firstSlot
+        if (firstSlot!=NIL):
+            self.slotPrev[firstSlot] = slot
+        self.firstSlotOfBucket[newBucket] = slot
+        self.bucketOfSlot[slot]           = newBucket
+
+    def incFlow (self, flow, weight=1):
+        """
+        Increment the flow by weight, and return its new estimate. If the flow is not kept, and all the slots are used,
+        the flow replaces a flow with the minimal value, and inherits its counter (and, hence, its value).
+        """
+        slot = self.slotOfFlow.get (flow)
+        if (slot==None):
+            if (self.numOfUsedSlots < self.numOfEntries): # a free slot is left
+                slot = self.numOfUsedSlots
+                self.numOfUsedSlots += 1
+            else: # evict a flow of the minimal value
+                slot = self.firstSlotOfBucket[self.minBucket]
+                del self.slotOfFlow[self.flowOfSlot[slot]]
+                if (self.trackErrs):
+                    self.errs[slot] = self.bucketVal[self.minBucket]
+            self.flowOfSlot[slot] = flow
+            self.slotOfFlow[flow] = slot
+        newVal = self.cntrMaster.incCntr (cntrIdx=slot, factor=weight, mult=False, verbose=[])['val']
+        self.moveSlot (slot, newVal)
+        return newVal
+
+    def incFlows (self, flows, weights=None):
+        """
+        Increment a batch of flows, one after the other, where the i-th flow is incremented by weights[i] (by 1, if weights is None).
+        """
+        flows = np.asarray (flows).tolist ()
+        for flow, weight in zip (flows, [1]*len(flows) if (weights is None) else np.asarray (weights).tolist ()):
+            self.incFlow (flow, weight)
+
+    def queryFlow (self, flow):
+        """
+        Return the estimate of the flow: the value of its counter, if it's kept; else, the minimal value, which bounds the counts of all the flows that are not kept.
+        """
+        slot = self.slotOfFlow.get (flow)
+        if (slot==None):
+            return self.bucketVal[self.minBucket] if (self.numOfUsedSlots==self.numOfEntries) else 0
+        return self.bucketVal[self.bucketOfSlot[slot]]
+
+    def genEntry (self, slot):
+        # The report of the flow in a slot: (flow, estimate), or (flow, estimate, err) if the errors are tracked
+        entry = (self.flowOfSlot[slot], self.bucketVal[self.bucketOfSlot[slot]])
+        return entry + (self.errs[slot],) if (self.trackErrs) else entry
+
+    def genEntriesByVal (self):
+        """
+        Yield the reports of the kept flows (see genEntry), in decreasing order of their values, by traversing the list of buckets from its tail.
+        """
+        bucket = self.maxBucket
+        while (bucket!=NIL):
+            slot = self.firstSlotOfBucket[bucket]
+            while (slot!=NIL):
+                if (slot < self.numOfUsedSlots):
+                    yield self.genEntry (slot)
+                slot = self.slotNext[slot]
+            bucket = self.bucketPrev[bucket]
+
+    def topK (self, k=None):
+        """
+        Return a list of the reports of the k flows with the highest estimates, in decreasing order of estimates (all the kept flows, if k is None).
+        Each report is (flow, estimate), or (flow, estimate, err) if the errors are tracked, where estimate-err is a lower bound of the flow's count.
+        """
+        k = self.numOfUsedSlots if (k==None) else min (k, self.numOfUsedSlots)
+        entries = self.genEntriesByVal ()
+        return [next (entries) for _ in range (k)]
+
+    def aboveThreshold (self, threshold):
+        """
+        Return a list of the reports (see topK) of the flows whose estimate is at least threshold, in decreasing order of estimates.
+        """
+        reports = []
+        for entry in self.genEntriesByVal ():
+            if (entry[1] < threshold):
+                break
+            reports.append (entry)
+        return reports
@@ -0,0 +1,144 @@
+import numpy as np
+import settings
+from CountMinSketch import CountMinSketch, calcIsDup
+
+# The supported modes of the spectral Bloom filter: Minimum Selection, and Recurring Minimum
+SBF_MODES = ['MS', 'RM']
+
+class SpectralBloomFilter(CountMinSketch):
+    """
+    A spectral Bloom filter (Cohen and Matias): a counting Bloom filter of numCntrs counters, which answers membership-plus-multiplicity queries.
+    Unlike the count min sketch, all the numOfHashes hash functions map into a single flat array of numCntrs counters, which are shared by all the hash functions.
+    The hashing, the counter backends, the batch increments and the simulation (calculateNormalizedRMSE) are those of CountMinSketch, where the "rows" are the hash functions.
+    sbfMode can be either:
+    'MS' - Minimum Selection: upon a flow's arrival, all its counters are incremented, and the estimate is the minimum of its counters.
+           With conservativeUpdate=True, only the minimal counters are raised (Minimal Increase).
+    'RM' - Recurring Minimum: the flows whose minimum counter is unique (a single counter holds the minimum) are more likely to suffer from collisions;
+           hence, they are also kept in a secondary (smaller) MS spectral Bloom filter, which estimates them.
+    """
+    def __init__(self,
+                 numCntrs,      # the number of counters in the (primary) array.
+                 numOfHashes,   # the number of hash functions.
+                 num_flows,     # the total number of flows to be estimated.
+                 mode,          # It is one of the counter modes.
+                 conf,          # it is a dictionary that holds the value of cntrSize, cntrMaxVal, hyperSize and so on.
+                 outPutFileName, # the name of the res and pcl files.
+                 sbfMode='MS',  # either 'MS' (Minimum Selection) or 'RM' (Recurring Minimum).
+                 secondaryNumCntrs=None, # the number of counters of the secondary filter of RM. When None, it's numCntrs//2.
+                 **kwargs       # the other (optional) arguments of CountMinSketch.__init__
+                 ):
+        if sbfMode not in SBF_MODES:
+            settings.error('SpectralBloomFilter: the mode {} is not supported. Please use one of {}'.format(sbfMode, SBF_MODES))
+        self.sbfMode = sbfMode
+        super().__init__(width=numCntrs, depth=numOfHashes, num_flows=num_flows, mode=mode, conf=conf, outPutFileName=outPutFileName, **kwargs)
+        self.secondary = None
+        if self.sbfMode=='RM':
+            if self.conservativeUpdate or self.dwnSmple:
+                settings.error('SpectralBloomFilter: conservativeUpdate and dwnSmple are not supported in RM mode')
+            fileName       = kwargs.get('fileName')
+            self.secondary = SpectralBloomFilter(numCntrs=numCntrs//2 if (secondaryNumCntrs==None) else secondaryNumCntrs, numOfHashes=numOfHashes, num_flows=num_flows,
+                                                 mode=mode, conf=conf, outPutFileName=outPutFileName, sbfMode='MS',
+                                                 packed=self.packed, fileName=None if (fileName==None) else fileName + '.secondary')
+            self.secondary.hashSeed = 1 # the hash functions of the secondary filter are independent of those of the primary
+
+    def calcLayout(self):
+        """
+        All the hash functions share a single flat array of width counters; hence, the "row" offsets are all 0.
+        """
+        return self.width, [0] * self.depth
+
+    def cntrsSizeInBytes(self):
+        # The memory occupied by the counters of the primary and the secondary filters, in bytes
+        return super().cntrsSizeInBytes() + (0 if (self.secondary==None) else self.secondary.cntrsSizeInBytes())
+
+    def rst(self):
+        super().rst()
+        if self.secondary!=None:
+            self.secondary.rst()
+
+    def cacheMappedCntrs(self, numOfIds):
+        super().cacheMappedCntrs(numOfIds)
+        if self.secondary!=None:
+            self.secondary.cacheMappedCntrs(numOfIds)
+
+    def decay(self, factor=None):
+        super().decay(factor)
+        if self.secondary!=None:
+            self.secondary.decay(self.decayFactor if (factor==None) else factor)
+
+    def merge(self, other):
+        if self.sbfMode!=other.sbfMode:
+            settings.error('SpectralBloomFilter.merge: cannot merge a filter of mode {} with a filter of mode {}'.format(self.sbfMode, other.sbfMode))
+        super().merge(other)
+        if self.secondary!=None:
+            self.secondary.merge(other.secondary)
+
+    def flush(self):
+        super().flush()
+        if self.secondary!=None:
+            self.secondary.flush()
+
+    def rmEstimates(self, cntrVals, flows, isDup):
+        """
+        The estimates of RM: cntrVals[i] are the values of the counters of flows[i], where isDup[i] marks the counters that repeat (see calcIsDup).
+        If the minimum of a flow's (distinct) counters recurs, it is the estimate.
+        Else, the estimate is the flow's estimate in the secondary filter, if the flow is there, or the minimum of its counters otherwise.
+        As the minimum of the flow's counters in the primary filter over-estimates the flow anyhow, the estimate never exceeds it.
+        """
+        minVals     = cntrVals.min(axis=1)
+        isRecurring = ((cntrVals==minVals[:, None]) & ~isDup).sum(axis=1) > 1
+        secondaryEstimates = self.secondary.queryFlows(flows)
+        return np.where(isRecurring | (secondaryEstimates==0), minVals, np.minimum(minVals, secondaryEstimates))
+
+    def rmIncFlow(self, flow, mappedCntrs, weight=1):
+        """
+        Increment a flow, mapped to the counters mappedCntrs, by weight in RM mode, and return its new estimate.
+        All the flow's (distinct) counters are incremented. If their minimum does not recur, the flow is incremented in the secondary filter if it's already there;
+        else, it's inserted into the secondary filter with the minimum as its value.
+        """
+        cntrVals = self.countersArray.incCntrs(indices=np.unique(mappedCntrs), factors=weight)
+        minVal   = cntrVals.min()
+        if (cntrVals==minVal).sum() > 1:
+            return minVal
+        secondaryMappedCntrs = np.unique(self.secondary.mappedCntrsOfFlow(flow))
+        secondaryVals        = self.secondary.countersArray.queryCntrs(secondaryMappedCntrs)
+        if secondaryVals.min() > 0:
+            return min(minVal, self.secondary.countersArray.incCntrs(indices=secondaryMappedCntrs, factors=weight).min())
+        self.secondary.countersArray.incCntrs(indices=secondaryMappedCntrs, factors=minVal)
+        return minVal
+
+    def incNQueryFlow(self, flow):
+        if self.sbfMode=='MS':
+            return super().incNQueryFlow(flow)
+        estimate = self.rmIncFlow(flow, np.array(self.mappedCntrsOfFlow(flow)))
+        if self.heavyHitters!=None:
+            self.heavyHitters.update(flow, estimate)
+        self.decayIfDue(1)
+        return estimate
+
+    def incFlows(self, flows, weights=None):
+        """
+        Increment a batch of flows (see CountMinSketch.incFlows). In RM mode, the outcome depends upon the order of the flows; hence, the flows are incremented one after the other.
+        """
+        if self.sbfMode=='MS':
+            return super().incFlows(flows, weights)
+        if isinstance(flows, (bytes, bytearray, memoryview)):
+            flows = np.frombuffer(flows, dtype=np.uint64)
+        mappedCntrs, inverse = self.mappedCntrsOfFlows(flows)
+        weights              = np.ones(len(inverse), dtype=np.int64) if (weights is None) else np.asarray(weights)
+        for flow, flowNum, weight in zip(np.asarray(flows).tolist(), inverse.tolist(), weights.tolist()):
+            self.rmIncFlow(flow, mappedCntrs[flowNum], weight)
+        self.updateHeavyHitters(flows)
+        self.decayIfDue(len(inverse))
+
+    def queryFlow(self, flow):
+        if self.sbfMode=='MS':
+            return super().queryFlow(flow)
+        return self.queryFlows(np.array([flow]))[0]
+
+    def queryFlows(self, flows):
+        if self.sbfMode=='MS':
+            return super().queryFlows(flows)
+        mappedCntrs, inverse = self.mappedCntrsOfFlows(flows)
+        cntrVals = self.countersArray.queryCntrs(mappedCntrs.ravel()).reshape(-1, self.depth)[inverse]
+        return self.rmEstimates(cntrVals, flows, calcIsDup(mappedCntrs)[inverse])
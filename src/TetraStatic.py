@@ -36,7 +36,7 @@ class CntrMaster (object):
         for tetraVal in range (len(self.offsetOfTetraVal)-1): #(self.tetraMaxVal-1): # for each potential tetra value
             self.offsetOfTetraVal[tetraVal+1] = self.offsetOfTetraVal[tetraVal] + (mantMaxVal+1) * (1 << (1 << tetraVal))
 
-    def __init__ (self, cntrSize=8, tetraSize=1, numCntrs=1, verbose=[]):
+    def __init__ (self, cntrSize=8, tetraSize=1, numCntrs=1, verbose=[], useTables=False):
         
         """
         Initialize an array of cntrSize counters. The cntrs are initialized to 0.
@@ -51,6 +51,7 @@ class CntrMaster (object):
             settings.VERBOSE_PCL           = print output to a .pcl file in the directory ../res/pcl_files
             settings.VERBOSE_DETAILS       = print to stdout details about the counter
             settings.VERBOSE_NOTE          = print to stdout notes, e.g. when the target cntr value is above its max or below its min.
+        useTables - when True, pre-calculate the tables describing the cntr as a chain of codes (see calcTables).
         """
 
         if (cntrSize<3):
@@ -72,6 +73,27 @@ class CntrMaster (object):
         self.rstAllCntrs ()
         self.calcOffsets ()
         self.cntrMaxVal  = self.cntr2num (self.cntrMaxVec)
+        if (useTables):
+            self.calcTables ()
+        
+    def calcTables (self):
+        """
+        Pre-calculate the tables describing the cntr as a chain of codes (the code of a cntr is the integer whose binary representation is the cntr). 
+        self.valOfCode[c]  - the value represented by the cntr whose code is c.
+        self.nextCode[c]   - the code of the cntr reached when incrementing the cntr whose code is c by 1 succeeds. For the max cntr, nextCode[c]==c.
+        self.probOfInc1[c] - the prob' that incrementing the cntr whose code is c by 1 succeeds. The prob' is 0 for the max cntr.
+        self.sortedCodes   - the codes reachable from the zero cntr, in an increasing order of the values they represent. 
+        self.sortedVals    - self.sortedVals[i] is the value represented by the code self.sortedCodes[i].
+        self.vecOfCode[c]  - the binary vector of the cntr whose code is c.
+        The successor of a cntr is the cntr representing the smallest larger value, as chosen by num2cntr; in the static mode, this is merely the next code.
+        """
+        self.cntrZeroCode   = int (self.cntrZeroVec, base=2)
+        self.cntrMaxCode    = int (self.cntrMaxVec,  base=2)
+        self.vecOfCode      = [np.binary_repr (code, self.cntrSize) for code in range (1 << self.cntrSize)] 
+        self.valOfCode      = np.array ([self.cntr2num (cntr) for cntr in self.vecOfCode], dtype=float)
+        self.nextCode, self.probOfInc1 = settings.calcNextCodesByVals (valOfCode=self.valOfCode, cntrMaxVal=self.cntrMaxVal)
+        self.sortedCodes    = settings.calcSortedCodes (cntrZeroCode=self.cntrZeroCode, nextCode=self.nextCode)
+        self.sortedVals     = self.valOfCode[self.sortedCodes]
         
     def rstAllCntrs (self):
         """
@@ -156,6 +178,20 @@ class CntrMaster (object):
             self.cntrs[cntrIdx] = optionalModifiedCntr[1]['cntrVec'] if (random.random() < probOfFurtherInc) else optionalModifiedCntr[0]['cntrVec']
         return {'cntrVec' : self.cntrs[cntrIdx], 'val' : self.cntr2num(self.cntrs[cntrIdx])}    
             
+    def incCntrs (self, indices, factors=1, mult=False):
+        """
+        Increase a batch of counters, as if incCntr (cntrIdx=indices[i], factor=factors[i], mult=mult) were called for each i, in order.
+        factors may be either an array of coefficients, one per index, or a single coefficient for all the indices.
+        Returns an array of the cntrs' values, where the i-th entry is the value of cntr indices[i] right after applying its i-th increment.
+        """
+        return settings.incCntrsOneByOne (self, indices=indices, factors=factors, mult=mult)
+
+    def queryCntrs (self, indices):
+        """
+        Query a batch of counters. Returns an array, whose i-th entry is the value of cntr indices[i].
+        """
+        return np.array ([self.queryCntr (cntrIdx)['val'] for cntrIdx in np.asarray (indices).tolist()], dtype=float)
+
     def num2cntr (self, targetVal, verbose=None):
         """
         given a target value, find the closest counters to this targetVal from below and from above.
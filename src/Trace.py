@@ -0,0 +1,62 @@
+"""
+Replay of recorded flow traces: the records of a local trace file are read in chunks, and yielded as numpy blocks of (flows, weights).
+Supported formats:
+'bin' - fixed-width binary records, read via np.memmap. A record is either a single uint64 flow key (e.g., a hash of the 5-tuple),
+        or a structured record (e.g., np.dtype ([('flow', '<u8'), ('bytes', '<u4')])), with a field of the flow key, and optionally a field of the weight.
+'csv' - a text file, with a record per line, read via mmap. One column holds the flow key (kept as a string, e.g., a 5-tuple), and optionally another column holds the weight.
+"""
+import itertools, mmap, os
+import numpy as np
+import settings
+
+def genBinTraceBlocks (fileName, recordDtype=np.uint64, flowField='flow', weightField=None, blockSize=1<<20):
+    """
+    Yield the records of a binary trace in blocks of (up to) blockSize records. Each block is a pair (flows, weights), where weights is None if weightField is None.
+    recordDtype - the dtype of a record. If it is not structured, each record is a flow key, and flowField, weightField are ignored.
+    The file is memory-mapped, so only the current block is copied to the RAM.
+    """
+    recordDtype = np.dtype (recordDtype)
+    if (os.path.getsize (fileName) % recordDtype.itemsize != 0):
+        settings.error ('Trace: the size of {} is not a multiple of the record size, {} bytes' .format (fileName, recordDtype.itemsize))
+    if (os.path.getsize (fileName)==0):
+        return
+    records = np.memmap (fileName, dtype=recordDtype, mode='r')
+    for blockStart in range (0, len(records), blockSize):
+        block = records[blockStart : blockStart+blockSize]
+        if (recordDtype.names==None):
+            yield np.array (block), None
+        else:
+            yield np.array (block[flowField]), (None if (weightField==None) else np.array (block[weightField]))
+
+def genCsvTraceBlocks (fileName, flowCol=0, weightCol=None, delimiter=',', skipHeader=False, blockSize=1<<16):
+    """
+    Yield the records of a CSV trace in blocks of (up to) blockSize lines. Each block is a pair (flows, weights), where weights is None if weightCol is None.
+    flowCol, weightCol - the indices of the columns of the flow key, and of the weight. The flow keys are kept as strings.
+    As in genBinTraceBlocks, the file is memory-mapped, and its lines are read from the mapping, so only the current block is copied to the RAM.
+    """
+    if (os.path.getsize (fileName)==0): # an empty file cannot be memory-mapped
+        return
+    with open (fileName, 'rb') as file, mmap.mmap (file.fileno (), 0, access=mmap.ACCESS_READ) as mappedFile:
+        if (skipHeader):
+            mappedFile.readline ()
+        lines = iter (mappedFile.readline, b'')
+        while (True):
+            block = [line.decode () for line in itertools.islice (lines, blockSize) if line.strip()]
+            if (len(block)==0):
+                return
+            cols  = np.array ([line.rstrip('\r\n').split (delimiter) for line in block], dtype=str)
+            yield cols[:, flowCol], (None if (weightCol==None) else cols[:, weightCol].astype (float))
+
+def genTraceBlocks (fileName, format=None, **kwargs):
+    """
+    Yield the records of a trace file in blocks of (flows, weights) - see genBinTraceBlocks and genCsvTraceBlocks, which get kwargs.
+    format - either 'bin', or 'csv'. When None, the format is deduced from the file's extension ('.csv' - 'csv'; otherwise - 'bin').
+    """
+    if (format==None):
+        format = 'csv' if fileName.endswith ('.csv') else 'bin'
+    if (format=='bin'):
+        yield from genBinTraceBlocks (fileName, **kwargs)
+    elif (format=='csv'):
+        yield from genCsvTraceBlocks (fileName, **kwargs)
+    else:
+        settings.error ('Trace: the format {} is not supported. Please use either bin, or csv' .format (format))
@@ -0,0 +1,65 @@
+"""
+Synthetic workloads: streams of flow IDs, generated in large numpy blocks.
+The flow IDs are 0, 1, ..., numFlows-1. The streams are consumed lazily, block by block, via the generator genFlowBlocks.
+"""
+import numpy as np
+import settings
+
+# The workload distributions supported by genFlowBlocks
+DISTS = ['uniform', 'zipf', 'pareto', 'bursty']
+
+def calcFlowProbs (dist, numFlows, alpha=1.2, rng=None):
+    """
+    Return an array, whose i-th entry is the prob' that an arriving packet belongs to flow i.
+    dist     - 'uniform', or 'zipf' (the prob' of flow i is proportional to (i+1)^-alpha), or 'pareto' (the sizes of the flows are drawn from a Pareto distribution with shape alpha,
+               and the prob' of each flow is proportional to its size).
+    rng      - a numpy random Generator, used for drawing the flows' sizes of 'pareto'.
+    """
+    if (dist=='uniform'):
+        return np.full (numFlows, 1/numFlows)
+    if (dist=='zipf'):
+        probs = np.arange (1, numFlows+1, dtype=float) ** (-alpha)
+    elif (dist=='pareto'):
+        probs = 1 + rng.pareto (alpha, numFlows) # the sizes of the flows, at least 1
+    else:
+        settings.error ('Workload: the distribution {} is not supported. Please use one of {}' .format (dist, DISTS))
+    return probs / probs.sum()
+
+def genFlowBlocks (dist='uniform', numFlows=100, numOfIncs=10**6, blockSize=1<<16, alpha=1.2, meanBurstLen=10, seed=None):
+    """
+    Generate a stream of numOfIncs flow IDs, yielded in numpy blocks of (up to) blockSize flow IDs.
+    dist         - the workload:
+                   'uniform', 'zipf', 'pareto' - each packet independently belongs to a flow drawn by the flows' prob's (see calcFlowProbs).
+                   'bursty' - on/off sources: the stream is a sequence of bursts, each of which is an "on" period of a single flow, drawn uniformly.
+                              The length of each burst is geometrically distributed, with mean meanBurstLen. Between its bursts, a flow is "off".
+    numFlows     - the number of flows; may be up to 10^7.
+    alpha        - the skew of 'zipf', or the shape of 'pareto'.
+    seed         - the seed of the random generator. When None, the stream is not reproducible.
+    The flows are drawn by a single vectorized draw per block: for 'zipf' and 'pareto', by inverting the cumulative distribution of the flows, which is calculated once.
+    """
+    rng = np.random.default_rng (seed)
+    if (dist=='bursty'):
+        yield from genBurstyFlowBlocks (rng, numFlows, numOfIncs, blockSize, meanBurstLen)
+        return
+    cdf = None if (dist=='uniform') else np.cumsum (calcFlowProbs (dist, numFlows, alpha, rng))
+    for blockStart in range (0, numOfIncs, blockSize):
+        curBlockSize = min (blockSize, numOfIncs - blockStart)
+        if (dist=='uniform'):
+            yield rng.integers (numFlows, size=curBlockSize)
+        else:
+            yield np.minimum (np.searchsorted (cdf, rng.random (curBlockSize) * cdf[-1], side='right'), numFlows-1)
+
+def genBurstyFlowBlocks (rng, numFlows, numOfIncs, blockSize, meanBurstLen):
+    """
+    Generate the stream of the 'bursty' workload (see genFlowBlocks). A burst may span several blocks.
+    """
+    pending = np.empty (0, dtype=np.int64) # the flow IDs drawn, but not yielded yet
+    numLeft = numOfIncs
+    while (numLeft > 0):
+        curBlockSize = min (blockSize, numLeft)
+        while (len(pending) < curBlockSize): # draw enough bursts, in expectation, to fill the block
+            numOfBursts = max (1, int (np.ceil ((curBlockSize - len(pending)) / meanBurstLen)))
+            pending     = np.concatenate ((pending, np.repeat (rng.integers (numFlows, size=numOfBursts), rng.geometric (1/meanBurstLen, size=numOfBursts))))
+        yield pending[:curBlockSize]
+        pending  = pending[curBlockSize:]
+        numLeft -= curBlockSize
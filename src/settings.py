@@ -1,6 +1,6 @@
 # Parameters and accessory functions
 # import math, random, os, pandas as pd
-import os, math, numpy as np, scipy.stats as st 
+import os, math, random, numpy as np, scipy.stats as st, scipy.special as sp 
 from printf import printf
 # import commonFuncs 
 
@@ -105,6 +105,232 @@ def sortcntrMaxVals ():
             printf (output_file, '{}\t{}\n' .format (item['mode'], item['maxVal']))            
 
 
+def geomRand (prob):
+    """
+    Draw the number of independent Bernoulli trials, each succeeding w.p. prob, until (and including) the first success.
+    """
+    if (prob>=1):
+        return 1
+    return 1 + int (math.log (1-random.random()) / math.log1p (-prob)) # 1-random.random() is in (0,1], so its log is finite
+
+def seedRandGens (entropy):
+    """
+    Seed both random and np.random by a seed sequence, generated from entropy (an int, or a list of ints), or given as entropy (an np.random.SeedSequence, e.g., spawned for a worker). 
+    """
+    seedSeq = entropy if isinstance (entropy, np.random.SeedSequence) else np.random.SeedSequence (entropy)
+    state   = seedSeq.generate_state (4) 
+    random.seed    (int.from_bytes (state.tobytes(), 'little'))
+    np.random.seed (state)
+
+# The dtype of an array of integer-encoded counters ("codes"), given the counter's size
+dtypeOfCntrSize = lambda cntrSize : np.uint8 if (cntrSize<=8) else (np.uint16 if (cntrSize<=16) else np.uint32)
+
+def calcSortedCodes (cntrZeroCode, nextCode):
+    """
+    Follow the successor-codes table nextCode, starting from the code of the zero counter, until reaching a code whose successor is itself (the max counter).
+    Returns an array of the codes visited. As each successor represents a larger value, the codes are sorted in an increasing order of the values they represent.
+    """
+    sortedCodes = [int(cntrZeroCode)]
+    while (nextCode[sortedCodes[-1]] != sortedCodes[-1]):
+        sortedCodes.append (int(nextCode[sortedCodes[-1]]))
+    return np.array (sortedCodes)
+
+def calcNextCodesByVals (valOfCode, cntrMaxVal):
+    """
+    Given the values represented by all the codes of a cntr, calculate the successor of each code, namely, the code representing the smallest larger value.
+    Codes representing values >= cntrMaxVal have no successor.
+    Returns a pair (nextCode, probOfInc1), where:
+    nextCode[c]   - the successor of code c. If code c has no successor, nextCode[c]==c.
+    probOfInc1[c] - the prob' that incrementing the cntr whose code is c by 1 succeeds, namely, 1/(valOfCode[nextCode[c]]-valOfCode[c]). The prob' is 0 if c has no successor.
+    """
+    numCodes     = len (valOfCode)
+    codesByVal   = np.argsort (valOfCode, kind='stable') 
+    idxOfNext    = np.searchsorted (valOfCode[codesByVal], valOfCode, side='right') # idxOfNext[c] is the index, in codesByVal, of the first code whose value is larger than that of c 
+    hasSuccessor = (idxOfNext < numCodes) & (valOfCode < cntrMaxVal)
+    nextCode     = np.where (hasSuccessor, codesByVal[np.minimum (idxOfNext, numCodes-1)], np.arange (numCodes))
+    probOfInc1   = np.zeros (numCodes)
+    probOfInc1[hasSuccessor] = 1 / (valOfCode[nextCode[hasSuccessor]] - valOfCode[hasSuccessor])
+    return nextCode, probOfInc1
+
+def vals2codes (targetVals, sortedVals, sortedCodes, rands=None):
+    """
+    Given an array of target values, return an array of codes, each representing one of the two cntr values closest to the respective target value.
+    The rounding is probabilistic and unbiased: a target value t, where valLo < t < valHi, is rounded to valHi w.p. (t-valLo)/(valHi-valLo), and to valLo otherwise.
+    Target values above the max (below the min) value in sortedVals are rounded to the max (min) value.
+    Inputs:
+    targetVals  - the values to represent.
+    sortedVals  - the values that the cntr can represent, in an increasing order.
+    sortedCodes - sortedCodes[i] is the code of the cntr representing sortedVals[i].
+    rands       - uniform [0,1) random numbers, one per target value, used for the rounding. When None (default), the function draws them.
+    """
+    targetVals = np.clip (np.asarray (targetVals, dtype=float), sortedVals[0], sortedVals[-1])
+    idxLo      = np.searchsorted (sortedVals, targetVals, side='right') - 1
+    idxHi      = np.minimum (idxLo+1, len(sortedVals)-1)
+    valLo      = sortedVals[idxLo]
+    valHi      = sortedVals[idxHi]
+    probOfHi   = (targetVals - valLo) / np.where (valHi>valLo, valHi-valLo, 1) # when valHi==valLo (the max cntr), targetVal==valLo, so probOfHi==0
+    rands      = np.random.random (targetVals.shape) if (rands is None) else rands
+    return sortedCodes[np.where (rands < probOfHi, idxHi, idxLo)]
+
+def checkCntrIdxs (indices, numCntrs=4, cntrType='SEAD'):
+    """
+    Check if all the given cntr indices are feasible.
+    If not - print error msg and exit.
+    """
+    if (len(indices)>0):
+        checkCntrIdx (cntrIdx=indices.min(), numCntrs=numCntrs, cntrType=cntrType)
+        checkCntrIdx (cntrIdx=indices.max(), numCntrs=numCntrs, cntrType=cntrType)
+
+def rndsOfIdxs (indices):
+    """
+    Split a batch of cntr indices into rounds, where round r consists of the r-th occurrence of every index. Hence, the indices within each round are distinct.
+    Returns a list of arrays, where the r-th array holds the positions (in indices) of the entries of round r.
+    Typically, most indices in a batch are distinct, and there are only a few rounds.
+    """
+    if (len(indices)==0):
+        return []
+    
+    # Calculate the rank of each entry among the entries with the same index
+    order       = np.argsort (indices, kind='stable')
+    isGrpStart  = np.concatenate (([True], indices[order][1:] != indices[order][:-1]))
+    grpStart    = np.maximum.accumulate (np.where (isGrpStart, np.arange (len(indices)), 0))
+    rank        = np.empty (len(indices), dtype=np.int64)
+    rank[order] = np.arange (len(indices)) - grpStart
+    return np.split (np.argsort (rank, kind='stable'), np.cumsum (np.bincount (rank))[:-1])
+
+def incCntrsByTables (cntrMaster, indices, factors=1, mult=False, cntrType='SEAD'):
+    """
+    Increase a batch of counters of cntrMaster, whose cntrs are kept as integer codes in a numpy array, as if 
+    cntrMaster.incCntr (cntrIdx=indices[i], factor=factors[i], mult=mult) were called for each i, in order.
+    Each target value is rounded to one of the two closest cntr values, using vals2codes; the random numbers for the rounding of all the increments are drawn in a single vectorized draw.
+    Repeated indices are handled in rounds (see rndsOfIdxs), so each increment of a cntr is applied to the result of the previous increments of that cntr.
+    Returns an array of the cntrs' values, where the i-th entry is the value of cntr indices[i] right after applying its i-th increment.
+    """
+    indices = np.asarray (indices, dtype=np.int64)
+    factors = np.broadcast_to (np.asarray (factors, dtype=float), indices.shape)
+    vals    = np.empty (len(indices))
+    checkCntrIdxs (indices=indices, numCntrs=cntrMaster.numCntrs, cntrType=cntrType)
+    rands   = np.random.random (len(indices))
+    for entries in rndsOfIdxs (indices):
+        cntrIdxs   = indices[entries]
+        cntrVals   = cntrMaster.valOfCode[cntrMaster.cntrs[cntrIdxs]]
+        targetVals = (cntrVals * factors[entries]) if mult else (cntrVals + factors[entries])
+        cntrMaster.cntrs[cntrIdxs] = vals2codes (targetVals=targetVals, sortedVals=cntrMaster.sortedVals, sortedCodes=cntrMaster.sortedCodes, rands=rands[entries])
+        vals[entries] = cntrMaster.valOfCode[cntrMaster.cntrs[cntrIdxs]]
+    return vals
+
+def incCntrsOneByOne (cntrMaster, indices, factors=1, mult=False):
+    """
+    Increase a batch of counters of cntrMaster by calling cntrMaster.incCntr (cntrIdx=indices[i], factor=factors[i], mult=mult) for each i, in order.
+    Used by cntrs which are not kept as integer codes. Returns an array of the cntrs' values, where the i-th entry is the value of cntr indices[i] right after applying its i-th increment.
+    """
+    indices = np.asarray (indices, dtype=np.int64)
+    factors = np.broadcast_to (np.asarray (factors), indices.shape)
+    return np.array ([cntrMaster.incCntr (cntrIdx=cntrIdx, factor=factor, mult=mult)['val'] for cntrIdx, factor in zip (indices.tolist(), factors.tolist())], dtype=float)
+
+def queryCntrsByTables (cntrMaster, indices, cntrType='SEAD'):
+    """
+    Return an array of the values of the cntrs indices[0], indices[1], ... of cntrMaster, whose cntrs are kept as integer codes in a numpy array.
+    """
+    indices = np.asarray (indices, dtype=np.int64)
+    checkCntrIdxs (indices=indices, numCntrs=cntrMaster.numCntrs, cntrType=cntrType)
+    return cntrMaster.valOfCode[cntrMaster.cntrs[indices]]
+
+# Intervals of real values shorter than this are summed directly, rather than by the closed-form expressions below
+MAX_LEN_OF_DIRECT_SUM = 1000
+
+# Intervals of real values starting at least here are summed using the asymptotic expansions of digamma and trigamma. 
+# For such large values, subtracting the values of digamma / trigamma directly would lose too many significant digits.
+MIN_FIRST_OF_ASYMPTOTIC_SUM = 10000
+
+def whereSmallFirst (a, b, asymptoticSum, directSum):
+    """
+    Return asymptoticSum, where the entries with a < MIN_FIRST_OF_ASYMPTOTIC_SUM are replaced by directSum (a, b) - which is evaluated only for these entries,
+    as the special functions are far more costly than the asymptotic expansions.
+    """
+    isSmall = a < MIN_FIRST_OF_ASYMPTOTIC_SUM
+    if (np.ndim (isSmall)==0):
+        return directSum (a, b) if (isSmall) else asymptoticSum
+    res          = np.array (asymptoticSum, dtype=float)
+    a, b         = np.broadcast_arrays (a, b)
+    res[isSmall] = directSum (a[isSmall], b[isSmall])
+    return res
+
+def harmonicSum (first, last):
+    """
+    Return H(last) - H(first-1) = 1/first + ... + 1/last, where H(n) is the n-th harmonic number. 
+    first and last may be either scalars, or arrays of the same shape.
+    """
+    a, b = np.asarray (first, dtype=float), np.asarray (last, dtype=float)+1
+    n    = b-a
+    # digamma(x) ~ log(x) - 1/(2x) - 1/(12x^2) + 1/(120x^4). Each diff' below is written so that it does not subtract close numbers.  
+    asymptoticSum = np.log1p (n/a) + n/(2*a*b) + n*(a+b)/(12*a**2*b**2) - (1/a**4 - 1/b**4)/120 
+    return whereSmallFirst (a, b, asymptoticSum, lambda a, b : sp.digamma (b) - sp.digamma (a))
+
+def harmonicSqrSum (first, last):
+    """
+    Return H2(last) - H2(first-1) = 1/first**2 + ... + 1/last**2, where H2(n) is the n-th harmonic number of order 2. 
+    first and last may be either scalars, or arrays of the same shape.
+    """
+    a, b = np.asarray (first, dtype=float), np.asarray (last, dtype=float)+1
+    n    = b-a
+    # trigamma(x) ~ 1/x + 1/(2x^2) + 1/(6x^3) - 1/(30x^5). Each diff' below is written so that it does not subtract close numbers.  
+    asymptoticSum = n/(a*b) + n*(a+b)/(2*a**2*b**2) + n*(a**2+a*b+b**2)/(6*a**3*b**3) - (1/a**5 - 1/b**5)/30 
+    return whereSmallFirst (a, b, asymptoticSum, lambda a, b : sp.polygamma (1, a) - sp.polygamma (1, b))
+
+def sumSqRelEr (first, last, val):
+    """
+    Return sum_{r=first}^{last} ((r-val)/r)**2, namely, the sum of the squared relative errors of a cntr whose value remains val, 
+    while the real value runs over first, first+1, ..., last.
+    The sum is calculated in closed form, as (last-first+1) - 2*val*(H(last)-H(first-1)) + val**2 * (H2(last)-H2(first-1)).
+    """
+    if (last<first):
+        return 0
+    if (last-first < MAX_LEN_OF_DIRECT_SUM):
+        realVals = np.arange (first, last+1)
+        return float (np.sum (((realVals - val)/realVals)**2))
+    return float ((last-first+1) - 2*val*harmonicSum (first, last) + val**2 * harmonicSqrSum (first, last))
+
+def sumAbsRelEr (first, last, val):
+    """
+    Return sum_{r=first}^{last} |r-val|/r, namely, the sum of the absolute relative errors of a cntr whose value remains val, 
+    while the real value runs over first, first+1, ..., last.
+    The interval is split at val: below val, each term is val/r - 1; from val on, each term is 1 - val/r. Each part is calculated in closed form. 
+    """
+    if (last<first):
+        return 0
+    if (last-first < MAX_LEN_OF_DIRECT_SUM):
+        realVals = np.arange (first, last+1)
+        return float (np.sum (np.abs (realVals - val)/realVals))
+    splitPoint = min (max (math.floor (val), first-1), last) # the real values first, ..., splitPoint are <= val; the rest are > val
+    sumEr = 0
+    if (splitPoint>=first):
+        sumEr += val*harmonicSum (first, splitPoint) - (splitPoint-first+1)
+    if (splitPoint<last):
+        sumEr += (last-splitPoint) - val*harmonicSum (splitPoint+1, last)
+    return float (sumEr)
+
+def sumSqRelErOfIntervals (firsts, lasts, vals):
+    """
+    A vectorized version of sumSqRelEr: return an array, whose i-th entry is sum_{r=firsts[i]}^{lasts[i]} ((r-vals[i])/r)**2.
+    An empty interval (lasts[i]<firsts[i]) sums to 0. All the sums are calculated in closed form.
+    """
+    lasts = np.maximum (lasts, firsts-1) 
+    return (lasts-firsts+1) - 2*vals*harmonicSum (firsts, lasts) + vals**2 * harmonicSqrSum (firsts, lasts)
+
+def sumAbsRelErOfIntervals (firsts, lasts, vals):
+    """
+    A vectorized version of sumAbsRelEr: return an array, whose i-th entry is sum_{r=firsts[i]}^{lasts[i]} |r-vals[i]|/r.
+    An empty interval (lasts[i]<firsts[i]) sums to 0. All the sums are calculated in closed form.
+    """
+    lasts       = np.maximum (lasts, firsts-1) 
+    splitPoints = np.clip (np.floor (vals), firsts-1, lasts) # the real values firsts[i], ..., splitPoints[i] are <= vals[i]; the rest are > vals[i]
+    return (vals*harmonicSum (firsts, splitPoints) - (splitPoints-firsts+1)) + ((lasts-splitPoints) - vals*harmonicSum (splitPoints+1, lasts))
+
+# The absolute / squared relative errors of a cntr with value val, for each of the given real values
+absRelEr = lambda realVals, val : np.abs (realVals - val)/realVals
+sqRelEr  = lambda realVals, val : ((realVals - val)/realVals)**2
+
 def RmseOfVec (vec):
     """
     given a vector of errors, calculate the RMSE
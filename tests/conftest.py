@@ -0,0 +1,32 @@
+import os, sys
+import pytest
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+import settings
+from CountMinSketch import CountMinSketch
+
+def confOfCntrSize(cntrSize):
+    # The conf of the counters of cntrSize bits, in settings.Confs
+    return [conf for conf in settings.Confs if conf['cntrSize']==cntrSize][0]
+
+@pytest.fixture
+def conf6():
+    return confOfCntrSize(6) # e.g., F2P's max value is 172, so a few thousand increments overflow it
+
+@pytest.fixture
+def conf7():
+    return confOfCntrSize(7)
+
+@pytest.fixture
+def conf16():
+    return confOfCntrSize(16)
+
+@pytest.fixture
+def genSketch(conf16):
+    """
+    A factory of small sketches: genSketch(sketchCls=CountMinSketch, **kwargs) returns a sketchCls of 64x3 RealCntr counters over 10 flows, where kwargs override these arguments.
+    """
+    def gen(sketchCls=CountMinSketch, **kwargs):
+        params = dict(width=64, depth=3, num_flows=10, mode='RealCntr', conf=conf16, outPutFileName='test')
+        params.update(kwargs)
+        return sketchCls(**params)
+    return gen
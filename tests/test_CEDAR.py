@@ -0,0 +1,13 @@
+import numpy as np
+import CEDAR
+
+def test_multIncScalesTheCntr(conf16):
+    # A multiplicative update by 1/2, either of a single counter or of a batch, should halve the counter, rather than add 1/2 to it
+    cntrMaster = CEDAR.CntrMaster(cntrSize=conf16['cntrSize'], numCntrs=2, cntrMaxVal=conf16['cntrMaxVal'])
+    cntrMaster.incCntrs(np.repeat(np.arange(2), 10000))
+    before = cntrMaster.queryCntrs(np.arange(2))
+    halved = [cntrMaster.incCntr(cntrIdx=0, factor=0.5, mult=True)['val'],
+              cntrMaster.incCntrs(indices=[1], factors=0.5, mult=True)[0]]
+    for i in range(2):
+        assert 0.4 < halved[i]/before[i] < 0.6
+        assert cntrMaster.queryCntr(i)['val'] == halved[i]
@@ -0,0 +1,12 @@
+import numpy as np
+import F2P
+from CntrMarkovChain import CntrMarkovChain
+
+def test_binnedHittingTimesApproxExact(conf7):
+    # A small window forces the hitting times into bins; the expected errors should remain close to the exact ones
+    cntr   = F2P.CntrMaster(mode='F2P', cntrSize=7, hyperSize=conf7['hyperSize'], useTables=True)
+    exact  = CntrMarkovChain(cntr=cntr, maxRealVal=cntr.cntrMaxVal, maxWindowSize=10**9).calcExpectedSumsOfErs()
+    approx = CntrMarkovChain(cntr=cntr, maxRealVal=cntr.cntrMaxVal, maxWindowSize=2**8).calcExpectedSumsOfErs()
+    for erType in exact:
+        assert exact[erType] != approx[erType]
+        assert np.isclose(approx[erType], exact[erType], rtol=2e-2)
@@ -0,0 +1,107 @@
+import numpy as np
+import pytest
+from CountMinSketch import ingestSharded
+
+def test_decayIfDue_carriesLeftoverIncsAcrossBatches(genSketch):
+    # 4 batches of 150 increments with decayPeriod=100 should decay 6 times, not once per batch
+    sketch  = genSketch(decayFactor=0.5, decayPeriod=100)
+    factors = []
+    origDecay    = sketch.decay
+    sketch.decay = lambda factor=None : (factors.append(factor), origDecay(factor))
+    for batch in range(4):
+        sketch.incFlows(np.zeros(150, dtype=np.int64))
+    assert np.isclose(np.prod(factors), 0.5**6)
+    assert sketch.numOfIncsSinceDecay == 0
+
+def test_manualDecayResetsIncsCount(genSketch):
+    sketch = genSketch(decayFactor=0.5, decayPeriod=100)
+    sketch.incFlows(np.zeros(70, dtype=np.int64))
+    sketch.decay()
+    assert sketch.numOfIncsSinceDecay == 0
+    sketch.incFlows(np.zeros(70, dtype=np.int64))
+    assert sketch.numOfIncsSinceDecay == 70
+    assert sketch.queryFlow(0) == 70*0.5 + 70
+
+def test_reopenedDwnSmpledSketchKeepsSampleProb(genSketch, conf6, tmp_path):
+    # A downsampled file-backed sketch, flushed and reopened, should keep its sampling probability, and hence its estimates
+    params   = dict(mode='F2P', conf=conf6, dwnSmple=True, fileName=str(tmp_path / 'cntrs.bin'))
+    sketch   = genSketch(**params)
+    sketch.incFlows(np.zeros(5000, dtype=np.int64))
+    assert sketch.sampleProb < 1
+    estimate = sketch.queryFlow(0)
+    sketch.flush()
+    del sketch
+    reopened = genSketch(**params)
+    assert reopened.sampleProb < 1
+    assert reopened.queryFlow(0) == estimate
+    assert abs(reopened.queryFlow(0) - 5000) < 0.2*5000
+
+def test_cachedMappedCntrsMatchHashing(genSketch):
+    sketch = genSketch()
+    flows  = np.array([3, 1, 3, 7, 0])
+    hashed, inverse = sketch.mappedCntrsOfFlows(flows)
+    sketch.cacheMappedCntrs(sketch.num_flows)
+    cached, cachedInverse = sketch.mappedCntrsOfFlows(flows)
+    assert (cached == hashed).all() and (cachedInverse == inverse).all()
+    assert (sketch.mappedCntrsOfFlows(np.array([3, 12]))[0][1] == sketch.mappedCntrsOfFlow(12)).all() # a flow beyond the cache is hashed
+
+def test_mappedCntrsOnePerRow(genSketch):
+    # Each flow is mapped to a single counter in each row, by double hashing of a single digest; the mapping is deterministic, and spreads the flows over the row
+    sketch = genSketch(depth=4)
+    for flow in range(100):
+        mappedCntrs = sketch.mappedCntrsOfFlow(flow)
+        assert [cntrIdx // sketch.width for cntrIdx in mappedCntrs] == list(range(sketch.depth))
+        assert mappedCntrs == sketch.mappedCntrsOfFlow(flow)
+    h1, h2 = np.array([sketch.mappedCntrsOfFlow(flow)[:2] for flow in range(1000)]).T % sketch.width
+    assert len(set(h1)) > sketch.width/2 and (h1 != h2).any()
+
+def test_incFlowsMatchesIncFlowOneByOne(genSketch):
+    # A weighted batch, given either as an array or as a buffer of uint64 flows, should yield the counters of incrementing the flows one by one
+    flows, weights = np.random.default_rng(1).integers(10, size=300).astype(np.uint64), np.arange(300) % 3 + 1
+    oneByOne       = genSketch()
+    for flow, weight in zip(flows.tolist(), weights.tolist()):
+        for i in range(weight):
+            oneByOne.incFlow(flow)
+    for batch in [flows, flows.tobytes()]:
+        sketch = genSketch()
+        sketch.incFlows(batch, weights)
+        assert (sketch.countersArray.cntrs == oneByOne.countersArray.cntrs).all()
+        assert (sketch.queryFlows(batch) == [oneByOne.queryFlow(flow) for flow in flows.tolist()]).all()
+
+def test_conservativeUpdateBoundsTheCounts(genSketch):
+    # With exact counters, conservative update never under-estimates a flow, and never raises a counter above that of a plain sketch
+    flows    = np.random.default_rng(1).zipf(1.5, size=3000) % 500
+    counts   = np.bincount(flows, minlength=500)
+    plain, conservative, oneByOne = genSketch(width=16, num_flows=500), genSketch(width=16, num_flows=500, conservativeUpdate=True), genSketch(width=16, num_flows=500, conservativeUpdate=True)
+    plain.incFlows(flows)
+    conservative.incFlows(flows)
+    for flow in flows.tolist():
+        oneByOne.incFlow(flow)
+    assert (conservative.countersArray.cntrs == oneByOne.countersArray.cntrs).all()
+    assert (conservative.countersArray.cntrs <= plain.countersArray.cntrs).all()
+    assert (conservative.countersArray.cntrs < plain.countersArray.cntrs).any()
+    estimates = conservative.queryFlows(np.arange(500))
+    assert (counts <= estimates).all() and (estimates <= plain.queryFlows(np.arange(500))).all()
+
+def test_mergeNIngestSharded(genSketch, conf16):
+    # With exact counters, merging the sketches of the shards of a trace, either directly or by ingestSharded, yields the sketch of the whole trace
+    flows = np.random.default_rng(1).integers(10, size=1000)
+    whole, shard0, shard1 = genSketch(), genSketch(), genSketch()
+    whole.incFlows(flows)
+    shard0.incFlows(flows[:400])
+    shard1.incFlows(flows[400:])
+    shard0.merge(shard1)
+    assert (shard0.countersArray.cntrs == whole.countersArray.cntrs).all()
+    sketchParams = dict(width=64, depth=3, num_flows=10, mode='RealCntr', conf=conf16, outPutFileName='test')
+    assert (ingestSharded(flows, sketchParams, numOfProcs=2, masterSeed=1).countersArray.cntrs == whole.countersArray.cntrs).all()
+
+def test_mergeOfDwnSmpledSketches(genSketch, conf6):
+    # Merging a downsampled sketch into one that was not downsampled downsamples the latter to the same sampling probability; the estimates remain unbiased
+    sketches = [genSketch(mode='F2P', conf=conf6, dwnSmple=True) for numOfIncs in [5000, 100]]
+    for sketch, numOfIncs in zip(sketches, [5000, 100]):
+        sketch.incFlows(np.zeros(numOfIncs, dtype=np.int64))
+    sketches[1].merge(sketches[0])
+    assert sketches[1].sampleProb == sketches[0].sampleProb < 1
+    assert abs(sketches[1].queryFlow(0) - 5100) < 0.2*5100
+    with pytest.raises(SystemExit): # the sketches differ in width
+        sketches[1].merge(genSketch(mode='F2P', conf=conf6, width=32))
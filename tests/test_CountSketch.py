@@ -0,0 +1,26 @@
+import numpy as np
+from CountSketch import CountSketch
+
+def test_signedCntrsNMedian(genSketch):
+    # A flow increments each of its counters by its sign in the row, and its estimate is the median over the rows of sign*counter
+    sketch = genSketch(CountSketch, depth=5)
+    signs  = sketch.signsOfFlow(7)
+    assert set(signs.tolist()) <= {-1, 1}
+    assert (sketch.signsOfFlow(7) == signs).all() # the signs are a hash of the flow
+    sketch.incFlows(np.full(4, 7))
+    cntrs  = np.array(sketch.mappedCntrsOfFlow(7))
+    assert (sketch.querySignedCntrs(cntrs) == 4*signs).all()
+    sketch.countersArray.incCntrs(indices=cntrs[:2], factors=[10, -10]) # disturb 2 of the 5 rows; the median is unaffected
+    assert sketch.queryFlow(7) == 4
+    assert sketch.queryFlows(np.array([7, 7]))[1] == 4
+
+def test_pairedCntrsMatchRealCntrs(genSketch, conf16):
+    # With paired (positive and negative) F2P counters, small counts are exact; hence, the estimates equal those of real counters
+    flows     = np.random.default_rng(1).integers(10, size=200)
+    sketches  = [genSketch(CountSketch, mode=mode, conf=conf16, numOfHeavyHitters=3) for mode in ['RealCntr', 'F2P']]
+    for sketch in sketches:
+        sketch.incFlows(flows)
+    assert sketches[1].negCntrsArray!=None
+    assert (sketches[0].queryFlows(np.arange(10)) == sketches[1].queryFlows(np.arange(10))).all()
+    assert sketches[0].topK() == sketches[1].topK()
+    assert [estimate for flow, estimate in sketches[1].topK()] == [sketches[1].queryFlow(flow) for flow, estimate in sketches[1].topK()]
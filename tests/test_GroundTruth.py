@@ -0,0 +1,21 @@
+import numpy as np
+import GroundTruth
+
+def test_checkpoints():
+    assert GroundTruth.genCheckpoints(1000, numOfCheckpoints=4, logSpaced=False).tolist() == [250, 500, 750, 1000]
+    checkpoints = GroundTruth.genCheckpoints(10**6, numOfCheckpoints=7)
+    assert checkpoints.tolist() == [1, 10, 100, 1000, 10**4, 10**5, 10**6]
+
+def test_exactValsNErrors():
+    # The exact values are summed by blocks of (weighted) flows; the errors are evaluated over the flows seen, or over those of the current interval
+    groundTruth = GroundTruth.GroundTruth(numFlows=5)
+    groundTruth.add([0, 2, 2, 4], weights=[1., 2., 3., 4.])
+    groundTruth.rstInterval()
+    groundTruth.add(np.array([2, 3]))
+    assert groundTruth.vals.tolist() == [1, 0, 6, 1, 4] and groundTruth.numOfIncs == 6
+    assert groundTruth.seenFlows().tolist() == [0, 2, 3, 4]
+    assert groundTruth.flowsInInterval().tolist() == [2, 3]
+    sumOfErs, numOfPoints = groundTruth.sumSqRelErs(estimates=[1, 3, 2, 4]) # relative errors of 0, 1/2, 1, 0
+    assert np.isclose(sumOfErs, 1.25) and numOfPoints == 4
+    sumOfErs, numOfPoints = groundTruth.sumSqRelErs(estimates=[3, 2], flows=groundTruth.flowsInInterval(), weights=groundTruth.incsInInterval[[2, 3]])
+    assert np.isclose(sumOfErs, 0.25 + 1) and numOfPoints == 2
@@ -0,0 +1,24 @@
+import numpy as np
+from HeavyHitters import HeavyHitters
+
+def checkHeap(heavyHitters):
+    # Verify that the heap is a min-heap, and that posOfFlow indexes exactly its entries
+    heap = heavyHitters.heap
+    assert all(heap[(pos-1) >> 1][0] <= heap[pos][0] for pos in range(1, len(heap)))
+    assert heavyHitters.posOfFlow == {flow : pos for pos, (estimate, flow) in enumerate(heap)}
+
+def test_heapInvariantsKeptWhenEstimatesDecrease():
+    rng          = np.random.default_rng(1)
+    heavyHitters = HeavyHitters(capacity=16)
+    estimates    = {}
+    for i in range(2000):
+        flow = int(rng.integers(40))
+        # mostly increase the flow's estimate, but occasionally decrease it (e.g., as after a downsampling of the sketch)
+        estimates[flow] = estimates.get(flow, 0) + 1 if (rng.random() < 0.9) else estimates.get(flow, 0) * 0.3
+        heavyHitters.update(flow, estimates[flow])
+        checkHeap(heavyHitters)
+    topK = heavyHitters.topK(5)
+    assert [estimate for flow, estimate in topK] == sorted([entry[0] for entry in heavyHitters.heap], reverse=True)[:5]
+    assert all(estimates[flow] == estimate for flow, estimate in topK)
+    threshold = topK[-1][1]
+    assert heavyHitters.aboveThreshold(threshold) == [item for item in heavyHitters.topK() if item[1] >= threshold]
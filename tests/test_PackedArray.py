@@ -0,0 +1,39 @@
+import numpy as np
+import pytest
+import PackedArray
+
+def test_codesSpanningTwoWords():
+    # 7-bit codes: e.g., code 9 occupies bits 63..69, namely, the last bit of word 0 and the first 6 bits of word 1
+    rng    = np.random.default_rng(1)
+    packed = PackedArray.PackedArray(numCntrs=100, cntrSize=7)
+    codes  = rng.integers(2**7, size=100)
+    packed[np.arange(100)] = codes
+    assert (packed[np.arange(100)] == codes).all()
+    packed[9] = 2**7-1 # set all the bits of a spanning code, which should not touch its neighbors
+    assert packed[9] == 2**7-1 and packed[8] == codes[8] and packed[10] == codes[10]
+    packed[9] = 0
+    assert packed[9] == 0 and packed[8] == codes[8] and packed[10] == codes[10]
+    packed[[3, 3]] = [5, 6] # the last code set for a repeated index is kept
+    assert packed[3] == 6
+    assert packed.nbytes == 8 * PackedArray.PackedArray.calcNumWords(100, 7) < 100
+
+def test_fullWordCodes():
+    packed = PackedArray.PackedArray(numCntrs=3, cntrSize=64, fillCode=2**64-1)
+    packed[1] = 5
+    assert packed[np.arange(3)].tolist() == [2**64-1, 5, 2**64-1]
+
+def test_reopenedFileKeepsCodesNMeta(tmp_path):
+    # A file of codes, flushed and reopened with the same settings, keeps its codes and its metadata field; reopening it with other settings fails
+    fileName = str(tmp_path / 'cntrs.bin')
+    packed   = PackedArray.openCntrsFile(fileName=fileName, numCntrs=50, cntrSize=6, settingsStr='F2P_n6_h2', cntrZeroCode=1)
+    assert (packed[np.arange(50)] == 1).all() and packed.meta[0] == 0
+    packed[[0, 49]]  = [63, 17]
+    packed.meta[0]   = 0.25
+    packed.flush()
+    del packed
+    reopened = PackedArray.openCntrsFile(fileName=fileName, numCntrs=50, cntrSize=6, settingsStr='F2P_n6_h2', cntrZeroCode=1)
+    assert reopened[0] == 63 and reopened[49] == 17 and reopened[1] == 1
+    assert reopened.meta[0] == 0.25
+    for numCntrs, cntrSize, settingsStr in [(51, 6, 'F2P_n6_h2'), (50, 7, 'F2P_n6_h2'), (50, 6, 'F2P_n6_h1')]:
+        with pytest.raises(SystemExit):
+            PackedArray.openCntrsFile(fileName=fileName, numCntrs=numCntrs, cntrSize=cntrSize, settingsStr=settingsStr)
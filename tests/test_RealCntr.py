@@ -0,0 +1,14 @@
+import numpy as np
+import RealCntr
+
+def test_incCntrsMatchesIncCntrOneByOne():
+    # A batch with repeated indices should yield the same counters, and the same running values, as incCntr called per entry
+    indices = np.array([3, 1, 3, 0, 3, 1])
+    factors = np.array([2., 5., 1.5, 4., 3., 0.5])
+    batched, oneByOne = RealCntr.CntrMaster(numCntrs=4), RealCntr.CntrMaster(numCntrs=4)
+    vals = batched.incCntrs(indices, factors)
+    assert (vals == [oneByOne.incCntr(cntrIdx=i, factor=f)['val'] for i, f in zip(indices, factors)]).all()
+    assert (batched.cntrs == oneByOne.cntrs).all()
+    assert (batched.incCntrs(indices, 0.5, mult=True) == [3.25, 2.75, 1.625, 2., 0.8125, 1.375]).all()
+    assert (batched.queryCntrs([3, 0]) == [0.8125, 2.]).all()
+    assert batched.cntrs.dtype == np.float64
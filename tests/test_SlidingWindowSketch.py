@@ -0,0 +1,29 @@
+import numpy as np
+from SlidingWindowSketch import SlidingWindowSketch
+
+def test_windowQueriesAcrossEpochRotation(conf16):
+    # Flow e is incremented (e+1) times in epoch e; a window of the last w epochs should count only the increments of these epochs
+    ring = SlidingWindowSketch(numOfEpochs=3, sketchParams=dict(width=64, depth=3, num_flows=10, mode='RealCntr', conf=conf16, outPutFileName='test'))
+    for epoch in range(5):
+        if epoch>0:
+            ring.advanceEpoch()
+        ring.incFlows(np.full(epoch+1, 0))
+    assert ring.curEpoch == 4 % 3
+    assert ring.queryFlow(0, numOfEpochs=1) == 5
+    assert ring.queryFlow(0, numOfEpochs=2) == 5+4
+    assert ring.queryFlow(0) == 5+4+3 # the epochs 0 and 1 were rotated out
+    assert ring.queryFlow(0, numOfEpochs=10) == 5+4+3
+
+def test_reopenedRingKeepsItsPosition(conf6, tmp_path):
+    params = dict(width=64, depth=3, num_flows=10, mode='F2P', conf=conf6, outPutFileName='test', fileName=str(tmp_path / 'ring'))
+    ring   = SlidingWindowSketch(numOfEpochs=3, sketchParams=params)
+    for epoch in range(4):
+        if epoch>0:
+            ring.advanceEpoch()
+        ring.incFlows(np.full(epoch+1, 0))
+    estimates = [ring.queryFlow(0, numOfEpochs) for numOfEpochs in range(1, 4)]
+    ring.flush()
+    del ring
+    reopened = SlidingWindowSketch(numOfEpochs=3, sketchParams=params)
+    assert (reopened.curEpoch, reopened.numOfEpochsSeen) == (0, 4)
+    assert [reopened.queryFlow(0, numOfEpochs) for numOfEpochs in range(1, 4)] == estimates
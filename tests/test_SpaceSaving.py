@@ -0,0 +1,15 @@
+import numpy as np
+from SpaceSaving import SpaceSaving
+
+def test_exactCntrsBoundTheCounts(conf16):
+    # With exact counters, each reported flow's estimate bounds its count from above, and estimate-err bounds it from below
+    flows   = np.random.default_rng(1).zipf(1.3, size=20000) % 1000
+    counts  = np.bincount(flows, minlength=1000)
+    summary = SpaceSaving(numOfEntries=50, mode='RealCntr', conf=conf16)
+    summary.incFlows(flows)
+    reports = summary.topK()
+    assert len(reports) == 50
+    assert [report[1] for report in reports] == sorted([report[1] for report in reports], reverse=True)
+    assert all(estimate >= counts[flow] >= estimate-err for flow, estimate, err in reports)
+    assert sum(report[1] for report in reports) == len(flows)
+    assert summary.sizeInBytes() > summary.cntrsSizeInBytes()
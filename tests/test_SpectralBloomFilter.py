@@ -0,0 +1,15 @@
+import numpy as np
+from SpectralBloomFilter import SpectralBloomFilter
+
+def test_dupCntrsIncrementedOnce(conf16):
+    for kwargs, incFlowsInBatch in [({}, False), ({}, True), ({'conservativeUpdate' : True}, False), ({'conservativeUpdate' : True}, True), ({'sbfMode' : 'RM'}, False), ({'sbfMode' : 'RM'}, True)]:
+        # a filter, and a flow, 2 of whose hash functions map to the same counter
+        sbf  = SpectralBloomFilter(numCntrs=8, numOfHashes=3, num_flows=100, mode='RealCntr', conf=conf16, outPutFileName='test', **kwargs)
+        flow = next(flow for flow in range(1000) if len(set(sbf.mappedCntrsOfFlow(flow))) < 3)
+        if incFlowsInBatch:
+            sbf.incFlows(np.full(5, flow))
+        else:
+            for i in range(5):
+                sbf.incFlow(flow)
+        assert sbf.countersArray.queryCntrs(np.arange(sbf.numCntrs)).max() == 5
+        assert sbf.queryFlow(flow) == 5
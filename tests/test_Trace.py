@@ -0,0 +1,25 @@
+import numpy as np
+import Trace
+
+def test_binTraceBlocks(tmp_path):
+    # Structured records of a flow key and a weight are yielded in blocks, with or without their weights
+    records = np.zeros(10, dtype=np.dtype([('flow', '<u8'), ('bytes', '<u4')]))
+    records['flow'], records['bytes'] = np.arange(10) * 7, np.arange(10) + 100
+    records.tofile(tmp_path / 'trace.bin')
+    blocks  = list(Trace.genTraceBlocks(str(tmp_path / 'trace.bin'), recordDtype=records.dtype, weightField='bytes', blockSize=4))
+    assert [len(flows) for flows, weights in blocks] == [4, 4, 2]
+    assert (np.concatenate([flows for flows, weights in blocks]) == records['flow']).all()
+    assert (np.concatenate([weights for flows, weights in blocks]) == records['bytes']).all()
+    records['flow'].tofile(tmp_path / 'flows.bin') # records of a flow key only
+    flows, weights = next(Trace.genTraceBlocks(str(tmp_path / 'flows.bin')))
+    assert (flows == records['flow']).all() and weights is None
+
+def test_csvTraceBlocks(tmp_path):
+    # The flow keys are kept as strings, and the weights are parsed; the header, and blank lines, are skipped
+    (tmp_path / 'trace.csv').write_text('src;dst;bytes\n10.0.0.1;10.0.0.2;1500\n\n10.0.0.3;10.0.0.2;40\r\n10.0.0.1;10.0.0.2;60\n')
+    blocks = list(Trace.genTraceBlocks(str(tmp_path / 'trace.csv'), flowCol=0, weightCol=2, delimiter=';', skipHeader=True, blockSize=2))
+    flows  = np.concatenate([flows for flows, weights in blocks])
+    assert flows.tolist() == ['10.0.0.1', '10.0.0.3', '10.0.0.1']
+    assert np.concatenate([weights for flows, weights in blocks]).tolist() == [1500, 40, 60]
+    (tmp_path / 'empty.csv').write_text('')
+    assert list(Trace.genTraceBlocks(str(tmp_path / 'empty.csv'))) == []
@@ -0,0 +1,24 @@
+import numpy as np
+import Workload
+
+def test_blocksOfAllDists():
+    # Every distribution yields numOfIncs flow IDs in [0, numFlows), in blocks of (up to) blockSize, reproducibly by the seed
+    for dist in Workload.DISTS:
+        blocks = list(Workload.genFlowBlocks(dist=dist, numFlows=50, numOfIncs=10000, blockSize=3000, seed=1))
+        assert [len(block) for block in blocks] == [3000, 3000, 3000, 1000]
+        flows  = np.concatenate(blocks)
+        assert flows.min() >= 0 and flows.max() < 50
+        assert (flows == np.concatenate(list(Workload.genFlowBlocks(dist=dist, numFlows=50, numOfIncs=10000, blockSize=3000, seed=1)))).all()
+
+def test_zipfFollowsItsProbs():
+    # The frequencies of the flows of 'zipf' should be close to their probs', which decrease as (i+1)^-alpha
+    probs = Workload.calcFlowProbs('zipf', numFlows=20, alpha=1.2)
+    assert np.isclose(probs.sum(), 1) and np.isclose(probs[0]/probs[1], 2**1.2)
+    flows = np.concatenate(list(Workload.genFlowBlocks(dist='zipf', numFlows=20, numOfIncs=10**5, alpha=1.2, seed=1)))
+    assert np.allclose(np.bincount(flows, minlength=20) / len(flows), probs, atol=0.01)
+
+def test_burstsAreRunsOfAFlow():
+    # With long bursts, a 'bursty' stream consists of long runs of the same flow
+    flows = np.concatenate(list(Workload.genFlowBlocks(dist='bursty', numFlows=1000, numOfIncs=10**4, blockSize=1000, meanBurstLen=50, seed=1)))
+    numOfRuns = 1 + np.count_nonzero(flows[1:] != flows[:-1])
+    assert 10**4/50 * 0.7 < numOfRuns < 10**4/50 * 1.3